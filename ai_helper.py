@@ -1,10 +1,13 @@
 # ai_helper.py
 import os
-import re
 import pandas as pd
 import numpy as np
 import json
-import textwrap
+
+from instructions import apply_plan, compile_instructions
+from metrics import StepRecorder
+from profiler import profile_frame, profile_frames
+from sketches import sketch_frame
 
 # LLM (optional): enable if OPENAI_API_KEY is set in Streamlit secrets
 try:
@@ -23,52 +26,107 @@ except Exception:
     _client = None
 
 # ---------------- Data Quality Report ----------------
-def data_quality_report(df_original: pd.DataFrame, df_clean: pd.DataFrame) -> str:
-    def profile(df):
-        rows, cols = df.shape
-        nulls = int(df.isna().sum().sum())
-        dups = int(df.duplicated().sum())
-        types = df.dtypes.astype(str).to_dict()
-        sample = {c: df[c].dropna().astype(str).head(3).tolist() for c in df.columns}
-        return rows, cols, nulls, dups, types, sample
-
-    orows, ocols, onulls, odups, otypes, osample = profile(df_original)
-    crows, ccols, cnulls, cdups, ctypes, csample = profile(df_clean)
+def _dict_to_md(d):
+    return "<br>".join([f"<code>{k}</code>: {v}" for k, v in d.items()])
+
+def _source_md(source) -> str:
+    source = source or {}
+    if "encoding" in source:
+        return (
+            f"**Source**: encoding `{source['encoding']}` (confidence {source['encoding_confidence']:.0%})"
+            f" | delimiter `{source['dialect']['delimiter']!r}`  \n"
+        )
+    if "sheet" in source:
+        return f"**Source**: sheet `{source['sheet']}` ({source['engine']}, {source['seconds']:.2f}s)  \n"
+    return ""
 
-    def dict_to_md(d):
-        return "<br>".join([f"<code>{k}</code>: {v}" for k, v in d.items()])
+def data_quality_report(df_original: pd.DataFrame, df_clean: pd.DataFrame, mode: str = "exact") -> str:
+    """
+    mode="exact" profiles both frames exactly; mode="sketch" uses bounded-memory,
+    mergeable sketches (approximate distinct counts, quantiles, top values; see sketches.py).
+    """
+    if mode == "sketch":
+        return sketch_quality_report(sketch_frame(df_original), sketch_frame(df_clean), df_original.attrs.get("source"))
+    if mode != "exact":
+        raise ValueError(f"unknown report mode: {mode}")
+    # one factorize per column gives nulls, distinct values and duplicate rows (see profiler.py)
+    original, clean = profile_frames(df_original, df_clean)
+    orows, ocols, onulls, odups = original.rows, original.cols, original.nulls, original.duplicates
+    crows, ccols, cnulls, cdups = clean.rows, clean.cols, clean.nulls, clean.duplicates
+    ctypes, csample = clean.dtypes(), clean.samples()
+
+    source_md = _source_md(df_original.attrs.get("source"))
 
     md = f"""
-**Original**: {orows} rows × {ocols} cols | Null values: {onulls} | Duplicates: {odups}  
+{source_md}**Original**: {orows} rows × {ocols} cols | Null values: {onulls} | Duplicates: {odups}  
 **Cleaned**: {crows} rows × {ccols} cols | Null values: {cnulls} | Duplicates: {cdups}
 
 **Column types (cleaned)**  
-{dict_to_md(ctypes)}
+{_dict_to_md(ctypes)}
 
 **Sample values per column (cleaned)**  
 """ + "<br>".join([f"• <code>{c}</code>: " + ", ".join([f"`{s}`" for s in v]) for c, v in csample.items()])
     return md
 
+def _approx(n: float) -> str:
+    return f"≈{int(round(n)):,}"
+
+def sketch_quality_report(original, clean, source: dict = None) -> str:
+    """The quality report from two sketches.FrameSketch (e.g. merged per chunk or per worker)."""
+    def dups(sk):
+        # HyperLogLog error on the distinct-row count carries over to the duplicate count
+        band = 2 * 1.04 / np.sqrt(len(sk.row_hll.registers)) * sk.rows
+        return f"{_approx(sk.duplicates())} (±{band:,.0f})"
+
+    stats = []
+    for name, col in clean.columns.items():
+        parts = [f"{_approx(col.distinct())} distinct"]
+        q = col.quantiles((0.0, 0.5, 0.95, 1.0))
+        if q[0] is not None:
+            parts.append(f"min `{q[0]}` · p50 `{q[1]}` · p95 `{q[2]}` · max `{q[3]}`")
+        present = col.rows - col.nulls
+        if present and col.distinct() < 0.1 * present:
+            # count-min counts are only meaningful for values that repeat a lot
+            parts.append("top " + ", ".join(f"`{v}` ({_approx(n)})" for v, n in col.frequent.top(3)))
+        stats.append(f"• <code>{name}</code>: " + " | ".join(parts))
+
+    md = f"""
+{_source_md(source)}**Original**: {original.rows} rows × {len(original.columns)} cols | Null values: {original.nulls} | Duplicates: {dups(original)}  
+**Cleaned**: {clean.rows} rows × {len(clean.columns)} cols | Null values: {clean.nulls} | Duplicates: {dups(clean)}
+
+**Column types (cleaned)**  
+{_dict_to_md({name: col.dtype for name, col in clean.columns.items()})}
+
+**Column statistics (cleaned, approximate)**  
+""" + "<br>".join(stats) + """
+
+**Random sample values per column (cleaned)**  
+""" + "<br>".join(
+        f"• <code>{name}</code>: " + ", ".join(f"`{v}`" for v in col.sample.values[:3])
+        for name, col in clean.columns.items()
+    )
+    return md
+
 # ---------------- AI Suggestions ----------------
 SUGGESTION_SYSTEM = """You are a data-cleaning expert. Given a summary of a dataset (columns, null counts, possible types, duplicates),
 produce short bullet-point suggestions for cleaning. Keep it practical and focused on Pandas-friendly operations. Return Markdown bullets.
 """
 
 def ai_suggest_cleaning(df_original: pd.DataFrame, df_clean: pd.DataFrame) -> str:
-    # Heuristic summary
+    # Heuristic summary, read from the same (cached) profile as data_quality_report
+    prof = profile_frame(df_original)
     issues = []
-    if df_original.duplicated().any():
+    if prof.duplicates:
         issues.append("There are duplicate rows in the original dataset.")
-    if df_original.isna().any().any():
+    if prof.nulls:
         issues.append("There are missing values in one or more columns.")
-    for c in df_original.columns:
-        if df_original[c].dtype == object:
+    for col in prof.columns:
+        if col.text:
             # check leading/trailing spaces or commas-in-numbers hint
-            s = df_original[c].dropna().astype(str)
-            if s.str.startswith(" ").any() or s.str.endswith(" ").any():
-                issues.append(f"Column '{c}' may contain leading/trailing spaces.")
-            if s.str.contains(",").mean() > 0.2:
-                issues.append(f"Column '{c}' may contain numeric values with commas.")
+            if col.leading_spaces or col.trailing_spaces:
+                issues.append(f"Column '{col.name}' may contain leading/trailing spaces.")
+            if col.comma_ratio > 0.2:
+                issues.append(f"Column '{col.name}' may contain numeric values with commas.")
     if not issues:
         issues.append("No major issues found. Consider standardizing column names and ensuring correct dtypes.")
 
@@ -79,11 +137,11 @@ def ai_suggest_cleaning(df_original: pd.DataFrame, df_clean: pd.DataFrame) -> st
 
     # Build compact schema for the LLM
     schema = {
-        "original_columns": df_original.columns.tolist(),
-        "cleaned_columns": df_clean.columns.tolist(),
-        "null_counts": df_original.isna().sum().to_dict(),
-        "dtypes_guess": df_original.dtypes.astype(str).to_dict(),
-        "duplicates_in_original": int(df_original.duplicated().sum()),
+        "original_columns": [str(c) for c in df_original.columns],
+        "cleaned_columns": [str(c) for c in df_clean.columns],
+        "null_counts": {str(c.name): c.nulls for c in prof.columns},
+        "dtypes_guess": {str(c.name): c.dtype for c in prof.columns},
+        "duplicates_in_original": prof.duplicates,
     }
     prompt = f"Dataset summary:\n{json.dumps(schema) }\n\nProvide concise bullet suggestions."
 
@@ -103,115 +161,25 @@ def ai_suggest_cleaning(df_original: pd.DataFrame, df_clean: pd.DataFrame) -> st
 
 # ---------------- Natural-Language Cleaning (Safe Parser) ----------------
 # Supported actions (intentionally limited/safe):
-# - rename A -> a (comma/semicolon separated list allowed)
+# - rename A -> a (comma separated list allowed)
 # - drop columns: X, Y
+# Actions are separated by ";" or newlines; a bare list after a rename or a
+# column drop ("rename a -> b; c -> d", "drop columns: X; Y") continues it.
 # - drop rows where COL is null / equals VALUE
 # - fill nulls in COL with VALUE
 # - convert COL to numeric
 # - parse COL as date (optionally with format)
-REN_RE = re.compile(r"rename\s+(.+)", re.I)
-DROP_COLS_RE = re.compile(r"drop\s+columns?\s*:\s*(.+)", re.I)
-DROP_NULL_RE = re.compile(r"drop\s+rows\s+where\s+(.+?)\s+is\s+null", re.I)
-DROP_EQ_RE = re.compile(r"drop\s+rows\s+where\s+(.+?)\s*=\s*(.+)", re.I)
-FILL_RE = re.compile(r"fill\s+nulls\s+in\s+(.+?)\s+with\s+(.+)", re.I)
-NUMERIC_RE = re.compile(r"convert\s+(.+?)\s+to\s+numeric", re.I)
-DATE_RE = re.compile(r"parse\s+(.+?)\s+as\s+date(?:\s+format\s+(.+))?", re.I)
-
-def _split_items(s):
-    return [x.strip() for x in re.split(r"[;,]", s) if x.strip()]
-
-def ai_apply_instructions_safe(df: pd.DataFrame, instructions: str):
+# (parsed and applied by instructions.py)
+
+def ai_apply_instructions_safe(df: pd.DataFrame, instructions: str, step_metrics: list = None):
     """
     Applies a small, safe subset of transformations parsed from natural language.
     Returns (df_out, change_log).
+    Pass a list as `step_metrics` to get a metrics.StepMetrics per applied step.
     """
-    out = df.copy()
-    log = []
     text = (instructions or "").strip()
     if not text:
-        return out, log
-
-    # RENAME: "rename A->a; B->b" or "rename Full Name -> full_name"
-    m = REN_RE.search(text)
-    if m:
-        pairs = _split_items(m.group(1))
-        mapping = {}
-        for p in pairs:
-            if "->" in p:
-                left, right = [x.strip() for x in p.split("->", 1)]
-                mapping[left] = right
-        # Try also support "rename Full Name -> full_name" even if alone
-        if not mapping and "->" in m.group(1):
-            left, right = [x.strip() for x in m.group(1).split("->", 1)]
-            mapping[left] = right
-        if mapping:
-            out = out.rename(columns=mapping)
-            log.append(f"Renamed columns: {mapping}")
-
-    # DROP COLUMNS: "drop columns: X, Y"
-    m = DROP_COLS_RE.search(text)
-    if m:
-        cols = [c for c in _split_items(m.group(1)) if c in out.columns]
-        if cols:
-            out = out.drop(columns=cols, errors="ignore")
-            log.append(f"Dropped columns: {cols}")
-
-    # DROP ROWS WHERE COL IS NULL
-    m = DROP_NULL_RE.search(text)
-    if m:
-        col = m.group(1).strip()
-        if col in out.columns:
-            before = len(out)
-            out = out[~out[col].isna()].copy()
-            log.append(f"Dropped {before - len(out)} rows where {col} is null")
-
-    # DROP ROWS WHERE COL = VALUE
-    m = DROP_EQ_RE.search(text)
-    if m:
-        col = m.group(1).strip()
-        val = m.group(2).strip().strip("'\"")
-        if col in out.columns:
-            before = len(out)
-            out = out[out[col] != val].copy()
-            log.append(f"Dropped {before - len(out)} rows where {col} == {val}")
-
-    # FILL NULLS
-    m = FILL_RE.search(text)
-    if m:
-        col = m.group(1).strip()
-        val = m.group(2).strip().strip("'\"")
-        if col in out.columns:
-            # try numeric or leave as text
-            try:
-                val_cast = float(val) if "." in val or val.isdigit() else val
-            except Exception:
-                val_cast = val
-            out[col] = out[col].fillna(val_cast)
-            log.append(f"Filled nulls in {col} with {val_cast}")
-
-    # CONVERT TO NUMERIC
-    m = NUMERIC_RE.search(text)
-    if m:
-        col = m.group(1).strip()
-        if col in out.columns:
-            out[col] = (
-                out[col].astype(str).str.replace(",", "", regex=False).str.strip()
-            )
-            out[col] = pd.to_numeric(out[col], errors="coerce")
-            log.append(f"Converted {col} to numeric")
-
-    # PARSE DATE (optional format)
-    m = DATE_RE.search(text)
-    if m:
-        col = m.group(1).strip()
-        fmt = (m.group(2) or "").strip()
-        if col in out.columns:
-            if fmt:
-                out[col] = pd.to_datetime(out[col], errors="coerce", format=fmt)
-                log.append(f"Parsed {col} as date with format {fmt}")
-            else:
-                out[col] = pd.to_datetime(out[col], errors="coerce")
-                log.append(f"Parsed {col} as date (auto-detect)")
-
-    out = out.reset_index(drop=True)
-    return out, log
+        out = df.copy()
+        StepRecorder("instructions", df, step_metrics).finish(out)
+        return out, []
+    return apply_plan(df, compile_instructions(text), step_metrics)
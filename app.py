@@ -1,8 +1,12 @@
 # app.py
-import io
+import os
 import pandas as pd
 import streamlit as st
-from cleaner import clean_dataframe, detect_delimiter
+from cache import ResultCache, fingerprint_bytes, options_key
+from exports import EXPORT_COLUMNAR, LazyExport
+from metrics import metrics_table
+from pipeline import CleaningDAG
+from readers import MappedFile, list_sheets, read_csv_bytes, read_excel_bytes
 from ai_helper import (
     data_quality_report,
     ai_suggest_cleaning,
@@ -39,6 +43,12 @@ with st.sidebar:
     st.markdown("---")
     st.caption("Tip: You can toggle options and re-run without re-uploading.")
 
+    st.markdown("---")
+    st.subheader("📦 Parquet / Feather Export")
+    opt_parquet_compression = st.selectbox("Parquet compression", ["zstd", "snappy", "gzip", "none"], index=0)
+    opt_row_group_rows = st.number_input("Parquet row-group size (rows)", min_value=1_000, value=128_000, step=1_000)
+    opt_feather_compression = st.selectbox("Feather compression", ["lz4", "zstd", "uncompressed"], index=0)
+
     st.markdown("---")
     st.subheader("🤖 AI Assistant (Optional)")
     if OPENAI_READY:
@@ -70,20 +80,69 @@ uploaded = st.file_uploader("Upload a CSV or Excel file", type=["csv", "xlsx", "
 
 # File-size guard (avoid huge uploads on free hosting)
 MAX_MB = 50
+SKETCH_REPORT_ROWS = int(os.getenv("CLEANMYCSV_SKETCH_REPORT_ROWS", "500000"))
 if uploaded and uploaded.size > MAX_MB * 1024 * 1024:
     st.error(f"File is too large ({uploaded.size/1024/1024:.1f} MB). Max {MAX_MB} MB.")
     st.stop()
 
+# Deployments with a shared volume can open files from it instead: they are
+# memory-mapped, not uploaded and copied (no size limit).
+DATA_DIR = os.getenv("CLEANMYCSV_DATA_DIR")
+if DATA_DIR and not uploaded and os.path.isdir(DATA_DIR):
+    local_files = sorted(f for f in os.listdir(DATA_DIR) if f.lower().endswith((".csv", ".xlsx", ".xls")))
+    picked = st.selectbox("…or open a file from the server", [""] + local_files)
+    if picked:
+        uploaded = MappedFile(os.path.join(DATA_DIR, picked))
+
+# ---------- Result cache ----------
+# Every widget interaction reruns this script; results are memoized per session,
+# keyed by the upload's content hash plus the options that produced them.
+CACHE_MB = int(os.getenv("CLEANMYCSV_CACHE_MB", "512"))
+if "result_cache" not in st.session_state:
+    st.session_state["result_cache"] = ResultCache(memory_budget=CACHE_MB * 1024 * 1024)
+cache = st.session_state["result_cache"]
+
+def _download_button(df: pd.DataFrame, fmt: str, label: str, file_name: str, key, **options):
+    # exports are built only once asked for, then served from the cache on later reruns
+    export = LazyExport(df, fmt, cache, key=key, **options)
+    if export.ready or st.button(f"Prepare {file_name}", key=f"prepare-{file_name}"):
+        st.download_button(label, data=export.data(), file_name=file_name, mime=export.mime)
+
+def _columnar_downloads(df: pd.DataFrame, stem: str, key):
+    # typed exports: dtypes inferred while cleaning survive, unlike in CSV
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        _download_button(
+            df, "parquet", "Download as Parquet", f"{stem}.parquet", key,
+            compression=opt_parquet_compression, row_group_size=int(opt_row_group_rows),
+        )
+    with c2:
+        _download_button(df, "feather", "Download as Feather", f"{stem}.feather", key, compression=opt_feather_compression)
+    with c3:
+        _download_button(df, "arrows", "Download as Arrow stream", f"{stem}.arrows", key)
+
 # ---------- Main logic ----------
 if uploaded:
     # 1) Read file
+    upload_key = ("upload", uploaded.name, fingerprint_bytes(uploaded.getbuffer()))
     try:
         if uploaded.name.lower().endswith(".csv"):
-            content = uploaded.getvalue().decode("utf-8", errors="ignore")
-            delim = detect_delimiter(content)
-            df_original = pd.read_csv(io.StringIO(content), delimiter=delim)
+            # parse straight from the upload buffer (pyarrow when available)
+            df_original = cache.get_or_compute(
+                upload_key, lambda: read_csv_bytes(uploaded.getbuffer(), workers=os.cpu_count() or 1)
+            )
         else:
-            df_original = pd.read_excel(uploaded)
+            # list sheets without parsing them, then read only the chosen sheet / range
+            sheets = cache.get_or_compute(("sheets", upload_key), lambda: list_sheets(uploaded.getbuffer()))
+            c1, c2 = st.columns(2)
+            sheet = c1.selectbox("Sheet", sheets) if len(sheets) > 1 else sheets[0]
+            cell_range = c2.text_input("Cell range (optional, e.g. A1:F500)").strip() or None
+            upload_key = upload_key + (sheet, cell_range)
+            df_original = cache.get_or_compute(
+                upload_key, lambda: read_excel_bytes(uploaded.getbuffer(), sheet, ranges=cell_range)
+            )
+            source = df_original.attrs["source"]
+            st.caption(f"Read sheet '{sheet}' with {source['engine']} in {source['seconds']:.2f}s.")
     except Exception as e:
         st.error(f"Failed to read file: {e}")
         st.stop()
@@ -94,8 +153,7 @@ if uploaded:
     st.caption("👀 Original uploaded dataset — column format unchanged.")
 
     # 3) Cleaned (analysis-friendly)
-    df_cleaned = clean_dataframe(
-        df_original,
+    clean_options = dict(
         trim_spaces=opt_trim,
         standardize_columns=opt_standardize_cols,  # snake_case if True
         drop_empty_rows=opt_drop_empty_rows,
@@ -104,21 +162,34 @@ if uploaded:
         fix_numbers=opt_fix_numbers,
         parse_dates=opt_parse_dates,
     )
+    clean_key = ("clean", upload_key, options_key(**clean_options))
+    # each step is memoized on its own: toggling one option reruns only the steps after it
+    dag = CleaningDAG(cache=cache)
+    clean_steps = []
+    df_cleaned = dag.run(df_original, source_key=repr(upload_key), step_metrics=clean_steps, **clean_options)
 
     st.subheader("✅ Preview (Cleaned)")
     st.dataframe(df_cleaned.head(50), use_container_width=True)
     st.caption("✅ Cleaned dataset — columns standardized to **snake_case** (data-analysis friendly).")
+    with st.expander("⚙️ Cleaning steps (timings & cache)"):
+        st.dataframe(metrics_table(clean_steps), use_container_width=True)
+        st.caption("Cache keys per step")
+        st.dataframe(dag.explain(), use_container_width=True)
 
     # 4) Data Quality Report
     with st.expander("📊 Data Quality Report"):
-        report = data_quality_report(df_original, df_cleaned)
+        # past SKETCH_REPORT_ROWS the report uses bounded-memory approximate statistics
+        report_mode = "sketch" if len(df_original) > SKETCH_REPORT_ROWS else "exact"
+        report = cache.get_or_compute(
+            ("report", clean_key, report_mode), lambda: data_quality_report(df_original, df_cleaned, mode=report_mode)
+        )
         st.markdown(report, unsafe_allow_html=True)
 
     # 5) AI Suggestions
     st.subheader("🤖 AI Suggestions")
     st.caption("Ask the AI what else should be cleaned or standardized.")
     if st.button("Generate AI Cleaning Suggestions"):
-        suggestions_md = ai_suggest_cleaning(df_original, df_cleaned)
+        suggestions_md = cache.get_or_compute(("suggest", clean_key), lambda: ai_suggest_cleaning(df_original, df_cleaned))
         st.markdown(suggestions_md, unsafe_allow_html=True)
 
     # 6) Natural-language cleaning (safe)
@@ -126,32 +197,36 @@ if uploaded:
     st.caption("Examples: `drop rows where email is null`, `rename Full Name -> full_name`, `parse Order Date as yyyy-mm-dd`")
     instructions = st.text_area("Describe changes to apply", height=110, placeholder="rename Full Name -> full_name; drop rows where Email is null; convert Amount (INR) to numeric")
     if st.button("Apply Instructions"):
-        df_updated, change_log = ai_apply_instructions_safe(df_cleaned, instructions)
+        st.session_state["applied_instructions"] = (clean_key, instructions)
+    # stays applied across reruns (e.g. a download being prepared) until the text or options change
+    if st.session_state.get("applied_instructions") == (clean_key, instructions):
+        updated_key = ("instructions", clean_key, instructions)
+
+        def _apply():
+            steps = []
+            out, log = ai_apply_instructions_safe(df_cleaned, instructions, step_metrics=steps)
+            return out, log, steps
+
+        df_updated, change_log, instruction_steps = cache.get_or_compute(updated_key, _apply)
         st.success("Applied instructions (within safe set).")
         st.markdown("**Change Log**")
         st.write("• " + "\n• ".join(change_log) if change_log else "No changes detected.")
+        with st.expander("⏱️ Instruction timings"):
+            st.dataframe(metrics_table(instruction_steps), use_container_width=True)
         st.subheader("🆕 Preview (After Instructions)")
         st.dataframe(df_updated.head(50), use_container_width=True)
         # Offer downloads of the updated frame
         st.subheader("⬇️ Download Updated File")
         c1, c2 = st.columns(2)
         with c1:
-            st.download_button(
-                "Download as CSV",
-                data=df_updated.to_csv(index=False).encode("utf-8"),
-                file_name="cleaned_updated.csv",
-                mime="text/csv",
-            )
+            _download_button(df_updated, "csv", "Download as CSV", "cleaned_updated.csv", updated_key)
         with c2:
-            xbuf = io.BytesIO()
-            with pd.ExcelWriter(xbuf, engine="openpyxl") as writer:
-                df_updated.to_excel(writer, index=False, sheet_name="Updated Data")
-            st.download_button(
-                "Download as Excel (.xlsx)",
-                data=xbuf.getvalue(),
-                file_name="cleaned_updated.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            _download_button(
+                df_updated, "xlsx", "Download as Excel (.xlsx)", "cleaned_updated.xlsx", updated_key,
+                sheet_name="Updated Data",
             )
+        if EXPORT_COLUMNAR:
+            _columnar_downloads(df_updated, "cleaned_updated", updated_key)
 
     # 7) Cleaning summary
     st.subheader("🧾 Cleaning Summary (Base Options)")
@@ -171,23 +246,14 @@ if uploaded:
     st.subheader("⬇️ Download Cleaned File")
     col1, col2 = st.columns(2)
     with col1:
-        csv_bytes = df_cleaned.to_csv(index=False).encode("utf-8")
-        st.download_button(
-            label="Download as CSV",
-            data=csv_bytes,
-            file_name="cleaned.csv",
-            mime="text/csv",
-        )
+        _download_button(df_cleaned, "csv", "Download as CSV", "cleaned.csv", clean_key)
     with col2:
-        xls_buffer = io.BytesIO()
-        with pd.ExcelWriter(xls_buffer, engine="openpyxl") as writer:
-            df_cleaned.to_excel(writer, index=False, sheet_name="Cleaned Data")
-        st.download_button(
-            label="Download as Excel (.xlsx)",
-            data=xls_buffer.getvalue(),
-            file_name="cleaned.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        _download_button(
+            df_cleaned, "xlsx", "Download as Excel (.xlsx)", "cleaned.xlsx", clean_key,
+            sheet_name="Cleaned Data",
         )
+    if EXPORT_COLUMNAR:
+        _columnar_downloads(df_cleaned, "cleaned", clean_key)
 else:
     st.info("Upload a CSV/XLSX file to start cleaning. Need a sample? Open the expander above and download `sample.csv`.")
 
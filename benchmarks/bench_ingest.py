@@ -0,0 +1,80 @@
+# benchmarks/bench_ingest.py
+# Parse time and peak RSS of the old decode + StringIO + pd.read_csv path versus
+# readers.read_csv_bytes (pyarrow). Each measurement runs in a fresh process so
+# the peak RSS reflects only that reader. The last two rows include reading the
+# file: into a bytes object first, or memory-mapped (readers.read_csv_path,
+# byte ranges parsed on one thread per CPU).
+# Run from the repo root:  python -m benchmarks.bench_ingest [rows]
+import io
+import os
+import sys
+import time
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+
+from cli import peak_rss
+
+def make_csv(rows: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "Full Name": rng.choice(["  Alice ", "Bob", "Charlie  ", "Dana"], rows),
+            "Email": [f"user{i}@example.com" for i in rng.integers(0, rows, rows)],
+            "Amount (INR)": [f"{v:,}" for v in rng.integers(0, 2_000_000, rows)],
+            "Order Date": rng.choice(["2024-01-05", "05/01/2024", "Jan 5, 2024"], rows),
+            "Qty": rng.integers(0, 100, rows),
+            "Price": rng.random(rows) * 100,
+            "Notes": rng.choice(["", "  fragile ", "gift", "n/a"], rows),
+        }
+    )
+    return df.to_csv(index=False).encode("utf-8")
+
+def _read_pandas(data: bytes):
+    from cleaner import detect_delimiter
+    content = data.decode("utf-8", errors="ignore")
+    return pd.read_csv(io.StringIO(content), delimiter=detect_delimiter(content))
+
+def _read_arrow(data: bytes):
+    from readers import read_csv_bytes
+    return read_csv_bytes(data, engine="pyarrow")
+
+def _read_file(path: str):
+    with open(path, "rb") as fh:
+        return _read_arrow(fh.read())
+
+def _read_mapped(path: str):
+    from readers import read_csv_path
+    return read_csv_path(path)
+
+def _measure(name, path, queue):
+    data = None
+    if name in ("pandas", "pyarrow"):
+        with open(path, "rb") as fh:
+            data = fh.read()
+    base = peak_rss()
+    t0 = time.perf_counter()
+    readers = {"pandas": _read_pandas, "pyarrow": _read_arrow, "file+pyarrow": _read_file, "mmap": _read_mapped}
+    df = readers[name](path if data is None else data)
+    elapsed = time.perf_counter() - t0
+    queue.put((elapsed, peak_rss() - base, df.shape))
+
+def main(rows: int = 1_000_000):
+    import tempfile
+    data = make_csv(rows)
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as fh:
+        fh.write(data)
+        path = fh.name
+    print(f"{rows} rows, {len(data) / 2**20:.1f} MiB")
+    ctx = mp.get_context("spawn")
+    for name in ("pandas", "pyarrow", "file+pyarrow", "mmap"):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_measure, args=(name, path, queue))
+        proc.start()
+        elapsed, peak, shape = queue.get()
+        proc.join()
+        print(f"{name:12s} {elapsed:8.3f}s  peak RSS +{peak / 2**20:8.1f} MiB  shape={shape}")
+    os.unlink(path)
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
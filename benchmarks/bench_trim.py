@@ -0,0 +1,59 @@
+# benchmarks/bench_trim.py
+# Compares the old cell-by-cell applymap trim with cleaner.trim_whitespace().
+# Run from the repo root:  python -m benchmarks.bench_trim [rows] [cols]
+import sys
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+from cleaner import trim_whitespace
+
+def make_frame(rows: int, cols: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    words = np.array(["alpha", " beta", "gamma ", "  delta  ", "1,200", " 300 ", ""], dtype=object)
+    data = {}
+    for i in range(cols):
+        kind = i % 5
+        if kind == 0:
+            data[f"text_{i}"] = words[rng.integers(0, len(words), rows)]
+        elif kind == 1:
+            col = words[rng.integers(0, len(words), rows)].copy()
+            col[rng.random(rows) < 0.1] = None
+            data[f"nullable_{i}"] = col
+        elif kind == 2:
+            # mixed object column: strings, ints and NaN in the same column
+            col = words[rng.integers(0, len(words), rows)].copy()
+            col[rng.random(rows) < 0.2] = 7
+            col[rng.random(rows) < 0.1] = np.nan
+            data[f"mixed_{i}"] = col
+        elif kind == 3:
+            # object column without strings (Excel reads): floats and None
+            col = rng.random(rows).astype(object)
+            col[rng.random(rows) < 0.1] = None
+            data[f"objnum_{i}"] = col
+        else:
+            data[f"num_{i}"] = rng.random(rows)
+    return pd.DataFrame(data)
+
+def trim_applymap(df: pd.DataFrame) -> pd.DataFrame:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        return df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+
+def _timed(fn, df):
+    t0 = time.perf_counter()
+    out = fn(df)
+    return out, time.perf_counter() - t0
+
+def main(rows: int = 500_000, cols: int = 40):
+    df = make_frame(rows, cols)
+    old, t_old = _timed(trim_applymap, df)
+    new, t_new = _timed(trim_whitespace, df)
+    pd.testing.assert_frame_equal(old, new)
+    print(f"{rows} rows x {cols} cols")
+    print(f"applymap:        {t_old:8.3f}s")
+    print(f"trim_whitespace: {t_new:8.3f}s  ({t_old / t_new:.1f}x), output identical")
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
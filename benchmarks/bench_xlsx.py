@@ -0,0 +1,66 @@
+# benchmarks/bench_xlsx.py
+# Write time, peak RSS and file size of the XLSX engines in exports.XLSX_ENGINES:
+# the old pandas/openpyxl path, openpyxl write-only mode, and the streaming
+# writer (serial, and with sheets rendered in parallel). Each measurement runs in
+# a fresh process so the peak RSS reflects only that engine.
+# Run from the repo root:  python -m benchmarks.bench_xlsx [rows ...] [--full]
+# The openpyxl engines take many minutes past 1M rows; they are skipped there
+# unless --full is given.
+import os
+import sys
+import time
+import tempfile
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_ingest import peak_rss
+
+SLOW_ENGINES = ("openpyxl", "openpyxl_write_only")
+SLOW_LIMIT = 1_000_000
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "full_name": rng.choice(["Alice", "Bob", "Charlie", "Dana"], rows).astype(object),
+            "email": np.array([f"user{i}@example.com" for i in rng.integers(0, rows, rows)], dtype=object),
+            "amount": rng.integers(0, 2_000_000, rows),
+            "order_date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+            "price": rng.random(rows) * 100,
+            "in_stock": rng.random(rows) < 0.5,
+        }
+    )
+
+def _measure(engine, workers, rows, queue):
+    from exports import write_xlsx
+    df = make_frame(rows)
+    base = peak_rss()
+    with tempfile.NamedTemporaryFile(suffix=".xlsx") as fh:
+        t0 = time.perf_counter()
+        write_xlsx(df, fh.name, sheet_name="Cleaned Data", engine=engine, workers=workers)
+        elapsed = time.perf_counter() - t0
+        size = os.path.getsize(fh.name)
+    queue.put((elapsed, peak_rss() - base, size))
+
+def main(sizes=(100_000,), full: bool = False):
+    from exports import XLSX_ENGINES
+    workers = os.cpu_count() or 1
+    runs = [(name, 1, name) for name in XLSX_ENGINES] + [("stream", workers, f"stream x{workers} workers")]
+    ctx = mp.get_context("spawn")
+    for rows in sizes:
+        print(f"{rows} rows")
+        for engine, workers, label in runs:
+            if engine in SLOW_ENGINES and rows > SLOW_LIMIT and not full:
+                print(f"  {label:22s} skipped (pass --full)")
+                continue
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_measure, args=(engine, workers, rows, queue))
+            proc.start()
+            elapsed, peak, size = queue.get()
+            proc.join()
+            print(f"  {label:22s} {elapsed:8.2f}s  peak RSS +{peak / 2**20:8.1f} MiB  {size / 2**20:8.1f} MiB")
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--full"]
+    main([int(a) for a in args] or (100_000,), full="--full" in sys.argv)
@@ -0,0 +1,59 @@
+# benchmarks/messy.py
+# Synthetic inputs shaped like the files the app is meant for: names with stray
+# padding, amounts with thousands separators (some padded, some blank), dates in
+# several formats within one column, integer columns stored as text, free-text
+# notes, a fully empty column, fully empty rows and duplicated rows.
+# Values are drawn from small pre-formatted pools, so 10M rows build in seconds.
+import numpy as np
+import pandas as pd
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+DUPLICATE_FRACTION = 0.05
+EMPTY_ROW_FRACTION = 0.02
+
+_NAMES = np.array(["Alice", "  Bob", "Charlie  ", " Dana ", "Eve", "Frank", "Grace ", "  Heidi"], dtype=object)
+_NOTES = np.array(["", "  fragile ", "gift", "n/a", None, "call before delivery  ", "  "], dtype=object)
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%b %d, %Y", "%Y/%m/%d")
+
+def parse_size(text) -> int:
+    """'10k', '1m', '10m' (see SIZES) or a plain row count."""
+    text = str(text).lower().replace("_", "")
+    return SIZES[text] if text in SIZES else int(text)
+
+def _pool(rng, n, fmt, low, high):
+    return np.array([fmt(v) for v in rng.integers(low, high, n)], dtype=object)
+
+def make_messy_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """An all-text frame, as read from a messy CSV."""
+    rng = np.random.default_rng(seed)
+    amounts = _pool(rng, 50_000, lambda v: f"{v:,}", 0, 5_000_000)
+    amounts[::7] = [f" {a} " for a in amounts[::7]]
+    amounts[::97] = ""
+    days = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, 5_000), unit="D")
+    dates = np.array([d.strftime(_DATE_FORMATS[i % len(_DATE_FORMATS)]) for i, d in enumerate(days)], dtype=object)
+    qty = _pool(rng, 1_000, str, 0, 1_000)
+
+    df = pd.DataFrame(
+        {
+            "Full Name": _NAMES[rng.integers(0, len(_NAMES), rows)],
+            "Email": "user" + pd.Series(rng.integers(0, max(rows, 1), rows)).astype(str) + "@example.com",
+            "Amount (INR)": amounts[rng.integers(0, len(amounts), rows)],
+            "Order Date": dates[rng.integers(0, len(dates), rows)],
+            "Qty": qty[rng.integers(0, len(qty), rows)],
+            "Notes": _NOTES[rng.integers(0, len(_NOTES), rows)],
+            "Unused": np.full(rows, None, dtype=object),
+        }
+    )
+    # duplicates: some rows repeat an earlier row
+    idx = np.arange(rows)
+    dup = np.flatnonzero(rng.random(rows) < DUPLICATE_FRACTION)
+    idx[dup] = (rng.random(len(dup)) * np.maximum(dup, 1)).astype(np.int64)
+    df = df.take(idx).reset_index(drop=True)
+    # fully empty rows
+    empty = rng.random(rows) < EMPTY_ROW_FRACTION
+    df.loc[empty, :] = None
+    return df
+
+def make_messy_csv(rows: int, seed: int = 0) -> bytes:
+    return make_messy_frame(rows, seed).to_csv(index=False).encode("utf-8")
@@ -0,0 +1,190 @@
+# benchmarks/suite.py
+# Regression benchmarks for the cleaning pipeline on benchmarks.messy inputs.
+# For each size, in a fresh process: delimiter sniffing, CSV parsing, every
+# clean_dataframe step (pipeline.CleaningDAG timings), data_quality_report and
+# ai_apply_instructions_safe are timed, then run again under tracemalloc for
+# their peak allocation; the process's peak RSS is recorded too.
+#
+# Results are compared with a stored baseline; a metric regresses when it is
+# more than --threshold above the baseline (and above a small absolute noise
+# floor). Baselines are machine-specific: save one on the machine that checks.
+# Run from the repo root:
+#   python -m benchmarks.suite 10k 1m --save-baseline     # record
+#   python -m benchmarks.suite 10k 1m                     # compare; exit 1 on regression
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import multiprocessing as mp
+
+from benchmarks.messy import make_messy_csv, parse_size
+from cli import peak_rss
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+NOISE_FLOOR = {"seconds": 0.005, "peak_bytes": 1 << 20}
+INSTRUCTIONS = (
+    "rename full_name -> name\n"
+    "drop rows where email is null\n"
+    "fill nulls in amount_inr_ with 0\n"
+    "convert qty to numeric\n"
+    "parse order_date as date"
+)
+CLEAN_OPTIONS = dict(parse_dates=True)
+
+def _timed(fn, repeat: int = 1):
+    # best of `repeat`: the run least disturbed by the rest of the machine
+    best, out = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return out, best
+
+def _traced(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run_size(rows: int, memory: bool = True) -> dict:
+    """All metrics for one input size, as {"case.metric": value}."""
+    from ai_helper import ai_apply_instructions_safe, data_quality_report
+    from cleaner import detect_delimiter
+    from pipeline import CleaningDAG
+    from profiler import clear_profile_cache
+    from readers import read_csv_bytes
+
+    data = make_messy_csv(rows)
+    base_rss = peak_rss()
+    repeat = 5 if rows <= 100_000 else 1
+    metrics = {"input.bytes": len(data)}
+    sample = data[:65536].decode("utf-8", errors="ignore")
+
+    cases = {
+        "detect_delimiter": lambda: detect_delimiter(sample),
+        "read_csv": lambda: read_csv_bytes(data),
+    }
+    results = {}
+    for name, fn in cases.items():
+        results[name], metrics[f"{name}.seconds"] = _timed(fn, repeat)
+    df = results["read_csv"]
+
+    dag = CleaningDAG()
+    best = {}
+    for _ in range(repeat):
+        cleaned = dag.run(df, **CLEAN_OPTIONS)
+        for r in dag.last_run:
+            if r.enabled:
+                best[r.step] = min(best.get(r.step, r.seconds), r.seconds)
+    for step, seconds in best.items():
+        metrics[f"clean.{step}.seconds"] = seconds
+    metrics["clean.seconds"] = sum(best.values())
+    metrics["clean.rows_out"] = len(cleaned)
+
+    def report():
+        clear_profile_cache()  # time the profiling, not the per-frame cache
+        return data_quality_report(df, cleaned)
+
+    later = {
+        "data_quality_report": report,
+        "ai_apply_instructions_safe": lambda: ai_apply_instructions_safe(cleaned, INSTRUCTIONS),
+    }
+    for name, fn in later.items():
+        _, metrics[f"{name}.seconds"] = _timed(fn, repeat)
+
+    if memory:
+        for name, fn in {**cases, **later}.items():
+            metrics[f"{name}.peak_bytes"] = _traced(fn)
+        report = []
+        dag.run(df, memory_report=report, **CLEAN_OPTIONS)
+        for entry in report:
+            metrics[f"clean.{entry['step']}.peak_bytes"] = entry["peak_bytes"]
+    metrics["process.peak_rss_bytes"] = peak_rss() - base_rss
+    return metrics
+
+def _run_in_process(rows: int, memory: bool, queue):
+    queue.put(run_size(rows, memory))
+
+def run_suite(sizes, memory: bool = True) -> dict:
+    ctx = mp.get_context("spawn")
+    results = {}
+    for label in sizes:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_in_process, args=(parse_size(label), memory, queue))
+        proc.start()
+        results[str(label)] = queue.get()
+        proc.join()
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """(size, metric, baseline, current, ratio) for every metric that regressed."""
+    regressions = []
+    for size, metrics in results.items():
+        for metric, value in metrics.items():
+            kind = metric.rsplit(".", 1)[-1]
+            old = baseline.get(size, {}).get(metric)
+            if kind not in NOISE_FLOOR or old is None:
+                continue
+            if value > old * (1 + threshold) and value - old > NOISE_FLOOR[kind]:
+                regressions.append((size, metric, old, value, value / old if old else float("inf")))
+    return regressions
+
+def _fmt(metric: str, value) -> str:
+    if metric.endswith("seconds"):
+        return f"{value:10.4f}s"
+    if metric.endswith("bytes"):
+        return f"{value / 2**20:10.1f} MiB"
+    return f"{value:>11}"
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    p.add_argument("sizes", nargs="*", default=["10k", "1m"], help="row counts: 10k, 100k, 1m, 10m or a number")
+    p.add_argument("--baseline", default=DEFAULT_BASELINE)
+    p.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown (0.25 = 25%%)")
+    p.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    p.add_argument("--out", help="also write the results as JSON here")
+    args = p.parse_args(argv)
+
+    results = run_suite(args.sizes, memory=not args.no_memory)
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh).get("results", {})
+
+    for size, metrics in results.items():
+        print(f"{size} rows")
+        for metric, value in metrics.items():
+            old = baseline.get(size, {}).get(metric)
+            delta = f"  ({(value / old - 1) * 100:+6.1f}%)" if old else ""
+            print(f"  {metric:44s} {_fmt(metric, value)}{delta}")
+
+    payload = {"machine": platform.platform(), "python": platform.python_version(), "results": results}
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(payload, fh, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as fh:
+            json.dump(payload, fh, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if not baseline:
+        print("no baseline to compare with (run with --save-baseline first)")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for size, metric, old, new, ratio in regressions:
+        print(f"REGRESSION {size} {metric}: {_fmt(metric, old).strip()} -> {_fmt(metric, new).strip()} ({ratio:.2f}x)")
+    if not regressions:
+        print(f"no regressions beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# cache.py
+import hashlib
+import sys
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# ---------------- Result cache ----------------
+# Streamlit re-executes app.py on every widget interaction. ResultCache memoizes
+# the expensive results (parsed frame, cleaned frame, report, downloads) under
+# content-addressed keys: the hash of the uploaded bytes plus the options that
+# produced the result. Derived results key on their parent's key, so toggling
+# one option only recomputes what depends on it. Entries are evicted least
+# recently used first once their estimated size exceeds `memory_budget`.
+#
+# Sizes are counted per column buffer, not per entry: the DAG caches one frame
+# per step, and the shallow copies between steps share every column a step did
+# not replace, so a buffer held by several entries counts once. Object columns
+# are sized from a sample of their values instead of a deep memory_usage() scan.
+
+DEFAULT_CACHE_BUDGET = 512 * 1024 * 1024
+OBJECT_SAMPLE = 1_000              # values sampled to size an object column
+
+def fingerprint_bytes(data) -> str:
+    """Content hash of a bytes-like object (hashed in place, no copy)."""
+    return hashlib.blake2b(memoryview(data), digest_size=16).hexdigest()
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a frame: cell values (per-row hashes), column names and dtypes."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    return h.hexdigest()
+
+def options_key(**options) -> tuple:
+    return tuple(sorted(options.items()))
+
+def _column_buffers(s: pd.Series):
+    # the storage behind one column, keyed by its address so shallow copies share it;
+    # object columns add an estimate of their Python objects from a strided sample
+    if isinstance(s.dtype, np.dtype):
+        a = s.to_numpy()
+        nbytes = a.nbytes
+        if a.dtype == object and len(a):
+            sample = a[:: max(1, len(a) // OBJECT_SAMPLE)]
+            nbytes += int(sum(map(sys.getsizeof, sample)) / len(sample) * len(a))
+        return (("np", a.__array_interface__["data"][0], a.shape, a.strides), nbytes)
+    return (("ea", id(s.array)), int(s.array.nbytes))
+
+def _buffers(value):
+    """Yields (key, nbytes) for each piece of storage `value` holds."""
+    if isinstance(value, pd.DataFrame):
+        for i in range(value.shape[1]):
+            yield _column_buffers(value.iloc[:, i])
+        yield ("index", id(value.index)), value.index.memory_usage()
+    elif isinstance(value, pd.Series):
+        yield _column_buffers(value)
+        yield ("index", id(value.index)), value.index.memory_usage()
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        yield ("obj", id(value)), memoryview(value).nbytes
+    elif isinstance(value, str):
+        yield ("obj", id(value)), len(value)
+    elif isinstance(value, (tuple, list)):
+        yield ("obj", id(value)), sys.getsizeof(value)
+        for v in value:
+            yield from _buffers(v)
+    else:
+        yield ("obj", id(value)), sys.getsizeof(value)
+
+def estimate_nbytes(value) -> int:
+    """Approximate bytes held by `value`; storage shared between its parts counts once."""
+    return sum(dict(_buffers(value)).values())
+
+class ResultCache:
+    """
+    LRU cache with a memory budget.
+
+        cache = ResultCache(memory_budget=256 * 2**20)
+        df = cache.get_or_compute(("read", fingerprint_bytes(buf)), lambda: read_csv_bytes(buf))
+    """
+
+    def __init__(self, memory_budget: int = DEFAULT_CACHE_BUDGET):
+        self.memory_budget = memory_budget
+        self._entries = OrderedDict()  # key -> (value, buffer keys)
+        self._buffers = {}             # buffer key -> [nbytes, entries holding it]
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        if key not in self._entries:
+            return default
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key, value, nbytes: int = None) -> None:
+        buffers = dict(_buffers(value)) if nbytes is None else {("entry", key): nbytes}
+        self.discard(key)
+        if sum(buffers.values()) > self.memory_budget:
+            return  # would evict everything else and still not fit
+        for k, size in buffers.items():
+            held = self._buffers.setdefault(k, [size, 0])
+            if not held[1]:
+                self.nbytes += size
+            held[1] += 1
+        self._entries[key] = (value, list(buffers))
+        while self.nbytes > self.memory_budget:
+            _, (_, keys) = self._entries.popitem(last=False)
+            self._release(keys)
+
+    def get_or_compute(self, key, compute):
+        if key in self._entries:
+            self.hits += 1
+            return self.get(key)
+        self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def _release(self, keys) -> None:
+        for k in keys:
+            held = self._buffers[k]
+            held[1] -= 1
+            if not held[1]:
+                del self._buffers[k]
+                self.nbytes -= held[0]
+
+    def discard(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._release(entry[1])
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._buffers.clear()
+        self.nbytes = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self), "nbytes": self.nbytes, "hits": self.hits, "misses": self.misses}
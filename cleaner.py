@@ -1,13 +1,12 @@
-
 import re
 import pandas as pd
 import numpy as np
 
+from dialect import sniff_dialect
+from inference import convert_column, header_signature, is_text_dtype
+
 def detect_delimiter(sample: str, default=","):
-    candidates = [",",";","|","\t"]
-    counts = {d: sample.count(d) for d in candidates}
-    best = max(counts, key=counts.get)
-    return default if counts[best] == 0 else best
+    return sniff_dialect(sample, default=default).delimiter
 
 def standardize_column_name(name: str) -> str:
     name = name.strip()
@@ -16,24 +15,79 @@ def standardize_column_name(name: str) -> str:
     return name.lower()
 
 def coerce_numeric_series(s: pd.Series) -> pd.Series:
-    if s.dtype.kind in "biufc":
+    return convert_column(s, fix_numbers=True, parse_dates=False)[0]
+
+TRIM_SAMPLE_ROWS = 10_000
+
+def _strip_object_values(values) -> np.ndarray:
+    return np.array([x.strip() if isinstance(x, str) else x for x in values], dtype=object)
+
+def trim_series(s: pd.Series) -> pd.Series:
+    if is_text_dtype(s.dtype) and s.dtype != object:
+        return s.str.strip()
+    if s.dtype != object:
         return s
-    s2 = s.astype(str).str.replace(",", "", regex=False).str.strip()
-    return pd.to_numeric(s2, errors="ignore")
+
+    # Low-cardinality columns (the usual case in CSV exports): strip each distinct
+    # value once and broadcast it back through the factorize codes.
+    head = s.iloc[:TRIM_SAMPLE_ROWS]
+    if len(s) > 100 and pd.unique(head).size * 2 < len(head):
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+        uniques = np.asarray(uniques, dtype=object)
+        is_text = np.array([isinstance(x, str) for x in uniques], dtype=bool)
+        if not is_text.any():
+            return s
+        values = _strip_object_values(uniques).take(codes)
+        # factorize merges equal non-text values (1, 1.0, True), so those and the
+        # missing cells are copied back from the original column
+        restore = codes == -1
+        if not is_text.all():
+            restore |= ~is_text[np.maximum(codes, 0)]
+        if restore.any():
+            values[restore] = s.to_numpy()[restore]
+        return pd.Series(values, index=s.index, name=s.name)
+
+    if pd.api.types.infer_dtype(s, skipna=True) not in ("string", "mixed"):
+        # .str raises on object columns without strings (numbers, dates, booleans, bytes)
+        return s.map(lambda x: x.strip() if isinstance(x, str) else x)
+    stripped = s.str.strip()
+    # .str yields NaN for non-str cells (numbers, None-like objects); keep those as they were
+    return stripped.where(stripped.notna(), s)
+
+def trim_whitespace(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    out = df if inplace else df.copy(deep=False)
+    for i in range(out.shape[1]):
+        s = out.iloc[:, i]
+        trimmed = trim_series(s)
+        if trimmed is not s:
+            out.isetitem(i, trimmed)
+    return out
+
+def parse_date_series(s: pd.Series) -> pd.Series:
+    return convert_column(s, fix_numbers=False, parse_dates=True)[0]
+
+def convert_columns(df: pd.DataFrame, fix_numbers: bool, parse_dates: bool, column_types: dict = None) -> pd.DataFrame:
+    """Numeric and date conversion fused per column: one scan decides and converts both."""
+    signature = header_signature(df.columns)
+    for i in range(df.shape[1]):
+        s = df.iloc[:, i]
+        plan = column_types.get(df.columns[i]) if column_types is not None else None
+        converted, plan = convert_column(
+            s, fix_numbers=fix_numbers, parse_dates=parse_dates, plan=plan,
+            cache_key=(df.columns[i], signature),
+        )
+        if column_types is not None:
+            column_types[df.columns[i]] = plan
+        if converted is not s:
+            df.isetitem(i, converted)
+    return df
 
 def try_parse_dates(df: pd.DataFrame) -> pd.DataFrame:
-    for col in df.columns:
-        if df[col].dtype == object:
-            sample = df[col].dropna().astype(str).head(20)
-            ok = 0
-            for v in sample:
-                try:
-                    pd.to_datetime(v, errors="raise")
-                    ok += 1
-                except Exception:
-                    pass
-            if ok >= 3:
-                df[col] = pd.to_datetime(df[col], errors="coerce")
+    for i in range(df.shape[1]):
+        s = df.iloc[:, i]
+        parsed = parse_date_series(s)
+        if parsed is not s:
+            df.isetitem(i, parsed)
     return df
 
 def clean_dataframe(
@@ -45,29 +99,41 @@ def clean_dataframe(
     drop_duplicates: bool = True,
     fix_numbers: bool = True,
     parse_dates: bool = False,
+    inplace: bool = False,
+    memory_report: list = None,
+    deduplicator=None,
+    workers: int = 1,
+    column_types: dict = None,
+    step_metrics: list = None,
 ) -> pd.DataFrame:
-    out = df.copy()
-
-    if trim_spaces:
-        out = out.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-
-    if standardize_columns:
-        out.columns = [standardize_column_name(c) for c in out.columns]
-
-    if drop_empty_rows:
-        out = out.dropna(how="all")
-
-    if drop_empty_cols:
-        out = out.dropna(axis=1, how="all")
-
-    if drop_duplicates:
-        out = out.drop_duplicates()
-
-    if fix_numbers:
-        for col in out.columns:
-            out[col] = coerce_numeric_series(out[col])
-
-    if parse_dates:
-        out = try_parse_dates(out)
-
-    return out.reset_index(drop=True)
+    """
+    Without `inplace`, works on a shallow copy: steps replace whole columns or build a
+    filtered frame, so the input is never written to and never deep-copied up front.
+    With `inplace=True` the input frame itself is cleaned and returned.
+    Pass a list as `memory_report` to get one {"step", "peak_bytes", "net_bytes"} entry per step.
+    Pass a dedup.RowDeduplicator as `deduplicator` to drop duplicates by fingerprint
+    (bounded memory, and shared across calls) instead of DataFrame.duplicated().
+    With `workers` > 1 the per-column steps (trim, numbers, dates) run on a process pool.
+    Pass a dict as `column_types` to receive the inferred inference.ColumnPlan per column;
+    plans already in it are reused instead of re-inferred.
+    Pass a list as `step_metrics` to get a metrics.StepMetrics per step (wall/CPU time,
+    rows and columns in/out, columns touched) followed by one for the whole run.
+    The steps run as pipeline.CleaningDAG nodes; use CleaningDAG with a cache to memoize them.
+    """
+    from pipeline import CleaningDAG
+    return CleaningDAG().run(
+        df,
+        inplace=inplace,
+        memory_report=memory_report,
+        deduplicator=deduplicator,
+        workers=workers,
+        column_types=column_types,
+        step_metrics=step_metrics,
+        trim_spaces=trim_spaces,
+        standardize_columns=standardize_columns,
+        drop_empty_rows=drop_empty_rows,
+        drop_empty_cols=drop_empty_cols,
+        drop_duplicates=drop_duplicates,
+        fix_numbers=fix_numbers,
+        parse_dates=parse_dates,
+    )
@@ -0,0 +1,261 @@
+# cli.py
+# Headless entry point: cleans CSV/XLSX files from the command line, without
+# Streamlit, with the same options as the app's sidebar.
+#
+#   python -m cli data/*.csv reports/ -o cleaned/ --format parquet --jobs 4
+#
+# Files run concurrently on a process pool, one fresh worker process per file
+# (so each file's peak RSS is its own). A file is started only while the
+# estimated memory of the files in flight stays under --memory-mb; one file is
+# always allowed to run, however large. Each cleaned file is written to the
+# output directory, and one JSON record per file (rows in/out, timings, peak
+# memory, errors) is written to the summary file.
+#
+# With --recipe (a recipes.Recipe saved as JSON) every file is cleaned exactly as
+# recorded, without sniffing or type inference, and each record lists the
+# schema drift found; --strict turns drift into a failed file.
+import os
+import sys
+import glob
+import json
+import time
+import resource
+import argparse
+import multiprocessing as mp
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+INPUT_SUFFIXES = (".csv", ".xlsx", ".xls")
+# in-memory frame size per byte of input, for the in-flight budget (xlsx is zip-compressed)
+EXPANSION = {".csv": 6, ".xlsx": 25, ".xls": 10}
+DEFAULT_MEMORY_MB = 2048
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    # VmHWM, unlike ru_maxrss, is not inherited across exec from the parent
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+# ---------------- Inputs ----------------
+def collect_inputs(patterns, recursive: bool = False) -> list:
+    """Expands files, directories and glob patterns to a sorted, de-duplicated list of CSV/XLSX paths."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            walk = "**/*" if recursive else "*"
+            matches = glob.glob(os.path.join(pattern, walk), recursive=recursive)
+        elif glob.has_magic(pattern):
+            matches = glob.glob(pattern, recursive=True)
+        else:
+            matches = [pattern]
+        paths.extend(p for p in matches if p.lower().endswith(INPUT_SUFFIXES) and os.path.isfile(p))
+    seen, out = set(), []
+    for p in sorted(paths):
+        key = os.path.realpath(p)
+        if key not in seen:
+            seen.add(key)
+            out.append(p)
+    return out
+
+def estimate_memory(path: str) -> int:
+    suffix = os.path.splitext(path)[1].lower()
+    return os.path.getsize(path) * EXPANSION.get(suffix, 6)
+
+def _output_paths(inputs, out_dir: str, fmt: str) -> list:
+    # inputs from different directories may share a file name: number the repeats
+    used, out = set(), []
+    for path in inputs:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, n = f"{stem}.{fmt}", 2
+        while name in used:
+            name, n = f"{stem}-{n}.{fmt}", n + 1
+        used.add(name)
+        out.append(os.path.join(out_dir, name))
+    return out
+
+# ---------------- One file ----------------
+def clean_file(path: str, out_path: str, fmt: str = "csv", sheet: str = None, recipe: dict = None,
+               strict: bool = False, read_workers: int = 1, **options) -> dict:
+    """
+    Reads, cleans and writes one file; returns its summary record. `options` are
+    cleaner.clean_dataframe keyword arguments; with `recipe` (Recipe.to_dict()) the
+    file is replayed through it instead. Errors are reported in the record.
+    The file is memory-mapped; CSVs are parsed on `read_workers` threads.
+    """
+    from cleaner import clean_dataframe
+    from exports import EXPORT_WRITERS
+    from readers import map_file, read_csv_bytes, read_excel_bytes
+    from recipes import Recipe, replay_recipe
+
+    record = {"input": path, "output": out_path, "status": "ok"}
+    base = peak_rss()
+    t0 = time.perf_counter()
+    try:
+        data = map_file(path)
+        if recipe is not None:
+            # reading and cleaning are one replay: the read time is included in "clean"
+            t1 = time.perf_counter()
+            replay = replay_recipe(Recipe.from_dict(recipe), data, strict=strict, read_workers=read_workers)
+            del data
+            df = replay.df
+            record.update(rows_in=replay.rows_in, cols_in=replay.cols_in,
+                          drift=[d.to_dict() for d in replay.drift], instructions=replay.log)
+        else:
+            if path.lower().endswith(".csv"):
+                df = read_csv_bytes(data, workers=read_workers)
+            else:
+                df = read_excel_bytes(data, sheets=sheet)
+            del data
+            t1 = time.perf_counter()
+            record.update(rows_in=len(df), cols_in=df.shape[1], source=df.attrs.get("source"))
+            df = clean_dataframe(df, inplace=True, **options)
+        t2 = time.perf_counter()
+        record.update(rows_out=len(df), cols_out=df.shape[1])
+
+        with open(out_path, "wb") as fh:
+            if fmt == "xlsx":
+                EXPORT_WRITERS[fmt](df, fh, sheet_name="Cleaned Data")
+            else:
+                EXPORT_WRITERS[fmt](df, fh)
+        t3 = time.perf_counter()
+        record["seconds"] = {"read": t1 - t0, "clean": t2 - t1, "write": t3 - t2, "total": t3 - t0}
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}", output=None)
+        record["seconds"] = {"total": time.perf_counter() - t0}
+    record["peak_rss_bytes"] = peak_rss() - base
+    return record
+
+# ---------------- Batch ----------------
+def _mp_context():
+    # a fresh process per file (max_tasks_per_child) rules out fork; the forkserver
+    # imports pandas and the cleaning modules once and forks workers from there
+    if "forkserver" not in mp.get_all_start_methods():
+        return mp.get_context("spawn")
+    ctx = mp.get_context("forkserver")
+    ctx.set_forkserver_preload(["pandas", "cleaner", "readers", "exports"])
+    return ctx
+
+def run_batch(inputs, out_dir: str, fmt: str = "csv", jobs: int = None, memory_budget: int = None,
+              sheet: str = None, progress=None, **options) -> list:
+    """
+    Cleans `inputs` into `out_dir` on a pool of `jobs` processes, starting a file only
+    while the estimated memory in flight fits `memory_budget` bytes. Returns one
+    summary record per input, in input order. `progress(record)` is called as each file ends.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+    options.setdefault("read_workers", max(1, (os.cpu_count() or 1) // jobs))
+    budget = memory_budget or DEFAULT_MEMORY_MB * 1024 * 1024
+    outputs = _output_paths(inputs, out_dir, fmt)
+    pending = list(zip(inputs, outputs, [estimate_memory(p) for p in inputs]))
+    pending.reverse()  # pop() from the end keeps input order
+    records, in_flight, running = {}, 0, {}
+
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=_mp_context(), max_tasks_per_child=1) as pool:
+        while pending or running:
+            while pending and len(running) < jobs and (not running or in_flight + pending[-1][2] <= budget):
+                path, out_path, estimate = pending.pop()
+                fut = pool.submit(clean_file, path, out_path, fmt=fmt, sheet=sheet, **options)
+                running[fut] = (path, estimate)
+                in_flight += estimate
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                path, estimate = running.pop(fut)
+                in_flight -= estimate
+                try:
+                    record = fut.result()
+                except Exception as e:  # the worker itself died (e.g. killed for memory)
+                    record = {"input": path, "output": None, "status": "error", "error": f"{type(e).__name__}: {e}"}
+                record["estimated_bytes"] = estimate
+                records[path] = record
+                if progress:
+                    progress(record)
+    return [records[p] for p in inputs]
+
+# ---------------- Command line ----------------
+def build_parser() -> argparse.ArgumentParser:
+    from exports import EXPORT_WRITERS
+    p = argparse.ArgumentParser(prog="python -m cli", description="Clean CSV/XLSX files without the web UI.")
+    p.add_argument("inputs", nargs="+", help="files, directories or glob patterns (quote globs for **)")
+    p.add_argument("-o", "--out-dir", default="cleaned", help="output directory (default: cleaned)")
+    p.add_argument("-f", "--format", default="csv", choices=sorted(EXPORT_WRITERS), help="output format")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="files cleaned concurrently (default: CPU count)")
+    p.add_argument("--memory-mb", type=int, default=DEFAULT_MEMORY_MB,
+                   help=f"estimated memory of files in flight (default: {DEFAULT_MEMORY_MB})")
+    p.add_argument("--summary", default=None, help="summary JSON path (default: OUT_DIR/summary.json)")
+    p.add_argument("--sheet", default=None, help="Excel sheet to read (default: first)")
+    p.add_argument("-r", "--recursive", action="store_true", help="search directories recursively")
+    p.add_argument("-q", "--quiet", action="store_true", help="no per-file progress lines")
+    p.add_argument("--recipe", default=None, help="replay this recipe JSON (recipes.py) instead of the cleaning options")
+    p.add_argument("--strict", action="store_true", help="with --recipe: fail files whose schema drifted")
+
+    # the sidebar checkboxes, with the same defaults
+    g = p.add_argument_group("cleaning options")
+    g.add_argument("--no-trim", dest="trim_spaces", action="store_false", help="keep spaces around cell text")
+    g.add_argument("--no-standardize-columns", dest="standardize_columns", action="store_false",
+                   help="keep the original column names")
+    g.add_argument("--keep-empty-rows", dest="drop_empty_rows", action="store_false")
+    g.add_argument("--keep-empty-cols", dest="drop_empty_cols", action="store_false")
+    g.add_argument("--keep-duplicates", dest="drop_duplicates", action="store_false")
+    g.add_argument("--no-fix-numbers", dest="fix_numbers", action="store_false",
+                   help="leave numeric-looking text columns as text")
+    g.add_argument("--parse-dates", action="store_true", help="try to parse date columns")
+    return p
+
+CLEAN_OPTIONS = (
+    "trim_spaces", "standardize_columns", "drop_empty_rows", "drop_empty_cols",
+    "drop_duplicates", "fix_numbers", "parse_dates",
+)
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    inputs = collect_inputs(args.inputs, recursive=args.recursive)
+    if not inputs:
+        print("no CSV/XLSX files matched", file=sys.stderr)
+        return 2
+    options = {k: getattr(args, k) for k in CLEAN_OPTIONS}
+    recipe = None
+    if args.recipe:
+        from recipes import Recipe
+        recipe = Recipe.load(args.recipe).to_dict()
+        options = dict(recipe["options"])
+
+    def progress(r):
+        if args.quiet:
+            return
+        if r["status"] == "ok":
+            print(f"{r['input']}: {r['rows_in']} -> {r['rows_out']} rows in {r['seconds']['total']:.2f}s, "
+                  f"peak +{r['peak_rss_bytes'] / 2**20:.0f} MiB -> {r['output']}", file=sys.stderr)
+            for d in r.get("drift", []):
+                print("  drift:", " ".join(str(d[k]) for k in ("kind", "column", "detail") if d[k]), file=sys.stderr)
+        else:
+            print(f"{r['input']}: {r['error']}", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    records = run_batch(
+        inputs, args.out_dir, fmt=args.format, jobs=args.jobs, memory_budget=args.memory_mb * 1024 * 1024,
+        sheet=args.sheet, progress=progress, recipe=recipe, strict=args.strict, **options,
+    )
+    summary_path = args.summary or os.path.join(args.out_dir, "summary.json")
+    summary = {
+        "options": options,
+        "recipe": args.recipe,
+        "format": args.format,
+        "seconds": time.perf_counter() - t0,
+        "files": records,
+    }
+    with open(summary_path, "w", encoding="utf-8") as fh:
+        json.dump(summary, fh, indent=2, default=str)
+    failed = sum(r["status"] != "ok" for r in records)
+    if not args.quiet:
+        print(f"{len(records) - failed}/{len(records)} files cleaned; summary in {summary_path}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+# dedup.py
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+# ---------------- Bounded-memory duplicate removal ----------------
+# RowDeduplicator remembers a 64- or 128-bit fingerprint per distinct row instead
+# of the rows themselves, so it can run over a whole file chunk by chunk
+# (streaming.clean_csv_chunked) or over one frame (clean_dataframe).
+#
+# Fingerprints live in sorted numpy runs (8 or 16 bytes per row). Past
+# `memory_budget` the runs are either spilled to disk as per-partition sorted
+# files (overflow="spill", exact) or folded into a Bloom filter
+# (overflow="bloom", approximate: a unique row is dropped with probability
+# ~false_positive_rate, a duplicate is never kept).
+#
+# Rows are hashed with pandas.util.hash_pandas_object, which hashes object cells
+# by their str() value: 1 and "1" in the same object column count as equal.
+
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+_HASH_KEY_2 = "cleanmycsv-dedup"  # 16 chars, second hash for 128-bit fingerprints
+
+def _mix64(h: np.ndarray) -> np.ndarray:
+    # splitmix64 finaliser, used to derive a second Bloom hash from a 64-bit key
+    with np.errstate(over="ignore"):
+        h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return h ^ (h >> np.uint64(31))
+
+class BloomFilter:
+    def __init__(self, capacity: int, false_positive_rate: float = 1e-6):
+        capacity = max(int(capacity), 1)
+        m = int(np.ceil(-capacity * np.log(false_positive_rate) / np.log(2) ** 2))
+        self.n_bits = max(m, 64)
+        self.n_hashes = max(1, int(round(self.n_bits / capacity * np.log(2))))
+        self.bits = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def _positions(self, h1: np.ndarray, h2: np.ndarray) -> np.ndarray:
+        i = np.arange(self.n_hashes, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return (h1[:, None] + i[None, :] * (h2[:, None] | np.uint64(1))) % np.uint64(self.n_bits)
+
+    def contains(self, h1: np.ndarray, h2: np.ndarray) -> np.ndarray:
+        pos = self._positions(h1, h2)
+        hit = (self.bits[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1
+        return hit.all(axis=1)
+
+    def add(self, h1: np.ndarray, h2: np.ndarray) -> None:
+        pos = self._positions(h1, h2).ravel()
+        np.bitwise_or.at(self.bits, pos >> np.uint64(3), np.left_shift(1, pos & np.uint64(7)).astype(np.uint8))
+
+class RowDeduplicator:
+    """
+    Keeps the first occurrence of every row across any number of frames.
+
+        dedup = RowDeduplicator(memory_budget=512 * 2**20)
+        for chunk in chunks:
+            chunk = dedup.drop_duplicates(chunk)
+    """
+
+    def __init__(
+        self,
+        bits: int = 64,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        overflow: str = "spill",
+        false_positive_rate: float = 1e-6,
+        expected_rows: int = None,
+        spill_dir: str = None,
+        partitions: int = 64,
+        probabilistic: bool = False,
+    ):
+        if bits not in (64, 128):
+            raise ValueError("bits must be 64 or 128")
+        if overflow not in ("spill", "bloom"):
+            raise ValueError("overflow must be 'spill' or 'bloom'")
+        self.bits = bits
+        self.memory_budget = memory_budget
+        self.overflow = overflow
+        self.false_positive_rate = false_positive_rate
+        self.expected_rows = expected_rows
+        self.partitions = partitions
+        self._spill_parent = spill_dir
+        self._spill_dir = None
+        self._spilled = set()
+        self._runs = []
+        self._bloom = None
+        self.rows_seen = 0
+        self.rows_kept = 0
+        if probabilistic:
+            self._switch_to_bloom()
+
+    # ---- public API ----
+    @property
+    def mode(self) -> str:
+        if self._bloom is not None:
+            return "bloom"
+        return "spill" if self._spilled else "memory"
+
+    @property
+    def nbytes(self) -> int:
+        if self._bloom is not None:
+            return self._bloom.nbytes
+        return sum(r.nbytes for r in self._runs)
+
+    def fingerprint(self, df: pd.DataFrame) -> np.ndarray:
+        h1 = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        if self.bits == 64:
+            return h1
+        h2 = pd.util.hash_pandas_object(df, index=False, hash_key=_HASH_KEY_2).to_numpy()
+        return np.ascontiguousarray(np.column_stack([h1, h2])).view("V16").ravel()
+
+    def mark_new(self, df: pd.DataFrame) -> np.ndarray:
+        """Boolean mask of rows not seen before (in this frame or earlier ones); records them."""
+        return self.mark_new_keys(self.fingerprint(df))
+
+    def drop_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
+        keep = self.mark_new(df)
+        return df if keep.all() else df[keep]
+
+    def mark_new_keys(self, keys: np.ndarray) -> np.ndarray:
+        keep = np.zeros(len(keys), dtype=bool)
+        if len(keys) == 0:
+            return keep
+        uniq, first = np.unique(keys, return_index=True)
+        if self._bloom is not None:
+            h1, h2 = self._bloom_hashes(uniq)
+            new = ~self._bloom.contains(h1, h2)
+            self._bloom.add(h1[new], h2[new])
+        else:
+            new = ~self._contains(uniq)
+            if new.any():
+                self._add_run(uniq[new])
+        keep[first[new]] = True
+        self.rows_seen += len(keys)
+        self.rows_kept += int(new.sum())
+        if self._bloom is None and self.nbytes > self.memory_budget:
+            if self.overflow == "bloom":
+                self._switch_to_bloom()
+            else:
+                self._spill()
+        return keep
+
+    def close(self) -> None:
+        self._remove_spill()
+        self._runs = []
+        self._bloom = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- exact store: sorted in-memory runs + spilled partitions ----
+    def _word0(self, keys: np.ndarray) -> np.ndarray:
+        return keys if self.bits == 64 else keys.view(np.uint64)[::2]
+
+    def _partition_of(self, keys: np.ndarray) -> np.ndarray:
+        return (_mix64(self._word0(keys)) % np.uint64(self.partitions)).astype(np.int64)
+
+    def _contains(self, keys: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self._runs:
+            found |= _in_sorted(run, keys)
+        if self._spilled:
+            parts = self._partition_of(keys)
+            for p in np.unique(parts):
+                if p in self._spilled:
+                    sel = np.flatnonzero(parts == p)
+                    on_disk = np.load(self._part_path(p), mmap_mode="r")
+                    found[sel] |= _in_sorted(on_disk, keys[sel])
+        return found
+
+    def _add_run(self, sorted_keys: np.ndarray) -> None:
+        self._runs.append(sorted_keys)
+        # binary-counter compaction keeps O(log n) runs
+        while len(self._runs) > 1 and len(self._runs[-1]) * 2 >= len(self._runs[-2]):
+            b = self._runs.pop()
+            a = self._runs.pop()
+            self._runs.append(np.sort(np.concatenate([a, b]), kind="mergesort"))
+
+    def _part_path(self, p: int) -> str:
+        return os.path.join(self._spill_dir, f"part-{p:04d}.npy")
+
+    def _spill(self) -> None:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="cleanmycsv-dedup-", dir=self._spill_parent)
+        keys = np.concatenate(self._runs)
+        self._runs = []
+        parts = self._partition_of(keys)
+        order = np.argsort(parts, kind="stable")
+        keys, parts = keys[order], parts[order]
+        bounds = np.searchsorted(parts, np.arange(self.partitions + 1))
+        for p in range(self.partitions):
+            new = keys[bounds[p]:bounds[p + 1]]
+            if not len(new):
+                continue
+            if p in self._spilled:
+                new = np.concatenate([np.load(self._part_path(p)), new])
+            np.save(self._part_path(p), np.sort(new))
+            self._spilled.add(p)
+
+    # ---- probabilistic store ----
+    def _bloom_hashes(self, keys: np.ndarray):
+        if self.bits == 64:
+            return keys, _mix64(keys)
+        words = keys.view(np.uint64)
+        return words[::2], words[1::2]
+
+    def _switch_to_bloom(self) -> None:
+        capacity = max(self.expected_rows or 0, 4 * self.rows_kept, 1_000_000)
+        self._bloom = BloomFilter(capacity, self.false_positive_rate)
+        for run in self._runs:
+            self._bloom.add(*self._bloom_hashes(run))
+        for p in sorted(self._spilled):
+            self._bloom.add(*self._bloom_hashes(np.load(self._part_path(p))))
+        self._runs = []
+        self._remove_spill()
+
+    def _remove_spill(self) -> None:
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+        self._spilled.clear()
+
+def _in_sorted(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    if not len(sorted_keys):
+        return np.zeros(len(keys), dtype=bool)
+    idx = np.searchsorted(sorted_keys, keys)
+    idx[idx == len(sorted_keys)] = 0
+    return np.asarray(sorted_keys[idx] == keys)
@@ -0,0 +1,180 @@
+# dialect.py
+import csv
+import io
+import re
+from collections import Counter
+from dataclasses import dataclass, asdict
+
+from encoding import SNIFF_BYTES, read_byte_sample
+
+# ---------------- CSV dialect sniffing ----------------
+# sniff_dialect() looks at a bounded prefix of the file (plus a few windows at
+# random offsets for big files) instead of the whole decoded text. Candidate
+# delimiters are scored by how consistent the per-record field count is when the
+# sample is parsed with csv (so delimiters inside quoted fields do not count).
+# The resulting Dialect drives both the readers and the CSV writers.
+
+CANDIDATE_DELIMITERS = [",", ";", "|", "\t"]
+CANDIDATE_QUOTES = ['"', "'"]
+
+@dataclass
+class Dialect:
+    delimiter: str = ","
+    quotechar: str = '"'
+    escapechar: str = None
+    doublequote: bool = True
+    has_header: bool = True
+    lineterminator: str = "\n"
+    confidence: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def read_csv_kwargs(self) -> dict:
+        """Arguments for pandas.read_csv."""
+        return {
+            "sep": self.delimiter,
+            "quotechar": self.quotechar,
+            "escapechar": self.escapechar,
+            "doublequote": self.doublequote,
+            "header": 0 if self.has_header else None,
+        }
+
+    def to_csv_kwargs(self) -> dict:
+        """Arguments for DataFrame.to_csv."""
+        return {
+            "sep": self.delimiter,
+            "quotechar": self.quotechar,
+            "escapechar": self.escapechar,
+            "doublequote": self.doublequote,
+            "lineterminator": self.lineterminator,
+        }
+
+def read_sample(source, sample_bytes: int = SNIFF_BYTES, encoding: str = "utf-8") -> list:
+    """
+    Returns text blocks to sniff: the prefix, plus a few blocks from random offsets when
+    the input is larger than the prefix. `source` is text (a str is always content),
+    bytes-like, an os.PathLike path or a seekable binary file; bytes are decoded with
+    `encoding` (BOM-free, e.g. "utf-16-le").
+    """
+    if isinstance(source, str):
+        return [source[:sample_bytes]]
+    blocks = [b.decode(encoding, errors="ignore") for b in read_byte_sample(source, sample_bytes)]
+    blocks[0] = blocks[0].lstrip("\ufeff")
+    if len(blocks) == 1:
+        return blocks
+    # the prefix loses its last (possibly cut) line; random windows also lose their first
+    out = [blocks[0].rsplit("\n", 1)[0]]
+    for b in blocks[1:]:
+        parts = b.split("\n", 1)
+        if len(parts) == 2:
+            out.append(parts[1].rsplit("\n", 1)[0])
+    return out
+
+def _field_counts(text: str, delimiter: str, quotechar: str) -> list:
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter, quotechar=quotechar)
+    try:
+        return [len(row) for row in reader if row]
+    except csv.Error:
+        return []
+
+def _score(blocks: list, delimiter: str, quotechar: str) -> tuple:
+    counts = []
+    for b in blocks:
+        counts.extend(_field_counts(b, delimiter, quotechar))
+    if not counts:
+        return 0.0, 1
+    mode, hits = Counter(counts).most_common(1)[0]
+    if mode < 2:
+        return 0.0, mode
+    return hits / len(counts), mode
+
+def _detect_quote(text: str, delimiter: str) -> str:
+    best, best_hits = '"', 0
+    for q in CANDIDATE_QUOTES:
+        # quotes opening a field: at line start or right after the delimiter
+        hits = text.count(delimiter + q) + text.count("\n" + q) + text.startswith(q)
+        if hits > best_hits:
+            best, best_hits = q, hits
+    return best
+
+def _detect_line_terminator(text: str) -> str:
+    crlf = text.count("\r\n")
+    lf = text.count("\n") - crlf
+    cr = text.count("\r") - crlf
+    if crlf and crlf >= lf:
+        return "\r\n"
+    if cr > lf:
+        return "\r"
+    return "\n"
+
+def _is_number(v: str) -> bool:
+    try:
+        float(v.replace(",", ""))
+        return True
+    except ValueError:
+        return False
+
+def _detect_header(text: str, dialect: Dialect) -> bool:
+    # row 1 is the header unless every column shows it is data (a number over a
+    # numeric column, or a value that also occurs further down its column) and at
+    # least one of its values does recur: a row of numbers over numbers alone may be
+    # a header of years. Empty or duplicate names do not count against a header
+    # (pandas fills and de-duplicates them).
+    try:
+        sniffer_dialect = type("D", (csv.excel,), {"delimiter": dialect.delimiter, "quotechar": dialect.quotechar})
+        rows = list(csv.reader(io.StringIO(text), sniffer_dialect))[:50]
+    except csv.Error:
+        return True
+    rows = [r for r in rows if r]
+    if len(rows) < 2:
+        return True
+    header, body = rows[0], rows[1:]
+
+    recurs = False
+    for i, h in enumerate(header):
+        col = [r[i] for r in body if len(r) > i and r[i].strip()]
+        if not h.strip() or not col:
+            return True
+        if all(_is_number(v) for v in col):
+            if not _is_number(h):
+                return True
+        elif h not in col:
+            return True
+        recurs = recurs or h in col
+    return not recurs
+
+def sniff_dialect(source, default: str = ",", sample_bytes: int = SNIFF_BYTES, encoding: str = "utf-8") -> Dialect:
+    """Sniffs delimiter, quote/escape characters, header presence and line terminator from a bounded sample."""
+    blocks = read_sample(source, sample_bytes, encoding)
+    head = blocks[0]
+    if not head.strip():
+        return Dialect(delimiter=default)
+
+    scored = []
+    for d in CANDIDATE_DELIMITERS:
+        if d not in head:
+            continue
+        q = _detect_quote(head, d)
+        consistency, fields = _score(blocks, d, q)
+        scored.append((consistency, fields, d, q))
+    if not scored:
+        return Dialect(delimiter=default, lineterminator=_detect_line_terminator(head))
+    consistency, fields, delimiter, quotechar = max(scored)
+    if consistency == 0:
+        delimiter, quotechar = default, '"'
+
+    escaped = f"\\{quotechar}" in head
+    # a doubled quote inside a field, not an empty quoted field ("") or an escaped quote before the closing one
+    d, q = re.escape(delimiter), re.escape(quotechar)
+    doubled = re.search(rf"(?<![\\{d}\n]){q}{q}(?![{d}\r\n])", head) is not None
+    dialect = Dialect(
+        delimiter=delimiter,
+        quotechar=quotechar,
+        escapechar="\\" if escaped and not doubled else None,
+        doublequote=not (escaped and not doubled),
+        lineterminator=_detect_line_terminator(head),
+        confidence=round(consistency, 4),
+    )
+    dialect.has_header = _detect_header(head, dialect)
+    return dialect
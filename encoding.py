@@ -0,0 +1,173 @@
+# encoding.py
+import codecs
+import io
+import os
+import random
+from dataclasses import dataclass, asdict
+
+# ---------------- Text encoding detection ----------------
+# detect_encoding() decides how to decode a CSV from its BOM and a bounded byte
+# sample (a prefix plus a few windows at random offsets), without decoding the
+# whole buffer. The parsers then transcode incrementally as they read (pyarrow's
+# ReadOptions.encoding, pandas' encoding=), so the decoded text of the whole
+# file is never held in memory at once.
+#
+# Order of checks: BOM -> UTF-16/32 without BOM (NUL byte pattern) -> strict
+# UTF-8 -> CP1252 -> Latin-1 (decodes anything).
+
+SNIFF_BYTES = 64 * 1024
+WINDOW_BYTES = 16 * 1024
+RANDOM_WINDOWS = 4
+
+_BOMS = [
+    # (bom, encoding for the parsers, encoding of the bytes after the BOM)
+    (codecs.BOM_UTF32_LE, "utf-32", "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32", "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8-sig", "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16", "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16", "utf-16-be"),
+]
+
+@dataclass
+class EncodingInfo:
+    encoding: str = "utf-8"
+    confidence: float = 1.0
+    bom: int = 0
+    body_encoding: str = None
+
+    def __post_init__(self):
+        if self.body_encoding is None:
+            self.body_encoding = self.encoding
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @property
+    def is_utf8(self) -> bool:
+        return self.body_encoding == "utf-8"
+
+    def decode(self, raw: bytes, errors: str = "ignore") -> str:
+        """Decodes a sample block (BOM-free) of the file."""
+        return raw.decode(self.body_encoding, errors=errors)
+
+def _random_offsets(size: int, sample_bytes: int, windows: int) -> list:
+    if size <= sample_bytes + WINDOW_BYTES or windows <= 0:
+        return []
+    rng = random.Random(size)  # deterministic per file size
+    # multiples of 4 keep UTF-16/32 windows on a code-unit boundary
+    return sorted(rng.randrange(sample_bytes, size - WINDOW_BYTES) & ~3 for _ in range(windows))
+
+def read_byte_sample(source, sample_bytes: int = SNIFF_BYTES, windows: int = RANDOM_WINDOWS) -> list:
+    """
+    Returns raw byte blocks: the prefix, plus `windows` blocks from random offsets when
+    the input is larger than the prefix. `source` is bytes-like, a path or a seekable
+    binary file (its position is restored).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as fh:
+            return read_byte_sample(fh, sample_bytes, windows)
+    if hasattr(source, "read"):
+        pos = source.tell()
+        source.seek(0, io.SEEK_END)
+        size = source.tell()
+        source.seek(0)
+        blocks = [source.read(sample_bytes)]
+        for off in _random_offsets(size, sample_bytes, windows):
+            source.seek(off)
+            blocks.append(source.read(WINDOW_BYTES))
+        source.seek(pos)
+        return [b.encode("utf-8") if isinstance(b, str) else b for b in blocks]
+    view = memoryview(source).cast("B")
+    blocks = [bytes(view[:sample_bytes])]
+    for off in _random_offsets(len(view), sample_bytes, windows):
+        blocks.append(bytes(view[off:off + WINDOW_BYTES]))
+    return blocks
+
+def _nul_pattern(raw: bytes):
+    # ASCII text in UTF-16/32 has a zero byte in every code unit
+    n = len(raw) - len(raw) % 4
+    if n < 8:
+        return None
+    zeros = [raw[i:n:4].count(0) / (n // 4) for i in range(4)]
+    if min(zeros[1:]) > 0.9 and zeros[0] < 0.5:
+        return "utf-32-le", min(zeros[1:])
+    if min(zeros[:3]) > 0.9 and zeros[3] < 0.5:
+        return "utf-32-be", min(zeros[:3])
+    odd, even = (zeros[1] + zeros[3]) / 2, (zeros[0] + zeros[2]) / 2
+    if odd > 0.3 and even < 0.05:
+        return "utf-16-le", odd
+    if even > 0.3 and odd < 0.05:
+        return "utf-16-be", even
+    return None
+
+def _decodes(blocks: list, encoding: str) -> bool:
+    for i, raw in enumerate(blocks):
+        if i and encoding == "utf-8":
+            # a window may start inside a multi-byte sequence
+            start = 0
+            while start < min(len(raw), 3) and 0x80 <= raw[start] < 0xC0:
+                start += 1
+            raw = raw[start:]
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            decoder.decode(raw, final=False)  # a block may also end mid-sequence
+        except UnicodeDecodeError:
+            return False
+    return True
+
+def _cp1252_confidence(blocks: list) -> float:
+    # share of non-ASCII characters that look like text (letters, currency, typographic punctuation)
+    text = "".join(b.decode("cp1252", errors="ignore") for b in blocks)
+    high = [ch for ch in text if ord(ch) > 0x7F]
+    if not high:
+        return 0.5
+    texty = sum(ch.isalpha() or ch in "€£¥©®°±µ–—‘’“”•…«»" for ch in high)
+    return round(0.5 + 0.45 * texty / len(high), 4)
+
+def detect_encoding(source, sample_bytes: int = SNIFF_BYTES) -> EncodingInfo:
+    """Detects the text encoding of `source` (bytes-like, path or binary file) from its BOM and a byte sample."""
+    blocks = read_byte_sample(source, sample_bytes)
+    head = blocks[0]
+    for bom, encoding, body in _BOMS:
+        if head.startswith(bom):
+            return EncodingInfo(encoding, 1.0, len(bom), body)
+
+    wide = _nul_pattern(head)
+    if wide is not None:
+        encoding, share = wide
+        return EncodingInfo(encoding, round(share, 4))
+
+    if _decodes(blocks, "utf-8"):
+        # pure ASCII is valid in most encodings; non-ASCII that is valid UTF-8 is rarely anything else
+        non_ascii = any(b > 0x7F for raw in blocks for b in raw)
+        return EncodingInfo("utf-8", 0.99 if non_ascii else 0.9)
+    if _decodes(blocks, "cp1252"):
+        return EncodingInfo("cp1252", _cp1252_confidence(blocks))
+    return EncodingInfo("latin-1", 0.5)
+
+class MemoryReader(io.RawIOBase):
+    """Read-only file over a bytes-like object, so parsers can stream from it without a copy."""
+
+    def __init__(self, data, offset: int = 0):
+        self._view = memoryview(data).cast("B")
+        self._pos = offset
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + pos)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
@@ -0,0 +1,237 @@
+# exports.py
+import io
+import re
+import pandas as pd
+
+from cache import frame_fingerprint
+from dialect import Dialect
+from xlsx import write_workbook
+
+# pyarrow is optional: without it only the CSV and XLSX exports are available.
+try:
+    import pyarrow as pa
+    import pyarrow.feather as pa_feather
+    import pyarrow.parquet as pa_parquet
+except Exception:
+    pa = None
+
+# ---------------- Download exports ----------------
+# Exports are built only when a download is requested, written in row chunks
+# (so no single CSV string of the whole frame is ever built), and cached by frame
+# fingerprint: asking for the same download again, or on the next Streamlit
+# rerun, costs nothing.
+
+EXPORT_CHUNK_ROWS = 100_000
+
+MIME_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+    "feather": "application/vnd.apache.arrow.file",
+    "arrows": "application/vnd.apache.arrow.stream",
+}
+
+def _datetime_formats(df: pd.DataFrame) -> dict:
+    # to_csv prints a datetime column date-only when all of its values are midnight;
+    # a chunk of a column with times elsewhere must keep the time part
+    formats = {}
+    for i in range(df.shape[1]):
+        s = df.iloc[:, i]
+        if s.dtype.kind != "M" or getattr(s.dt, "tz", None) is not None:
+            continue
+        if (s.dt.normalize() != s).any():
+            formats[i] = "%Y-%m-%d %H:%M:%S.%f" if s.dt.microsecond.any() else "%Y-%m-%d %H:%M:%S"
+    return formats
+
+def iter_csv(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS, dialect: Dialect = None):
+    """Yields the CSV encoding of `df` as UTF-8 byte chunks of `chunk_rows` rows each."""
+    kwargs = (dialect or Dialect()).to_csv_kwargs()
+    formats = _datetime_formats(df) if len(df) > chunk_rows else {}
+    yield df.iloc[:0].to_csv(index=False, **kwargs).encode("utf-8")
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        if formats:
+            chunk = chunk.copy(deep=False)
+        for i, fmt in formats.items():
+            col = chunk.iloc[:, i]
+            if ((col.dt.normalize() == col) | col.isna()).all():
+                chunk.isetitem(i, col.dt.strftime(fmt))
+        yield chunk.to_csv(index=False, header=False, **kwargs).encode("utf-8")
+
+def write_csv(df: pd.DataFrame, fh, chunk_rows: int = EXPORT_CHUNK_ROWS, dialect: Dialect = None) -> None:
+    for part in iter_csv(df, chunk_rows, dialect):
+        fh.write(part)
+
+# ---- XLSX engines ----
+# Each engine takes a list of (sheet name, frame) pairs that already fit Excel's
+# limits. "stream" (xlsx.write_workbook) is the default; "openpyxl" is the
+# pandas ExcelWriter path the app used before (full in-memory object model);
+# "openpyxl_write_only" streams rows through openpyxl's write-only mode;
+# "xlsxwriter" (constant_memory mode) is available when the package is installed.
+
+EXCEL_MAX_ROWS = 1_048_576  # per sheet, header row included
+_BAD_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+def _xlsx_stream(sheets, fh, workers=1):
+    write_workbook(sheets, fh, workers=workers)
+
+def _xlsx_openpyxl(sheets, fh, workers=1):
+    with pd.ExcelWriter(fh, engine="openpyxl") as writer:
+        for name, df in sheets:
+            df.to_excel(writer, index=False, sheet_name=name)
+
+def _xlsx_openpyxl_write_only(sheets, fh, workers=1):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    for name, df in sheets:
+        ws = wb.create_sheet(title=name)
+        ws.append([str(c) for c in df.columns])
+        for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+            block = df.iloc[start:start + EXPORT_CHUNK_ROWS].astype(object)
+            for row in block.where(block.notna(), None).itertuples(index=False, name=None):
+                ws.append(row)
+    wb.save(fh)
+
+def _xlsx_xlsxwriter(sheets, fh, workers=1):
+    with pd.ExcelWriter(fh, engine="xlsxwriter", engine_kwargs={"options": {"constant_memory": True}}) as writer:
+        for name, df in sheets:
+            df.to_excel(writer, index=False, sheet_name=name)
+
+XLSX_ENGINES = {
+    "stream": _xlsx_stream,
+    "openpyxl": _xlsx_openpyxl,
+    "openpyxl_write_only": _xlsx_openpyxl_write_only,
+}
+try:
+    import xlsxwriter  # noqa: F401
+    XLSX_ENGINES["xlsxwriter"] = _xlsx_xlsxwriter
+except ImportError:
+    pass
+
+def split_sheets(frames, max_rows: int = EXCEL_MAX_ROWS) -> list:
+    """
+    Turns {sheet name: frame} into (name, frame) pairs that fit in one sheet each:
+    frames past `max_rows` - 1 data rows continue on "name (2)", "name (3)", ...
+    Names are made valid (31 chars, no []:*?/\\) and unique.
+    """
+    per_sheet = max_rows - 1
+    out, used = [], set()
+    for name, df in frames.items():
+        base = _BAD_SHEET_CHARS.sub("_", str(name))[:31] or "Sheet"
+        parts = [df.iloc[i:i + per_sheet] for i in range(0, len(df), per_sheet)] or [df]
+        for n, part in enumerate(parts, 1):
+            suffix = f" ({n})" if n > 1 else ""
+            title = base[:31 - len(suffix)] + suffix
+            k = 2
+            while title.lower() in used:
+                suffix = f" ({n}.{k})" if n > 1 else f" ({k})"
+                title = base[:31 - len(suffix)] + suffix
+                k += 1
+            used.add(title.lower())
+            out.append((title, part))
+    return out
+
+def write_xlsx(df, fh, sheet_name: str = "Sheet1", engine: str = "stream", workers: int = 1,
+               max_rows: int = EXCEL_MAX_ROWS) -> None:
+    """
+    Writes a frame (or a {sheet name: frame} dict) as an .xlsx workbook to `fh`.
+    Frames longer than one sheet are split across sheets. With `workers` > 1 the
+    "stream" engine renders sheets concurrently.
+    """
+    if engine not in XLSX_ENGINES:
+        raise ValueError(f"unknown XLSX engine {engine!r}; available: {sorted(XLSX_ENGINES)}")
+    frames = df if isinstance(df, dict) else {sheet_name: df}
+    XLSX_ENGINES[engine](split_sheets(frames, max_rows), fh, workers=workers)
+
+# ---- Columnar formats ----
+# Parquet, Feather (Arrow IPC file) and Arrow IPC stream keep the inferred
+# dtypes (ints, floats, datetimes, ArrowDtype columns) that a CSV round trip
+# loses. Columns go to Arrow from their buffers (zero-copy for numeric numpy
+# columns); nothing is rendered as text. Object columns Arrow cannot type on
+# their own (e.g. str mixed with int cells) are stored as strings.
+
+def _require_arrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for Parquet / Feather / Arrow exports")
+
+def to_arrow_table(df: pd.DataFrame):
+    """`df` as a pyarrow.Table (index dropped, column names as str)."""
+    _require_arrow()
+    arrays = []
+    for i in range(df.shape[1]):
+        s = df.iloc[:, i]
+        try:
+            arrays.append(pa.Array.from_pandas(s))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            text = s.map(lambda v: v if isinstance(v, str) else str(v), na_action="ignore")
+            arrays.append(pa.array(text, type=pa.string(), from_pandas=True))
+    return pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
+
+def write_parquet(df: pd.DataFrame, fh, compression: str = "zstd", compression_level: int = None,
+                  row_group_size: int = None) -> None:
+    """compression: "zstd", "snappy", "gzip", "brotli", "lz4" or "none"; row_group_size in rows."""
+    pa_parquet.write_table(
+        to_arrow_table(df), fh,
+        compression=compression, compression_level=compression_level, row_group_size=row_group_size,
+    )
+
+def write_feather(df: pd.DataFrame, fh, compression: str = "lz4", chunksize: int = None) -> None:
+    """Feather v2 (the Arrow IPC file format); compression: "lz4", "zstd" or "uncompressed"."""
+    pa_feather.write_feather(to_arrow_table(df), fh, compression=compression, chunksize=chunksize)
+
+def write_arrow_stream(df: pd.DataFrame, fh, chunksize: int = EXPORT_CHUNK_ROWS) -> None:
+    """Arrow IPC stream: record batches of `chunksize` rows that readers can consume as they arrive."""
+    table = to_arrow_table(df)
+    with pa.ipc.new_stream(fh, table.schema) as writer:
+        writer.write_table(table, max_chunksize=chunksize)
+
+EXPORT_COLUMNAR = pa is not None
+
+EXPORT_WRITERS = {
+    "csv": write_csv,
+    "xlsx": write_xlsx,
+    "parquet": write_parquet,
+    "feather": write_feather,
+    "arrows": write_arrow_stream,
+}
+
+def export_bytes(df: pd.DataFrame, fmt: str, **options) -> bytes:
+    """Serialises `df` as `fmt` (a key of EXPORT_WRITERS); `options` go to the writer."""
+    if fmt not in EXPORT_WRITERS:
+        raise ValueError(f"unsupported export format: {fmt}")
+    buf = io.BytesIO()
+    EXPORT_WRITERS[fmt](df, buf, **options)
+    return buf.getvalue()
+
+class LazyExport:
+    """
+    A download that is generated on first use and cached in a cache.ResultCache.
+
+        export = LazyExport(df, "xlsx", cache, key=clean_key, sheet_name="Cleaned Data")
+        if export.ready or st.button("Prepare Excel"):
+            st.download_button("Download", data=export.data(), mime=export.mime)
+
+    `options` are passed to the format's writer (sheet_name, compression, ...).
+    """
+
+    def __init__(self, df: pd.DataFrame, fmt: str, cache, key=None, **options):
+        if fmt not in EXPORT_WRITERS:
+            raise ValueError(f"unsupported export format: {fmt}")
+        self.df = df
+        self.fmt = fmt
+        self.cache = cache
+        self.options = options
+        # the caller's key (e.g. upload hash + options) saves hashing the frame on every rerun
+        frame_key = key if key is not None else frame_fingerprint(df)
+        self.key = ("export", fmt, tuple(sorted(options.items())), frame_key)
+
+    @property
+    def mime(self) -> str:
+        return MIME_TYPES[self.fmt]
+
+    @property
+    def ready(self) -> bool:
+        return self.key in self.cache
+
+    def data(self) -> bytes:
+        return self.cache.get_or_compute(self.key, lambda: export_bytes(self.df, self.fmt, **self.options))
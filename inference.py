@@ -0,0 +1,370 @@
+# inference.py
+import hashlib
+import warnings
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, field
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# ---------------- Single-pass column type inference ----------------
+# A column is factorized once; every later decision (numeric? date? bool?
+# categorical?) and every conversion runs on the distinct values and is
+# broadcast back through the codes. CSV columns rarely have more than a few
+# thousand distinct values, so this replaces several full-column string passes
+# and the per-value try/except date probe.
+#
+# The conversion rules are the ones clean_dataframe() has always applied:
+# - fix_numbers converts a column only if *every* cell parses once commas are
+#   removed (a missing cell reads as "nan" and blocks it); otherwise the column
+#   becomes that comma-free text
+# - parse_dates converts an object column if at least 3 of its first 20
+#   non-null values parse
+#
+# Arrow-backed string columns (pandas ArrowDtype / StringDtype, e.g. from the
+# pyarrow CSV reader) go through the same rules but stay Arrow-native, and
+# their missing cells stay missing instead of becoming the text "nan".
+#
+# Date columns are parsed with explicit formats: candidate strptime formats are
+# scored on a sample of distinct values and the dominant one(s) kept
+# (detect_date_formats). Each format is a vectorized to_datetime(format=...)
+# call; only values no format matches go through per-element parsing.
+# Detected formats are cached per (column name, header signature), so a repeat
+# upload with the same schema skips detection.
+
+DATE_SAMPLE_SIZE = 20
+DATE_MIN_HITS = 3
+DATE_FORMAT_SAMPLE = 200
+MAX_DATE_FORMATS = 3
+DATE_FORMAT_MIN_SHARE = 0.05
+FORMAT_CACHE_SIZE = 1024
+CATEGORICAL_MAX_RATIO = 0.05
+KIND_THRESHOLD = 0.95
+
+# strings pd.to_datetime() reads as NaT rather than rejecting
+NULL_DATE_STRINGS = {"", "nan", "NaN", "NAN", "NaT", "nat", "NAT"}
+BOOL_STRINGS = {"true", "false", "yes", "no", "y", "n", "t", "f"}
+
+CANDIDATE_DATE_FORMATS = [
+    "%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d",
+    "%m/%d/%Y", "%d/%m/%Y", "%m-%d-%Y", "%d-%m-%Y", "%d.%m.%Y",
+    "%m/%d/%y", "%d/%m/%y",
+    "%b %d %Y", "%d %b %Y", "%B %d %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y",
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S.%f",
+    "%m/%d/%Y %H:%M", "%d/%m/%Y %H:%M", "%m/%d/%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S",
+]
+
+INT_RE = r"[+-]?\d+"
+FLOAT_RE = r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?"
+THOUSANDS_RE = r"[+-]?\d{1,3}(?:,\d{3})+(?:\.\d+)?"
+
+def is_text_dtype(dtype) -> bool:
+    if dtype == object or isinstance(dtype, pd.StringDtype):
+        return True
+    return isinstance(dtype, pd.ArrowDtype) and str(dtype.pyarrow_dtype) in ("string", "large_string")
+
+@dataclass
+class ColumnPlan:
+    kind: str                  # int/float/thousands/date/bool/categorical/text/empty (or the dtype for other non-object columns)
+    confidence: float          # share of non-null cells that fit `kind`
+    numeric: bool = False      # fix_numbers converts the column
+    parse_dates: bool = False  # parse_dates converts the column
+    date_formats: list = field(default_factory=list)  # explicit formats tried in order
+    n_unique: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+def _factorize_typed(s: pd.Series):
+    # factorize merges equal values of different types (1, 1.0, True), which then all
+    # render as the text of the first one; key mixed columns on (type, value) instead
+    values = s.to_numpy()
+    missing = s.isna().to_numpy()
+    keys = np.empty(len(values), dtype=object)
+    for i in np.flatnonzero(~missing):
+        keys[i] = (type(values[i]), values[i])
+    codes, _ = pd.factorize(keys, use_na_sentinel=True)
+    present = np.flatnonzero(codes >= 0)
+    _, first = np.unique(codes[present], return_index=True)
+    return codes, values[present[first]]
+
+class ColumnScan:
+    """Factorized view of one column: codes per row, distinct values, and the text views derived from them."""
+
+    def __init__(self, s: pd.Series):
+        self.series = s
+        if s.dtype == object and pd.api.types.infer_dtype(s, skipna=True) not in ("string", "empty"):
+            self.codes, self.uniques = _factorize_typed(s)
+        else:
+            self.codes, uniques = pd.factorize(s, use_na_sentinel=True)
+            self.uniques = np.asarray(uniques, dtype=object)
+        self.missing = self.codes == -1
+        self.n_missing = int(self.missing.sum())
+        self.counts = np.bincount(self.codes[~self.missing], minlength=len(self.uniques))
+        self._text = None
+        self._numeric_text = None
+
+    @property
+    def text(self) -> pd.Series:
+        # astype(str) of each distinct value
+        if self._text is None:
+            self._text = pd.Series(self.uniques, dtype=object).astype(str)
+        return self._text
+
+    @property
+    def numeric_text(self) -> pd.Series:
+        # same normalisation as coerce_numeric_series(): commas removed, stripped
+        if self._numeric_text is None:
+            self._numeric_text = self.text.str.replace(",", "", regex=False).str.strip()
+        return self._numeric_text
+
+    def missing_text(self) -> np.ndarray:
+        # astype(str) of the missing cells ("nan", "None", "NaT", ...)
+        return self.series[self.missing].astype(str).to_numpy(dtype=object)
+
+    def broadcast(self, unique_values, missing_values=None) -> np.ndarray:
+        values = np.empty(len(self.codes), dtype=object)
+        if len(self.uniques):
+            values[~self.missing] = np.asarray(unique_values, dtype=object)[self.codes[~self.missing]]
+        if self.n_missing:
+            values[self.missing] = missing_values
+        return values
+
+def _share(counts: np.ndarray, mask: np.ndarray, total: int) -> float:
+    return float(counts[mask].sum()) / total if total else 0.0
+
+def _date_hits(values) -> int:
+    sample = pd.Series(values, dtype=object).astype(str)
+    parsed = pd.to_datetime(sample, errors="coerce", format="mixed", utc=True)  # utc: mixed offsets count too
+    return int((parsed.notna() | sample.isin(NULL_DATE_STRINGS)).sum())
+
+def _classify(scan: ColumnScan) -> tuple:
+    stripped = scan.text.str.strip()
+    # blank cells count as missing for classification
+    counts = np.where(stripped.eq("").to_numpy(), 0, scan.counts)
+    total = int(counts.sum())
+    if total == 0:
+        return "empty", 1.0
+    is_int = stripped.str.fullmatch(INT_RE).to_numpy(dtype=bool)
+    is_float = stripped.str.fullmatch(FLOAT_RE).to_numpy(dtype=bool)
+    is_thousands = stripped.str.fullmatch(THOUSANDS_RE).to_numpy(dtype=bool)
+    is_bool = stripped.str.lower().isin(BOOL_STRINGS).to_numpy(dtype=bool)
+    # non-str cells (ints, floats, bools in an object column) classify by their Python type
+    for i, v in enumerate(scan.uniques):
+        if isinstance(v, (bool, np.bool_)):
+            is_bool[i], is_int[i], is_float[i] = True, False, False
+
+    candidates = [
+        ("bool", _share(counts, is_bool, total)),
+        ("int", _share(counts, is_int, total)),
+        ("float", _share(counts, is_float, total)),
+        ("thousands", _share(counts, is_thousands | is_float, total)),
+    ]
+    for kind, share in candidates:
+        if share >= KIND_THRESHOLD:
+            return kind, share
+
+    head = stripped[counts > 0][:DATE_SAMPLE_SIZE]
+    date_share = _date_hits(head) / len(head)
+    if date_share >= KIND_THRESHOLD:
+        return "date", date_share
+    ratio = int((counts > 0).sum()) / total
+    if ratio <= CATEGORICAL_MAX_RATIO:
+        return "categorical", 1.0 - ratio
+    return "text", 1.0
+
+def _first_rows(scan: ColumnScan, text: pd.Series, n: int, skip_missing: bool) -> list:
+    """Text of the first `n` rows in row order (missing rows skipped, or rendered like astype(str))."""
+    out = []
+    missing_text = None
+    for pos, code in enumerate(scan.codes):
+        if code >= 0:
+            out.append(text.iat[code])
+        elif not skip_missing:
+            if missing_text is None:
+                missing_text = scan.missing_text()
+            out.append(missing_text[int(scan.missing[:pos].sum())])
+        if len(out) >= n:
+            break
+    return out
+
+# ---- date formats ----
+_FORMAT_CACHE = OrderedDict()
+
+def header_signature(columns) -> str:
+    return hashlib.sha1("\x1f".join(map(str, columns)).encode("utf-8")).hexdigest()[:16]
+
+def date_format_sample(texts) -> list:
+    """First DATE_FORMAT_SAMPLE distinct, non-null text values, in order of appearance."""
+    out = []
+    for v in pd.unique(pd.Series(texts, dtype=object)):
+        if isinstance(v, str) and v not in NULL_DATE_STRINGS:
+            out.append(v)
+            if len(out) >= DATE_FORMAT_SAMPLE:
+                break
+    return out
+
+def detect_date_formats(sample) -> list:
+    """Greedily picks the candidate formats that cover most of `sample` (at most MAX_DATE_FORMATS)."""
+    remaining = pd.Index(sample, dtype=object)
+    if not len(remaining):
+        return []
+    guess = guess_datetime_format(remaining[0])
+    candidates = list(dict.fromkeys(([guess] if guess else []) + CANDIDATE_DATE_FORMATS))
+    min_hits = max(1, int(DATE_FORMAT_MIN_SHARE * len(remaining)))
+    chosen = []
+    while len(remaining) and len(chosen) < MAX_DATE_FORMATS:
+        best, best_mask = None, None
+        for fmt in candidates:
+            if fmt in chosen:
+                continue
+            hits = pd.to_datetime(remaining, format=fmt, errors="coerce", utc=True).notna()
+            if best_mask is None or hits.sum() > best_mask.sum():
+                best, best_mask = fmt, hits
+        if best is None or best_mask.sum() < min_hits:
+            break
+        chosen.append(best)
+        remaining = remaining[~best_mask]
+    return chosen
+
+def _parse_dates(values, **kwargs) -> pd.DatetimeIndex:
+    # values with one offset (or none) parse as they are; mixed offsets only parse to UTC
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        parsed = pd.to_datetime(values, errors="coerce", **kwargs)
+    if not isinstance(parsed, pd.DatetimeIndex):
+        parsed = pd.to_datetime(values, errors="coerce", utc=True, **kwargs)
+    return parsed.as_unit("ns")
+
+def parse_with_formats(values, formats) -> pd.DatetimeIndex:
+    """
+    Vectorized parse per format in turn; values none of them match fall back to per-element
+    parsing. A column with a single UTC offset keeps it; mixed offsets come out in UTC.
+    """
+    values = pd.Index(values, dtype=object)
+    out = np.full(len(values), np.iinfo(np.int64).min, dtype=np.int64)  # NaT
+    tzs = set()
+    todo = np.ones(len(values), dtype=bool)
+    for fmt in [*formats, "mixed"]:
+        if not todo.any():
+            break
+        idx = np.flatnonzero(todo)
+        parsed = _parse_dates(values[idx], format=fmt)
+        ok = parsed.notna()
+        if fmt != "mixed":
+            idx, parsed = idx[ok], parsed[ok]
+        # asi8 is the UTC instant of an offset-aware value (and reads a naive one as UTC)
+        out[idx] = parsed.asi8
+        todo[idx] = False
+        if ok.any():
+            tzs.add(parsed.tz)
+    parsed = pd.DatetimeIndex(out.view("M8[ns]"))
+    if tzs == {None} or not tzs:
+        return parsed
+    return parsed.tz_localize("UTC").tz_convert(tzs.pop() if len(tzs) == 1 else "UTC")
+
+def cached_date_formats(key, sample) -> list:
+    if key is not None and key in _FORMAT_CACHE:
+        _FORMAT_CACHE.move_to_end(key)
+        return list(_FORMAT_CACHE[key])
+    formats = detect_date_formats(date_format_sample(sample))
+    if key is not None:
+        _FORMAT_CACHE[key] = tuple(formats)
+        if len(_FORMAT_CACHE) > FORMAT_CACHE_SIZE:
+            _FORMAT_CACHE.popitem(last=False)
+    return formats
+
+def infer_column(
+    s: pd.Series,
+    fix_numbers: bool = True,
+    parse_dates: bool = True,
+    scan: ColumnScan = None,
+    cache_key=None,
+):
+    """
+    Returns (ColumnPlan, ColumnScan) for `s` as the fix_numbers / parse_dates steps would see it.
+    `cache_key` (e.g. (name, header_signature(df.columns))) enables the date-format cache.
+    """
+    if s.dtype.kind in "biufc":
+        kind = {"b": "bool", "i": "int", "u": "int"}.get(s.dtype.kind, "float")
+        return ColumnPlan(kind, 1.0), None
+    if not is_text_dtype(s.dtype):
+        return ColumnPlan(str(s.dtype), 1.0), None
+    native = s.dtype != object
+
+    if scan is None:
+        scan = ColumnScan(s)
+    kind, confidence = _classify(scan)
+    plan = ColumnPlan(kind, round(confidence, 4), n_unique=len(scan.uniques))
+
+    if fix_numbers:
+        nums = pd.to_numeric(scan.numeric_text, errors="coerce")
+        # an object NaN reads as "nan" and blocks conversion; a native NA is just missing
+        blocked = scan.n_missing > 0 and not native
+        plan.numeric = not blocked and not (nums.isna() & scan.numeric_text.ne("")).any()
+
+    if parse_dates and not plan.numeric:
+        # the date step sees the comma-free text when fix_numbers ran, otherwise the raw values
+        text = scan.numeric_text if fix_numbers else scan.text
+        sample = _first_rows(scan, text, DATE_SAMPLE_SIZE, skip_missing=native or not fix_numbers)
+        if sample and _date_hits(sample) >= DATE_MIN_HITS:
+            plan.parse_dates = True
+            plan.date_formats = cached_date_formats(cache_key, text)
+    return plan, scan
+
+def apply_numeric(s: pd.Series, plan: ColumnPlan, scan: ColumnScan = None) -> pd.Series:
+    """fix_numbers conversion for one column, given its plan."""
+    if not is_text_dtype(s.dtype):
+        return s
+    if scan is None:
+        scan = ColumnScan(s)
+    if plan.numeric:
+        nums = pd.to_numeric(scan.numeric_text, errors="coerce").to_numpy()
+        values = pd.api.extensions.take(nums, scan.codes, allow_fill=True)
+        return pd.Series(values, index=s.index, name=s.name)
+    if s.dtype != object:
+        values = scan.broadcast(scan.numeric_text.to_numpy(), None)
+        return pd.Series(values, index=s.index, name=s.name, dtype=s.dtype)
+    values = scan.broadcast(scan.numeric_text.to_numpy(), scan.missing_text())
+    return pd.Series(values, index=s.index, name=s.name)
+
+def apply_dates(s: pd.Series, plan: ColumnPlan, scan: ColumnScan = None, uniques=None) -> pd.Series:
+    """
+    parse_dates conversion for one column, given its plan. `scan`/`uniques` let a caller
+    that already factorized the column pass the per-code values to parse.
+    """
+    if not plan.parse_dates or not is_text_dtype(s.dtype):
+        return s
+    if scan is None:
+        scan = ColumnScan(s)
+    if uniques is None:
+        uniques = scan.uniques
+    # missing cells always come out NaT; everything else is parsed once per distinct value
+    parsed = parse_with_formats(uniques, plan.date_formats)
+    values = parsed.take(scan.codes, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(values, index=s.index, name=s.name)
+
+def convert_column(
+    s: pd.Series,
+    fix_numbers: bool = True,
+    parse_dates: bool = False,
+    plan: ColumnPlan = None,
+    cache_key=None,
+):
+    """Runs the fix_numbers and parse_dates steps on one column from a single scan. Returns (series, plan)."""
+    scan = None
+    if plan is None:
+        plan, scan = infer_column(s, fix_numbers=fix_numbers, parse_dates=parse_dates, cache_key=cache_key)
+    elif is_text_dtype(s.dtype):
+        scan = ColumnScan(s)
+    out = s
+    if fix_numbers:
+        out = apply_numeric(s, plan, scan)
+    if parse_dates and plan.parse_dates:
+        text = scan.numeric_text.to_numpy() if fix_numbers else None
+        out = apply_dates(out, plan, scan, uniques=text)
+    return out, plan
+
+def infer_types(df: pd.DataFrame, fix_numbers: bool = True, parse_dates: bool = True) -> dict:
+    """Column name -> ColumnPlan for every column of `df`."""
+    return {c: infer_column(df[c], fix_numbers, parse_dates)[0] for c in df.columns}
@@ -0,0 +1,285 @@
+# instructions.py
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+import numpy as np
+import pandas as pd
+
+from inference import is_text_dtype
+from metrics import StepRecorder
+
+# ---------------- Instruction plans ----------------
+# ai_apply_instructions_safe() compiles its text into a plan: a tuple of typed
+# operations, one per matched action, in the order they are written (any number
+# of each kind, separated by ";" or newlines). Compiled plans are cached by
+# instruction text.
+#
+# Applying a plan never builds an intermediate frame:
+# - renames and column drops only rewrite the list of output columns; a dropped
+#   column is never copied or converted (it is still read by a row filter
+#   written before the drop)
+# - every row filter is ANDed into one boolean mask
+# - fills and conversions run after the rows are selected, on the kept rows
+#   only; a filter that reads a converted column sees it converted (that column
+#   is converted in full first)
+# - the kept rows of the kept columns are copied once, at the end
+
+PLAN_CACHE_SIZE = 256
+
+# operations are separated by ";" or a newline; no capture runs past a separator
+STATEMENT_SEP_RE = re.compile(r"[;\n]")
+REN_RE = re.compile(r"rename\s+([^;\n]+)", re.I)
+DROP_COLS_RE = re.compile(r"drop\s+columns?\s*:\s*([^;\n]+)", re.I)
+DROP_NULL_RE = re.compile(r"drop\s+rows\s+where\s+([^;\n]+?)\s+is\s+null", re.I)
+DROP_EQ_RE = re.compile(r"drop\s+rows\s+where\s+([^;\n]+?)\s*=\s*([^;\n]+)", re.I)
+FILL_RE = re.compile(r"fill\s+nulls\s+in\s+([^;\n]+?)\s+with\s+([^;\n]+)", re.I)
+NUMERIC_RE = re.compile(r"convert\s+([^;\n]+?)\s+to\s+numeric", re.I)
+DATE_RE = re.compile(r"parse\s+([^;\n]+?)\s+as\s+date(?:\s+format\s+([^;\n]+))?", re.I)
+
+_PLAN_CACHE = OrderedDict()  # instruction text -> tuple of operations
+
+# ---- operations ----
+@dataclass(frozen=True)
+class Rename:
+    mapping: tuple                 # ((old, new), ...)
+
+@dataclass(frozen=True)
+class DropColumns:
+    columns: tuple
+
+@dataclass(frozen=True)
+class DropNullRows:
+    column: str
+
+@dataclass(frozen=True)
+class DropEqualRows:
+    column: str
+    value: str
+
+@dataclass(frozen=True)
+class FillNulls:
+    column: str
+    value: object                  # a float when the text looks numeric
+
+@dataclass(frozen=True)
+class ToNumeric:
+    column: str
+
+@dataclass(frozen=True)
+class ParseDate:
+    column: str
+    format: str = ""
+
+STEP_NAMES = {
+    FillNulls: "fill_nulls",
+    ToNumeric: "to_numeric",
+    ParseDate: "parse_date",
+}
+
+# ---------------- Parsing ----------------
+def _split_items(s):
+    return [x.strip() for x in s.split(",") if x.strip()]
+
+def _rename_items(text: str):
+    mapping = {}
+    for p in _split_items(text):
+        if "->" in p:
+            left, right = [x.strip() for x in p.split("->", 1)]
+            mapping[left] = right
+    return Rename(tuple(mapping.items())) if mapping else None
+
+def _rename(m):
+    return _rename_items(m.group(1))
+
+def _fill_value(val: str):
+    # try numeric or leave as text
+    try:
+        return float(val) if "." in val or val.isdigit() else val
+    except Exception:
+        return val
+
+_PARSERS = [
+    (REN_RE, _rename),
+    (DROP_COLS_RE, lambda m: DropColumns(tuple(_split_items(m.group(1))))),
+    (DROP_NULL_RE, lambda m: DropNullRows(m.group(1).strip())),
+    (DROP_EQ_RE, lambda m: DropEqualRows(m.group(1).strip(), m.group(2).strip().strip("'\""))),
+    (FILL_RE, lambda m: FillNulls(m.group(1).strip(), _fill_value(m.group(2).strip().strip("'\"")))),
+    (NUMERIC_RE, lambda m: ToNumeric(m.group(1).strip())),
+    (DATE_RE, lambda m: ParseDate(m.group(1).strip(), (m.group(2) or "").strip())),
+]
+
+def _compile_statement(statement: str) -> list:
+    found = []
+    for rank, (regex, build) in enumerate(_PARSERS):
+        for m in regex.finditer(statement):
+            op = build(m)
+            if op is not None:
+                found.append((m.start(), rank, op))
+    return [op for _, _, op in sorted(found, key=lambda x: x[:2])]
+
+def compile_instructions(text: str) -> tuple:
+    """The operations in `text`, in the order they are written (cached by text)."""
+    text = (text or "").strip()
+    if text in _PLAN_CACHE:
+        _PLAN_CACHE.move_to_end(text)
+        return _PLAN_CACHE[text]
+    plan = []
+    for statement in STATEMENT_SEP_RE.split(text):
+        ops = _compile_statement(statement)
+        if not ops and plan:
+            # a bare item list continues the list before it:
+            # "rename a -> b; c -> d", "drop columns: x; y"
+            last = plan[-1]
+            if isinstance(last, Rename):
+                more = _rename_items(statement)
+                if more is not None:
+                    plan[-1] = Rename(last.mapping + more.mapping)
+            elif isinstance(last, DropColumns) and _split_items(statement):
+                plan[-1] = DropColumns(last.columns + tuple(_split_items(statement)))
+        plan.extend(ops)
+    plan = tuple(plan)
+    _PLAN_CACHE[text] = plan
+    if len(_PLAN_CACHE) > PLAN_CACHE_SIZE:
+        _PLAN_CACHE.popitem(last=False)
+    return plan
+
+# ---- JSON form (recipes.py stores compiled plans) ----
+_OPERATIONS = {cls.__name__: cls for cls in (Rename, DropColumns, DropNullRows, DropEqualRows, FillNulls, ToNumeric, ParseDate)}
+
+def _as_lists(value):
+    return [_as_lists(v) for v in value] if isinstance(value, tuple) else value
+
+def plan_to_dicts(plan: tuple) -> list:
+    return [{"op": type(op).__name__, **{k: _as_lists(v) for k, v in asdict(op).items()}} for op in plan]
+
+def plan_from_dicts(items: list) -> tuple:
+    plan = []
+    for item in items:
+        fields = dict(item)
+        cls = _OPERATIONS.get(fields.pop("op", None))
+        if cls is None:
+            raise ValueError(f"unknown instruction operation: {item!r}")
+        if cls is Rename:
+            fields["mapping"] = tuple(tuple(pair) for pair in fields["mapping"])
+        elif cls is DropColumns:
+            fields["columns"] = tuple(fields["columns"])
+        plan.append(cls(**fields))
+    return tuple(plan)
+
+# ---------------- Execution ----------------
+def _fillable(s: pd.Series, value) -> pd.Series:
+    # Arrow-backed columns (the pyarrow CSV reader) reject a fill value of another kind
+    # (0.0 in a string column, text in a number column) and truncate 0.5 in an int
+    # column; those are filled in the NumPy form pd.read_csv would have given them
+    if not isinstance(s.dtype, (pd.ArrowDtype, pd.StringDtype)):
+        return s
+    number = not isinstance(value, str)
+    if is_text_dtype(s.dtype):
+        return s if not number else s.astype(object)
+    if number and s.dtype.kind in "iuf":
+        return s if s.dtype.kind == "f" or float(value).is_integer() else s.astype("float64")
+    return s.astype(object)
+
+def _transform(s: pd.Series, op) -> pd.Series:
+    if isinstance(op, FillNulls):
+        return _fillable(s, op.value).fillna(op.value)
+    if isinstance(op, ToNumeric):
+        return pd.to_numeric(s.astype(str).str.replace(",", "", regex=False).str.strip(), errors="coerce")
+    if op.format:
+        return pd.to_datetime(s, errors="coerce", format=op.format)
+    return pd.to_datetime(s, errors="coerce")
+
+def _describe(op) -> str:
+    if isinstance(op, FillNulls):
+        return f"Filled nulls in {op.column} with {op.value}"
+    if isinstance(op, ToNumeric):
+        return f"Converted {op.column} to numeric"
+    if op.format:
+        return f"Parsed {op.column} as date with format {op.format}"
+    return f"Parsed {op.column} as date (auto-detect)"
+
+class _Column:
+    """An output column: its current name, its position in the input, and its deferred conversions."""
+    __slots__ = ("name", "pos", "values", "pending")
+
+    def __init__(self, name, pos):
+        self.name = name
+        self.pos = pos
+        self.values = None         # full-length converted values, once a row filter needed them
+        self.pending = []          # (position in the plan, operation)
+
+def apply_plan(df: pd.DataFrame, plan: tuple, step_metrics: list = None):
+    """Applies compiled operations to `df`; returns (df_out, change_log). `df` is not modified."""
+    rec = StepRecorder("instructions", df, step_metrics)
+    log = []
+    columns = [_Column(name, i) for i, name in enumerate(df.columns)]
+    mask, kept = None, len(df)
+
+    def find(name):
+        return next((c for c in columns if c.name == name), None)
+
+    def current(col) -> pd.Series:
+        if col.pending:
+            s = df.iloc[:, col.pos] if col.values is None else col.values
+            for _, op in col.pending:
+                s = _transform(s, op)
+            col.values, col.pending = s, []
+        return df.iloc[:, col.pos] if col.values is None else col.values
+
+    with rec.step("select", df) as probe:
+        for seq, op in enumerate(plan):
+            if isinstance(op, Rename):
+                mapping = dict(op.mapping)
+                for col in columns:
+                    col.name = mapping.get(col.name, col.name)
+                log.append(f"Renamed columns: {mapping}")
+            elif isinstance(op, DropColumns):
+                names = {c.name for c in columns}
+                dropped = [c for c in op.columns if c in names]
+                if dropped:
+                    columns = [c for c in columns if c.name not in dropped]
+                    log.append(f"Dropped columns: {dropped}")
+            elif isinstance(op, (DropNullRows, DropEqualRows)):
+                col = find(op.column)
+                if col is None:
+                    continue
+                s = current(col)
+                if isinstance(op, DropNullRows):
+                    keep = ~s.isna().to_numpy(dtype=bool)
+                    what = "is null"
+                else:
+                    keep = (s != op.value).fillna(True).to_numpy(dtype=bool)
+                    what = f"== {op.value}"
+                mask = keep if mask is None else mask & keep
+                before, kept = kept, int(np.count_nonzero(mask))
+                log.append(f"Dropped {before - kept} rows where {op.column} {what}")
+            else:
+                col = find(op.column)
+                if col is not None:
+                    col.pending.append((seq, op))
+                    log.append(_describe(op))
+
+        positions = [c.pos for c in columns]
+        rows = None if mask is None or kept == len(df) else np.flatnonzero(mask)
+        if rows is None:
+            out = df.iloc[:, positions]  # a take: copies without consolidating blocks as df.copy() does
+        else:
+            out = df.take(rows) if positions == list(range(df.shape[1])) else df.iloc[rows, positions]
+        for i, col in enumerate(columns):
+            if col.values is not None:
+                out.isetitem(i, (col.values if rows is None else col.values.take(rows)).array)
+        out.columns = [c.name for c in columns]
+        out.index = pd.RangeIndex(len(out))
+        probe.out = out
+        probe.attributes["operations"] = len(plan)
+
+    deferred = sorted((seq, i, op) for i, col in enumerate(columns) for seq, op in col.pending)
+    for _, i, op in deferred:
+        col = columns[i]
+        with rec.step(STEP_NAMES[type(op)], out) as probe:
+            out.isetitem(i, _transform(out.iloc[:, i], op).array)
+            probe.out = out
+            probe.columns = [col.name]
+
+    rec.finish(out)
+    return out, log
@@ -0,0 +1,295 @@
+# metrics.py
+import os
+import time
+import uuid
+import logging
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+import numpy as np
+import pandas as pd
+
+# OpenTelemetry is optional: without it SpanHook keeps OTel-shaped span dicts.
+try:
+    from opentelemetry import trace as otel_trace
+except Exception:
+    otel_trace = None
+
+# ---------------- Per-step metrics ----------------
+# clean_dataframe (through pipeline.CleaningDAG) and ai_apply_instructions_safe
+# time every step they run: wall and CPU time, rows and columns in/out, the
+# columns whose values the step replaced, and, while tracemalloc is tracing,
+# the peak bytes allocated. Each StepMetrics goes to the caller's `step_metrics`
+# list and to every registered hook:
+#
+#     metrics.register_hook(metrics.LoggingHook())
+#     metrics.register_hook(metrics.PrometheusTextfileHook("/var/lib/node_exporter/cleanmycsv.prom"))
+#     metrics.register_hook(metrics.SpanHook())      # real spans when opentelemetry is installed
+#
+# Nothing is measured when no list is passed and no hook is registered.
+# CPU time is this process's (worker processes of a ColumnPool are not included).
+
+_HOOKS = []
+
+@dataclass
+class StepMetrics:
+    name: str                      # "clean.trim_spaces", "instructions.fill_nulls", or the run itself ("clean")
+    run_id: str
+    wall_seconds: float
+    cpu_seconds: float
+    rows_in: int
+    rows_out: int
+    cols_in: int
+    cols_out: int
+    columns_touched: list = field(default_factory=list)
+    bytes_allocated: int = None    # tracemalloc peak above the step's start; None when not tracing
+    started_at: float = 0.0        # epoch seconds
+    attributes: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+def register_hook(hook) -> None:
+    _HOOKS.append(hook)
+
+def unregister_hook(hook) -> None:
+    if hook in _HOOKS:
+        _HOOKS.remove(hook)
+
+def metrics_table(steps) -> pd.DataFrame:
+    """
+    StepMetrics as a DataFrame (one row per step), e.g. for st.dataframe. The
+    bytes_allocated column is left out unless tracemalloc was tracing during some step.
+    """
+    rows = []
+    for m in steps:
+        d = m.to_dict()
+        d["columns_touched"] = len(m.columns_touched)
+        d.update(d.pop("attributes"))
+        d.pop("run_id")
+        d.pop("started_at")
+        if m.bytes_allocated is None:
+            d.pop("bytes_allocated")
+        rows.append(d)
+    return pd.DataFrame(rows)
+
+# ---- column snapshots ----
+def _column_refs(df: pd.DataFrame) -> list:
+    # holding the arrays keeps their memory from being reused, so identity checks stay valid
+    refs = []
+    for i in range(df.shape[1]):
+        s = df.iloc[:, i]
+        refs.append((df.columns[i], np.asarray(s) if isinstance(s.dtype, np.dtype) else s.array))
+    return refs
+
+def _same(a, b) -> bool:
+    if isinstance(a, np.ndarray) and isinstance(b, np.ndarray):
+        return np.may_share_memory(a, b)
+    return a is b
+
+def columns_touched(before: list, rows_before: int, after: pd.DataFrame) -> list:
+    """Columns of `after` that are new, renamed or hold new values, given _column_refs of the input."""
+    if len(after) != rows_before:
+        return [str(c) for c in after.columns]  # rows filtered: every column was rebuilt
+    now = _column_refs(after)
+    if len(now) == len(before):
+        pairs = zip(before, now)
+    else:
+        by_name = {name: ref for name, ref in before}
+        pairs = [((name, by_name.get(name)), (name, ref)) for name, ref in now]
+    return [str(n1) for (n0, r0), (n1, r1) in pairs if n0 != n1 or r0 is None or not _same(r0, r1)]
+
+# ---------------- Recorder ----------------
+class _Probe:
+    """What a step reports back: its output frame and, optionally, the columns it touched."""
+    def __init__(self):
+        self.out = None
+        self.columns = None
+        self.attributes = {}
+
+class StepRecorder:
+    """
+    Times the steps of one run. `step_metrics` (a caller's list) receives each
+    StepMetrics, then a final one for the whole run; registered hooks see the same.
+
+        rec = StepRecorder("clean", df, step_metrics)
+        with rec.step("trim_spaces", df) as probe:
+            probe.out = trim_whitespace(df)
+        rec.finish(probe.out)
+    """
+
+    def __init__(self, run: str, df: pd.DataFrame, step_metrics: list = None, hooks=None):
+        self.run = run
+        self.shape_in = df.shape
+        self.sink = step_metrics
+        self.hooks = list(_HOOKS if hooks is None else hooks)
+        self.enabled = step_metrics is not None or bool(self.hooks)
+        self.run_id = uuid.uuid4().hex
+        self.steps = []
+        self._start = (time.time(), time.perf_counter(), time.process_time())
+
+    @contextmanager
+    def step(self, name: str, df: pd.DataFrame):
+        probe = _Probe()
+        if not self.enabled:
+            yield probe
+            return
+        rows_in, cols_in = df.shape
+        refs = _column_refs(df)
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+        started_at, t0, c0 = time.time(), time.perf_counter(), time.process_time()
+        yield probe
+        wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+        allocated = tracemalloc.get_traced_memory()[1] - base if tracing else None
+        out = probe.out if probe.out is not None else df
+        touched = probe.columns if probe.columns is not None else columns_touched(refs, rows_in, out)
+        self._emit(StepMetrics(
+            f"{self.run}.{name}", self.run_id, wall, cpu, rows_in, len(out), cols_in, out.shape[1],
+            [str(c) for c in touched], allocated, started_at, dict(probe.attributes),
+        ))
+
+    def finish(self, df_out: pd.DataFrame) -> None:
+        """Emits the whole-run StepMetrics and lets hooks flush."""
+        if not self.enabled:
+            return
+        started_at, t0, c0 = self._start
+        touched = sorted({c for m in self.steps for c in m.columns_touched if c in set(map(str, df_out.columns))})
+        total = StepMetrics(
+            self.run, self.run_id, time.perf_counter() - t0, time.process_time() - c0,
+            self.shape_in[0], len(df_out), self.shape_in[1], df_out.shape[1], touched, None, started_at,
+            {"steps": len(self.steps)},
+        )
+        if self.sink is not None:
+            self.sink.append(total)
+        for hook in self.hooks:
+            hook.on_run(total, list(self.steps))
+
+    def _emit(self, m: StepMetrics) -> None:
+        self.steps.append(m)
+        if self.sink is not None:
+            self.sink.append(m)
+        for hook in self.hooks:
+            hook.on_step(m)
+
+# ---------------- Hooks ----------------
+class MetricsHook:
+    """Base class: override on_step (each step) and/or on_run (once per run, after its steps)."""
+
+    def on_step(self, m: StepMetrics) -> None:
+        pass
+
+    def on_run(self, run: StepMetrics, steps: list) -> None:
+        pass
+
+class LoggingHook(MetricsHook):
+    """One log line per step and per run on the "cleanmycsv.metrics" logger."""
+
+    def __init__(self, logger: logging.Logger = None, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger("cleanmycsv.metrics")
+        self.level = level
+
+    def _log(self, m: StepMetrics) -> None:
+        self.logger.log(
+            self.level, "%s wall=%.4fs cpu=%.4fs rows=%d->%d cols=%d->%d touched=%d alloc=%s",
+            m.name, m.wall_seconds, m.cpu_seconds, m.rows_in, m.rows_out, m.cols_in, m.cols_out,
+            len(m.columns_touched), m.bytes_allocated, extra={"step_metrics": m.to_dict()},
+        )
+
+    def on_step(self, m):
+        self._log(m)
+
+    def on_run(self, run, steps):
+        self._log(run)
+
+class PrometheusTextfileHook(MetricsHook):
+    """
+    Cumulative per-step counters in the Prometheus text format, rewritten atomically
+    at the end of every run (for node_exporter's textfile collector).
+    """
+
+    PREFIX = "cleanmycsv_step"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.totals = {}  # step -> {metric: value}
+
+    def on_step(self, m):
+        t = self.totals.setdefault(m.name, dict.fromkeys(
+            ("runs", "seconds", "cpu_seconds", "rows_in", "rows_out", "bytes_allocated"), 0))
+        t["runs"] += 1
+        t["seconds"] += m.wall_seconds
+        t["cpu_seconds"] += m.cpu_seconds
+        t["rows_in"] += m.rows_in
+        t["rows_out"] += m.rows_out
+        t["bytes_allocated"] += m.bytes_allocated or 0
+
+    def on_run(self, run, steps):
+        self.on_step(run)
+        self.write()
+
+    def render(self) -> str:
+        lines = []
+        for metric in ("runs", "seconds", "cpu_seconds", "rows_in", "rows_out", "bytes_allocated"):
+            name = f"{self.PREFIX}_{metric}_total"
+            lines.append(f"# TYPE {name} counter")
+            for step, t in sorted(self.totals.items()):
+                lines.append(f'{name}{{step="{step}"}} {t[metric]!r}')
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> None:
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(self.render())
+        os.replace(tmp, self.path)
+
+class SpanHook(MetricsHook):
+    """
+    One span per run with a child span per step. With opentelemetry installed the
+    spans go to its tracer (so to whatever exporter is configured); otherwise they
+    are kept in `spans` as dicts shaped like OTLP spans.
+    """
+
+    def __init__(self, tracer=None, keep: int = 1000):
+        self.tracer = tracer or (otel_trace.get_tracer("cleanmycsv") if otel_trace is not None else None)
+        self.keep = keep
+        self.spans = []
+
+    @staticmethod
+    def _attributes(m: StepMetrics) -> dict:
+        attrs = {
+            "cleanmycsv.rows_in": m.rows_in, "cleanmycsv.rows_out": m.rows_out,
+            "cleanmycsv.cols_in": m.cols_in, "cleanmycsv.cols_out": m.cols_out,
+            "cleanmycsv.cpu_seconds": m.cpu_seconds,
+            "cleanmycsv.columns_touched": len(m.columns_touched),
+        }
+        if m.bytes_allocated is not None:
+            attrs["cleanmycsv.bytes_allocated"] = m.bytes_allocated
+        attrs.update({f"cleanmycsv.{k}": v for k, v in m.attributes.items() if isinstance(v, (bool, int, float, str))})
+        return attrs
+
+    @staticmethod
+    def _window(m: StepMetrics):
+        start = int(m.started_at * 1e9)
+        return start, start + int(m.wall_seconds * 1e9)
+
+    def on_run(self, run, steps):
+        if self.tracer is not None:
+            start, end = self._window(run)
+            root = self.tracer.start_span(run.name, start_time=start, attributes=self._attributes(run))
+            ctx = otel_trace.set_span_in_context(root)
+            for m in steps:
+                s, e = self._window(m)
+                self.tracer.start_span(m.name, context=ctx, start_time=s, attributes=self._attributes(m)).end(end_time=e)
+            root.end(end_time=end)
+            return
+        trace_id, root_id = run.run_id, uuid.uuid4().hex[:16]
+        for m, span_id, parent in [(run, root_id, None)] + [(m, uuid.uuid4().hex[:16], root_id) for m in steps]:
+            start, end = self._window(m)
+            self.spans.append({
+                "trace_id": trace_id, "span_id": span_id, "parent_span_id": parent, "name": m.name,
+                "start_time_unix_nano": start, "end_time_unix_nano": end, "attributes": self._attributes(m),
+            })
+        del self.spans[:-self.keep]
@@ -0,0 +1,232 @@
+# parallel.py
+import os
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+import pandas as pd
+
+from cleaner import trim_series
+from inference import convert_column, header_signature, infer_column, is_text_dtype
+
+# Arrow is optional: without it columns are shipped to workers as pickles.
+try:
+    import pyarrow as pa
+except Exception:
+    pa = None
+
+# ---------------- Process-pool column backend ----------------
+# The per-column steps of clean_dataframe() (trim, numeric coercion, date
+# parsing) are independent per column, so ColumnPool fans them out to worker
+# processes. Columns travel as Arrow IPC streams written into shared memory;
+# the worker maps the segment instead of unpickling a copy of the column.
+# Mixed-type object columns (e.g. str + int cells) have no Arrow type and fall
+# back to pickling. Trimming is row-local, so very tall columns are also split
+# into row blocks; numeric/date steps decide per whole column and are not split.
+# A conversion step ships the column's ColumnPlan (when the caller has one) and
+# its date-format cache key with the column, and returns the plan it applied.
+
+ROW_BLOCK = 2_000_000
+
+_STEPS = {
+    "trim": trim_series,
+}
+# conversion steps: (fix_numbers, parse_dates) for inference.convert_column
+_CONVERSIONS = {
+    "fix_numbers": (True, False),
+    "parse_dates": (False, True),
+    "fix_numbers+parse_dates": (True, True),
+}
+
+def _write_stream(sink, batch) -> None:
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+
+def _encode(s: pd.Series):
+    """Writes `s` to a shared-memory Arrow stream. Returns a small picklable handle, or the Series itself."""
+    if pa is None:
+        return s
+    values = s.to_numpy()
+    if not isinstance(s.dtype, np.dtype):
+        return s
+    if s.dtype == object:
+        if pd.api.types.infer_dtype(s, skipna=True) not in ("string", "empty"):
+            return s
+        arr = pa.array(values, type=pa.string(), from_pandas=True)
+        # Arrow has one kind of null; remember which missing cells were NaN rather than None
+        nan_mask = pa.array(s.isna().to_numpy() & (values != None))  # noqa: E711
+    elif s.dtype.kind in "biuf":
+        arr, nan_mask = pa.array(values), None
+    elif s.dtype.kind == "M":
+        arr, nan_mask = pa.array(values, from_pandas=True), None
+    else:
+        return s
+    cols = [arr] if nan_mask is None else [arr, nan_mask]
+    batch = pa.RecordBatch.from_arrays(cols, names=["v", "nan"][: len(cols)])
+    # size the segment with a dry run, then serialise straight into shared memory
+    mock = pa.MockOutputStream()
+    _write_stream(mock, batch)
+    size = mock.size()
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    target = pa.py_buffer(shm.buf)
+    _write_stream(pa.FixedSizeBufferWriter(target), batch)
+    del target
+    handle = {"shm": shm.name, "size": size, "name": s.name, "dtype": str(s.dtype)}
+    shm.close()
+    # the reading side unlinks the segment, so this process must not track it
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return handle
+
+def _decode(handle, index=None, unlink: bool = True) -> pd.Series:
+    if isinstance(handle, pd.Series):
+        return handle if index is None else handle.set_axis(index)
+    shm = shared_memory.SharedMemory(name=handle["shm"])
+    if not unlink:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    try:
+        view = shm.buf[: handle["size"]]
+        table = pa.ipc.open_stream(pa.py_buffer(view)).read_all()
+        arr = table.column("v")
+        if table.num_columns > 1:
+            values = arr.to_numpy(zero_copy_only=False).astype(object)
+            values[table.column("nan").to_numpy(zero_copy_only=False)] = np.nan
+        elif pa.types.is_timestamp(arr.type):
+            values = arr.to_pandas().to_numpy().astype(handle["dtype"])
+        else:
+            values = arr.to_numpy(zero_copy_only=False).copy()
+        del table, arr
+        view.release()
+    finally:
+        shm.close()
+        if unlink:
+            shm.unlink()
+    return pd.Series(values, index=index, name=handle["name"])
+
+def _release(handle) -> None:
+    """Frees the segment behind `handle` without reading it (no-op for a Series)."""
+    if isinstance(handle, pd.Series):
+        return
+    try:
+        shm = shared_memory.SharedMemory(name=handle["shm"])
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+def _discard(handle, fut) -> None:
+    """Drops a job that will not be collected, freeing its input and result segments."""
+    if fut.cancel():
+        _release(handle)
+        return
+    def done(f):
+        # the worker may still be reading its input, so free it only once the job is over
+        _release(handle)
+        if not f.cancelled() and f.exception() is None:
+            _release(f.result()[0])
+    fut.add_done_callback(done)
+
+def _run_steps(handle, steps, plan=None, cache_key=None):
+    s = _decode(handle, unlink=False)
+    for step in steps:
+        if step in _CONVERSIONS:
+            fix_numbers, parse_dates = _CONVERSIONS[step]
+            s, plan = convert_column(s, fix_numbers, parse_dates, plan=plan, cache_key=cache_key)
+        else:
+            s = _STEPS[step](s)
+    return _encode(s), plan
+
+def _needs(step: str, s: pd.Series) -> bool:
+    if step == "trim":
+        return s.dtype == object or isinstance(s.dtype, (pd.StringDtype, pd.ArrowDtype))
+    return is_text_dtype(s.dtype)
+
+class ColumnPool:
+    """
+    Runs per-column cleaning steps on a process pool.
+
+        with ColumnPool(workers=8) as pool:
+            out = pool.map_columns(df, ["fix_numbers", "parse_dates"])
+    """
+
+    def __init__(self, workers: int = None, row_block: int = ROW_BLOCK):
+        self.workers = workers or os.cpu_count() or 1
+        self.row_block = row_block
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def map_columns(self, df: pd.DataFrame, steps, inplace: bool = False, plans: dict = None) -> pd.DataFrame:
+        """
+        Runs every column through `steps` in order; returns a shallow copy unless `inplace`.
+        `steps` may hold one conversion step (fix_numbers / parse_dates); pass a dict as
+        `plans` to supply ColumnPlans by column and receive the plan of every column.
+        """
+        steps = list(steps)
+        conversions = [st for st in steps if st in _CONVERSIONS]
+        if len(conversions) > 1:
+            raise ValueError(f"map_columns runs one conversion step at a time, got {conversions}")
+        split_rows = steps == ["trim"] and len(df) > self.row_block
+        signature = header_signature(df.columns) if conversions else None
+        jobs = []
+        try:
+            for i in range(df.shape[1]):
+                s = df.iloc[:, i]
+                name = df.columns[i]
+                plan = plans.get(name) if plans is not None else None
+                todo = [st for st in steps if _needs(st, s)]
+                if not todo:
+                    if conversions and plans is not None and plan is None:
+                        # nothing to convert (numeric, datetime, ... dtypes): the plan just records the dtype
+                        plans[name] = infer_column(s, *_CONVERSIONS[conversions[0]])[0]
+                    continue
+                bounds = range(0, len(s), self.row_block) if split_rows else [0]
+                parts = []
+                jobs.append((i, parts))
+                for start in bounds:
+                    part = s.iloc[start:start + self.row_block] if split_rows else s
+                    handle = _encode(part)
+                    job = self._executor.submit(_run_steps, handle, todo, plan, (name, signature))
+                    parts.append((handle, job))
+
+            out = df if inplace else df.copy(deep=False)
+            for i, parts in jobs:
+                pieces = []
+                while parts:
+                    handle, fut = parts.pop(0)
+                    try:
+                        result, plan = fut.result()
+                    finally:
+                        _release(handle)
+                    pieces.append(_decode(result))
+                if conversions and plans is not None:
+                    plans[df.columns[i]] = plan
+                col = pieces[0] if len(pieces) == 1 else pd.concat(pieces, ignore_index=True)
+                out.isetitem(i, col.set_axis(df.index).rename(df.columns[i]))
+            return out
+        finally:
+            # collected jobs are popped, so anything left here is the error path's to free
+            for _, parts in jobs:
+                for handle, fut in parts:
+                    _discard(handle, fut)
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_POOLS = {}
+
+def get_pool(workers: int = None) -> ColumnPool:
+    """Process pools are expensive to start; reuse one per worker count."""
+    key = workers or os.cpu_count() or 1
+    if key not in _POOLS:
+        _POOLS[key] = ColumnPool(key)
+    return _POOLS[key]
+
+@atexit.register
+def _close_pools():
+    for pool in _POOLS.values():
+        pool.close()
+    _POOLS.clear()
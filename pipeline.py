@@ -0,0 +1,248 @@
+# pipeline.py
+import hashlib
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict, replace
+import pandas as pd
+
+from cache import frame_fingerprint
+from cleaner import convert_columns, standardize_column_name, trim_whitespace
+from metrics import StepRecorder
+from profiler import discard_profile
+
+# ---------------- Cleaning DAG ----------------
+# clean_dataframe() runs its steps as a chain of StepNodes. Each node's output is
+# identified by a key derived from its upstream key plus the options the node
+# reads, so with a cache (cache.ResultCache) every intermediate frame is
+# memoized: flipping parse_dates reuses the trimmed / deduplicated / numeric
+# frames and recomputes only the date node. Disabled nodes pass their input
+# key through, so enabling or disabling a step leaves upstream keys untouched.
+#
+# Cached frames are never written to: every node works on a shallow copy and
+# replaces whole columns or builds a filtered frame. After run(), `last_run`
+# lists each node with its key, whether it was a cache hit, and its runtime;
+# pass `step_metrics` (or register a metrics hook) for full per-step metrics.
+
+@dataclass
+class StepNode:
+    name: str
+    run: callable                  # (df, ctx) -> df
+    params: dict = field(default_factory=dict)  # options this node's output depends on
+    enabled: bool = True
+    cacheable: bool = True         # False for stateful steps (a shared RowDeduplicator)
+
+@dataclass
+class NodeRun:
+    step: str
+    key: str
+    enabled: bool
+    cache_hit: bool
+    seconds: float
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+@dataclass
+class _Context:
+    inplace: bool = False
+    pool: object = None
+    deduplicator: object = None
+    given_plans: dict = None       # ColumnPlans supplied by the caller
+    plans: dict = field(default_factory=dict)  # ColumnPlans produced by this run
+
+@contextmanager
+def _track_memory(step: str, report):
+    """Records the peak bytes allocated while a step runs (numpy/pandas buffers included)."""
+    if report is None:
+        yield
+        return
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    try:
+        yield
+    finally:
+        after, peak = tracemalloc.get_traced_memory()
+        report.append({"step": step, "peak_bytes": peak - before, "net_bytes": after - before})
+        if started:
+            tracemalloc.stop()
+
+def _take_rows(df: pd.DataFrame, keep: pd.Series, inplace: bool) -> pd.DataFrame:
+    if inplace:
+        if not df.index.is_unique:
+            df.index = pd.RangeIndex(len(df))
+            keep.index = df.index
+        df.drop(index=df.index[~keep.to_numpy()], inplace=True)
+        return df
+    return df[keep]
+
+# ---- step functions: each may modify `df` (owned by the runner) and returns the result ----
+def _trim(df, ctx):
+    if ctx.pool is not None:
+        return ctx.pool.map_columns(df, ["trim"], inplace=True)
+    return trim_whitespace(df, inplace=True)
+
+def _standardize(df, ctx):
+    df.columns = [standardize_column_name(c) for c in df.columns]
+    return df
+
+def _drop_empty_rows(df, ctx):
+    # row/column drops only materialise a new frame when something is dropped
+    keep = df.notna().any(axis=1)
+    return df if keep.all() else _take_rows(df, keep, ctx.inplace)
+
+def _drop_empty_cols(df, ctx):
+    empty = df.columns[df.isna().all().to_numpy()]
+    if not len(empty):
+        return df
+    if ctx.inplace:
+        df.drop(columns=empty, inplace=True)
+        return df
+    return df.drop(columns=empty)
+
+def _drop_duplicates(df, ctx):
+    if ctx.deduplicator is not None:
+        dup = pd.Series(~ctx.deduplicator.mark_new(df), index=df.index)
+    else:
+        dup = df.duplicated()
+    return _take_rows(df, ~dup, ctx.inplace) if dup.any() else df
+
+def _converter(fix_numbers: bool, parse_dates: bool):
+    step = "+".join(n for n, on in (("fix_numbers", fix_numbers), ("parse_dates", parse_dates)) if on)
+
+    def run(df, ctx):
+        plans = dict(ctx.given_plans or {})
+        if ctx.pool is not None:
+            ctx.pool.map_columns(df, [step], inplace=True, plans=plans)
+        else:
+            convert_columns(df, fix_numbers, parse_dates, plans)
+        _merge_plans(ctx.plans, plans)
+        return df
+
+    return step, run
+
+def _merge_plans(into: dict, plans: dict) -> None:
+    # a date decision from the parse_dates node completes the numeric plan of the same column
+    # (plans may be shared with cached snapshots, so they are replaced, never modified)
+    for col, plan in plans.items():
+        prev = into.get(col)
+        if prev is None:
+            into[col] = plan
+        elif plan.parse_dates:
+            into[col] = replace(prev, parse_dates=True, date_formats=plan.date_formats)
+
+def _key(parent: str, node: StepNode) -> str:
+    payload = repr((parent, node.name, sorted(node.params.items())))
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+class CleaningDAG:
+    """
+    The clean_dataframe() steps as memoizable nodes.
+
+        dag = CleaningDAG(cache=ResultCache())
+        out = dag.run(df, source_key=upload_hash, parse_dates=True)
+        dag.explain()   # one row per step: key, cache_hit, seconds
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.last_run = []
+
+    def build(
+        self,
+        trim_spaces: bool = True,
+        standardize_columns: bool = True,
+        drop_empty_rows: bool = True,
+        drop_empty_cols: bool = True,
+        drop_duplicates: bool = True,
+        fix_numbers: bool = True,
+        parse_dates: bool = False,
+        fuse: bool = False,
+        stateful_dedup: bool = False,
+    ) -> list:
+        nodes = [
+            StepNode("trim_spaces", _trim, enabled=trim_spaces),
+            StepNode("standardize_columns", _standardize, enabled=standardize_columns),
+            StepNode("drop_empty_rows", _drop_empty_rows, enabled=drop_empty_rows),
+            StepNode("drop_empty_cols", _drop_empty_cols, enabled=drop_empty_cols),
+            StepNode("drop_duplicates", _drop_duplicates, enabled=drop_duplicates, cacheable=not stateful_dedup),
+        ]
+        if fuse and fix_numbers and parse_dates:
+            # one scan per column decides and converts both (clean_dataframe without a cache)
+            name, run = _converter(True, True)
+            nodes.append(StepNode(name, run))
+        else:
+            # numbers first, dates on the result: parse_dates can change without redoing numbers
+            nodes.append(StepNode("fix_numbers", _converter(True, False)[1], enabled=fix_numbers))
+            nodes.append(StepNode("parse_dates", _converter(False, True)[1], enabled=parse_dates))
+        return nodes
+
+    def run(
+        self,
+        df: pd.DataFrame,
+        source_key: str = None,
+        inplace: bool = False,
+        memory_report: list = None,
+        deduplicator=None,
+        workers: int = 1,
+        column_types: dict = None,
+        step_metrics: list = None,
+        **options,
+    ) -> pd.DataFrame:
+        if inplace and self.cache is not None:
+            raise ValueError("inplace=True cannot be combined with a cache")
+        ctx = _Context(inplace=inplace, deduplicator=deduplicator, given_plans=dict(column_types or {}))
+        if workers and workers > 1:
+            from parallel import get_pool
+            ctx.pool = get_pool(workers)
+        nodes = self.build(
+            **options,
+            fuse=self.cache is None and ctx.pool is None,
+            stateful_dedup=deduplicator is not None,
+        )
+
+        key = None
+        if self.cache is not None:
+            key = source_key or frame_fingerprint(df)
+            if ctx.given_plans:
+                # supplied plans change the conversion result
+                key = _key(key, StepNode("column_types", None, {c: repr(p) for c, p in ctx.given_plans.items()}))
+        out = df if inplace else df.copy(deep=False)
+        recorder = StepRecorder("clean", df, step_metrics)
+        self.last_run = []
+        for node in nodes:
+            if not node.enabled:
+                self.last_run.append(NodeRun(node.name, key, False, False, 0.0))
+                continue
+            key = _key(key, node) if key is not None and node.cacheable else None
+            hit = key is not None and key in self.cache
+            started = time.perf_counter()
+            with _track_memory(node.name, None if hit else memory_report), recorder.step(node.name, out) as probe:
+                if hit:
+                    out, plans = self.cache.get(key)
+                    self.cache.hits += 1
+                    ctx.plans = dict(plans)
+                else:
+                    out = node.run(out, ctx)
+                    if key is not None:
+                        self.cache.misses += 1
+                        self.cache.put(key, (out, dict(ctx.plans)))
+                probe.out = out
+                probe.attributes["cache_hit"] = hit
+            self.last_run.append(NodeRun(node.name, key, True, hit, time.perf_counter() - started))
+            if self.cache is not None:
+                out = out.copy(deep=False)  # the cached frame stays untouched by later nodes
+
+        if column_types is not None:
+            column_types.update(ctx.plans)
+        out.index = pd.RangeIndex(len(out))
+        if inplace:
+            discard_profile(df)
+        recorder.finish(out)
+        return out
+
+    def explain(self) -> pd.DataFrame:
+        return pd.DataFrame([r.to_dict() for r in self.last_run], columns=["step", "key", "enabled", "cache_hit", "seconds"])
@@ -0,0 +1,221 @@
+# profiler.py
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict, replace
+import numpy as np
+import pandas as pd
+
+from inference import is_text_dtype
+
+# ---------------- Frame profiler ----------------
+# data_quality_report needs, per frame: nulls, duplicate rows, dtypes and a few
+# sample values per column. Each column is factorized once; the codes give its
+# null count (code -1) and distinct count, its min/max come from the uniques
+# (far fewer than the rows), and only the sampled cells are turned into text.
+# Duplicate rows are counted from the same codes, combined into one integer key
+# per row, as DataFrame.duplicated() would factorize every column again.
+#
+# Text columns also get one fused scan over their distinct values (not their
+# rows) that flags leading spaces, trailing spaces and commas at once; the
+# flags are weighted by each value's frequency from the codes. ai_suggest_cleaning
+# reads its issues from the same profile.
+#
+# profile_frames() profiles several frames at once and factorizes a column
+# only once when frames share it (the same underlying array, e.g. a column the
+# cleaning steps left untouched). Profiles are cached per frame (PROFILE_CACHE_SIZE
+# most recent), so the report and the suggestions for one frame share one scan.
+# A cached profile is reused while the frame holds the same column arrays under
+# the same names. Code that changes a frame in place (clean_dataframe with
+# inplace=True) calls discard_profile(), since a freed column array's address
+# can be reused by its replacement.
+
+SAMPLE_VALUES = 3
+PROFILE_CACHE_SIZE = 8
+_KEY_LIMIT = 1 << 62
+
+_CACHE = OrderedDict()  # id(frame) -> (weakref to frame, column signature, FrameProfile)
+
+@dataclass
+class ColumnProfile:
+    name: object
+    dtype: str
+    nulls: int
+    distinct: int
+    min_value: object = None       # numeric / datetime / bool columns only
+    max_value: object = None
+    samples: list = field(default_factory=list)  # the first non-null values, as text
+    # text columns only: non-null values with a leading space, a trailing space, a comma
+    text: bool = False
+    leading_spaces: int = 0
+    trailing_spaces: int = 0
+    with_commas: int = 0
+    count: int = 0                 # non-null values
+
+    @property
+    def comma_ratio(self) -> float:
+        return self.with_commas / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+@dataclass
+class FrameProfile:
+    rows: int
+    cols: int
+    nulls: int
+    duplicates: int
+    columns: list                  # ColumnProfile per column, in frame order
+
+    def dtypes(self) -> dict:
+        return {c.name: c.dtype for c in self.columns}
+
+    def samples(self) -> dict:
+        return {c.name: c.samples for c in self.columns}
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([c.to_dict() for c in self.columns])
+
+def _array_key(s: pd.Series):
+    # identifies a column's data: the same buffer region (numpy) or the same array object
+    if isinstance(s.dtype, np.dtype):
+        a = np.asarray(s)
+        return ("np", a.__array_interface__["data"][0], a.shape, a.strides, a.dtype.str)
+    return ("ea", id(s.array), len(s))
+
+def _factorize(s: pd.Series):
+    try:
+        return pd.factorize(s, use_na_sentinel=True)
+    except TypeError:
+        # unhashable cells (lists, dicts): compare them by their text
+        return pd.factorize(s.map(str, na_action="ignore"), use_na_sentinel=True)
+
+def _min_max(s: pd.Series, uniques):
+    kind = s.dtype.kind if isinstance(s.dtype, np.dtype) else None
+    if kind is not None and kind in "iufbM" and len(uniques):
+        u = pd.Index(uniques)
+        return u.min(), u.max()
+    if kind is None and len(uniques) and (pd.api.types.is_numeric_dtype(s.dtype) or isinstance(s.dtype, pd.DatetimeTZDtype)):
+        u = pd.Series(uniques)
+        return u.min(), u.max()
+    return None, None
+
+_LEADING, _TRAILING, _COMMA = 1, 2, 4
+
+def _string_flags(uniques) -> np.ndarray:
+    # one pass over the distinct values, three checks per value (as astype(str) would render it)
+    return np.fromiter(
+        (
+            (v[:1] == " ") | ((v[-1:] == " ") << 1) | (("," in v) << 2)
+            for v in (u if isinstance(u, str) else str(u) for u in uniques)
+        ),
+        dtype=np.int8,
+        count=len(uniques),
+    )
+
+def _profile_column(name, s: pd.Series):
+    codes, uniques = _factorize(s)
+    valid = codes >= 0
+    present = np.flatnonzero(valid)[:SAMPLE_VALUES]
+    count = int(np.count_nonzero(valid))
+    lo, hi = _min_max(s, uniques)
+    profile = ColumnProfile(
+        name=name,
+        dtype=str(s.dtype),
+        nulls=int(len(codes) - count),
+        distinct=len(uniques),
+        min_value=lo,
+        max_value=hi,
+        samples=s.iloc[present].astype(str).tolist(),
+        count=count,
+    )
+    if is_text_dtype(s.dtype) and len(uniques):
+        freq = np.bincount(codes[valid], minlength=len(uniques))
+        flags = _string_flags(uniques)
+        profile.text = True
+        profile.leading_spaces = int(freq[(flags & _LEADING) > 0].sum())
+        profile.trailing_spaces = int(freq[(flags & _TRAILING) > 0].sum())
+        profile.with_commas = int(freq[(flags & _COMMA) > 0].sum())
+    elif is_text_dtype(s.dtype):
+        profile.text = True
+    return profile, codes, len(uniques)
+
+def count_duplicates(codes_list, sizes, rows: int) -> int:
+    """Rows equal to an earlier row, from per-column factorize codes (NaN equals NaN, as in duplicated())."""
+    if not codes_list or rows == 0:
+        return 0
+    key = np.zeros(rows, dtype=np.int64)
+    bound = 1
+    for codes, n in zip(codes_list, sizes):
+        n += 1  # code -1 (null) becomes 0
+        if bound * n >= _KEY_LIMIT:
+            key, uniq = pd.factorize(key)
+            key = key.astype(np.int64)
+            bound = len(uniq)
+        key = key * n + (codes + 1)
+        bound *= n
+    return int(rows - len(pd.unique(key)))
+
+def _signature(df: pd.DataFrame) -> tuple:
+    return (len(df), tuple(df.columns), tuple(_array_key(df.iloc[:, i]) for i in range(df.shape[1])))
+
+def _cached(df: pd.DataFrame, signature):
+    entry = _CACHE.get(id(df))
+    if entry is None:
+        return None
+    ref, sig, profile = entry
+    if ref() is not df or sig != signature:
+        del _CACHE[id(df)]
+        return None
+    _CACHE.move_to_end(id(df))
+    return profile
+
+def _remember(df: pd.DataFrame, signature, profile: FrameProfile) -> None:
+    _CACHE[id(df)] = (weakref.ref(df), signature, profile)
+    while len(_CACHE) > PROFILE_CACHE_SIZE:
+        _CACHE.popitem(last=False)
+
+def discard_profile(df: pd.DataFrame) -> None:
+    """Forgets the cached profile of `df`; call after modifying it in place."""
+    _CACHE.pop(id(df), None)
+
+def clear_profile_cache() -> None:
+    _CACHE.clear()
+
+def profile_frames(*frames) -> list:
+    """A FrameProfile per frame; columns shared between the frames are scanned once."""
+    seen = {}  # array key -> (column, profile, codes, n_uniques); holds the column so the key stays valid
+    out = []
+    for df in frames:
+        signature = _signature(df)
+        cached = _cached(df, signature)
+        if cached is not None:
+            out.append(cached)
+            continue
+        rows = len(df)
+        profiles, codes_list, sizes = [], [], []
+        for i in range(df.shape[1]):
+            s = df.iloc[:, i]
+            key = _array_key(s)
+            if key in seen:
+                _, prof, codes, n = seen[key]
+                prof = replace(prof, name=df.columns[i])
+            else:
+                prof, codes, n = _profile_column(df.columns[i], s)
+                seen[key] = (s, prof, codes, n)
+            profiles.append(prof)
+            codes_list.append(codes)
+            sizes.append(n)
+        profile = FrameProfile(
+            rows=rows,
+            cols=df.shape[1],
+            nulls=sum(p.nulls for p in profiles),
+            duplicates=count_duplicates(codes_list, sizes, rows),
+            columns=profiles,
+        )
+        _remember(df, signature, profile)
+        out.append(profile)
+    return out
+
+def profile_frame(df: pd.DataFrame) -> FrameProfile:
+    """The (cached) FrameProfile of `df`."""
+    return profile_frames(df)[0]
@@ -0,0 +1,385 @@
+# readers.py
+import io
+import os
+import mmap
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from dialect import Dialect, sniff_dialect
+from encoding import EncodingInfo, MemoryReader, detect_encoding
+
+# pyarrow is optional: without it every CSV goes through pandas' C parser.
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except Exception:
+    pa = None
+
+# python-calamine (Rust) is optional: without it .xlsx is streamed by openpyxl in read-only mode.
+try:
+    from python_calamine import CalamineWorkbook
+except Exception:
+    CalamineWorkbook = None
+
+# ---------------- CSV ingestion ----------------
+# read_csv_bytes() parses the raw upload bytes with the multi-threaded pyarrow
+# CSV reader, straight from the buffer (no decoded str, no StringIO copy) into
+# ArrowDtype columns. It falls back to pd.read_csv streaming from the same
+# buffer when pyarrow is missing or cannot parse the file (bytes invalid in the
+# detected encoding, a column whose type changes after the first block, ragged
+# rows, ...). Both readers take the EncodingInfo and Dialect sniffed from a
+# bounded sample of the bytes and transcode block by block while parsing; the
+# pandas path replaces undecodable bytes with U+FFFD instead of dropping them.
+#
+# The frame records how it was read in df.attrs["source"] (encoding,
+# confidence, dialect) for the data quality report.
+#
+# With workers > 1 (and pyarrow), a large input is split into byte ranges that
+# each hold whole records (split_records: a newline outside quotes, found on
+# the buffer itself) and the ranges are parsed concurrently on threads, each a
+# zero-copy slice of the buffer. Column types come from the first block, as in
+# a single read, and every range is read with them; when that does not work
+# out (an all-empty column in the first block, a value of another type later)
+# the file is read in one piece as before.
+#
+# Files on local disk are memory-mapped (map_file / read_csv_path / MappedFile)
+# rather than read into a bytes object: sniffing, range splitting and parsing
+# all read the mapping directly.
+
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024   # smaller inputs are parsed in one piece
+RANGE_MIN_BYTES = 4 * 1024 * 1024      # smallest byte range given to a worker
+_SPLITTABLE_ENCODINGS = ("utf-8", "ascii", "cp1252", "latin-1")  # "\n" and quotes are single bytes
+
+def _mangle_duplicates(names) -> list:
+    # same renaming pandas.read_csv applies: empty names -> "Unnamed: i"; a, a.1, a.2, ...
+    seen = {}
+    out = []
+    for i, name in enumerate(names):
+        if name == "":
+            name = f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            new = f"{name}.{seen[name]}"
+            while new in seen:
+                seen[name] += 1
+                new = f"{name}.{seen[name]}"
+            seen[new] = 0
+            out.append(new)
+        else:
+            seen[name] = 0
+            out.append(name)
+    return out
+
+def _arrow_options(dialect: Dialect, encoding: EncodingInfo):
+    parse_options = pa_csv.ParseOptions(
+        delimiter=dialect.delimiter,
+        quote_char=dialect.quotechar or False,
+        double_quote=dialect.doublequote,
+        escape_char=dialect.escapechar or False,
+    )
+    read_options = pa_csv.ReadOptions(
+        use_threads=True,
+        autogenerate_column_names=not dialect.has_header,
+        # Arrow reads UTF-8 (and skips its BOM) natively; anything else is transcoded per block
+        encoding="utf8" if encoding.is_utf8 else encoding.encoding,
+    )
+    return parse_options, read_options
+
+def _name_columns(df: pd.DataFrame, dialect: Dialect) -> pd.DataFrame:
+    # headerless files get the same names from either engine
+    if not dialect.has_header:
+        df.columns = [f"column_{i + 1}" for i in range(df.shape[1])]
+    return df
+
+def _arrow_schema(data, read_options, parse_options):
+    # the types Arrow infers from the first block
+    with pa_csv.open_csv(pa.BufferReader(pa.py_buffer(data)), read_options=read_options, parse_options=parse_options) as probe:
+        return probe.schema
+
+def read_csv_arrow(data, dialect: Dialect = None, encoding: EncodingInfo = None) -> pd.DataFrame:
+    dialect = dialect or Dialect()
+    parse_options, read_options = _arrow_options(dialect, encoding or EncodingInfo())
+    # pandas keeps dates as text until parse_dates asks for them; do the same here
+    # by reading any column Arrow would type as date/time as a string instead
+    schema = _arrow_schema(data, read_options, parse_options)
+    as_text = {
+        f.name: pa.string()
+        for f in schema
+        if pa.types.is_temporal(f.type)
+    }
+    convert_options = pa_csv.ConvertOptions(strings_can_be_null=True, column_types=as_text)
+    table = pa_csv.read_csv(
+        pa.BufferReader(pa.py_buffer(data)),
+        read_options=read_options,
+        parse_options=parse_options,
+        convert_options=convert_options,
+    )
+    table = table.rename_columns(_mangle_duplicates(table.column_names))
+    return _name_columns(table.to_pandas(types_mapper=pd.ArrowDtype), dialect)
+
+# ---- byte ranges ----
+def _find_byte(view: np.ndarray, byte: int, start: int, window: int = 1 << 16) -> int:
+    while start < len(view):
+        hits = np.flatnonzero(view[start:start + window] == byte)
+        if len(hits):
+            return start + int(hits[0])
+        start += window
+    return -1
+
+def split_records(data, parts: int, dialect: Dialect = None) -> list:
+    """
+    Up to `parts` (start, end) byte ranges covering `data`, each ending after a newline that
+    is outside quotes (so no record is cut); the first range holds the header.
+    """
+    dialect = dialect or Dialect()
+    view = np.frombuffer(memoryview(data).cast("B"), dtype=np.uint8)
+    n = len(view)
+    quote = ord(dialect.quotechar) if dialect.quotechar else None
+
+    def quotes(a, b):
+        return int(np.count_nonzero(view[a:b] == quote)) if quote is not None else 0
+
+    bounds, pos, odd = [0], 0, 0  # odd: an odd number of quotes before `pos` (inside a quoted field)
+    for i in range(1, parts):
+        target = max(n * i // parts, pos + 1)
+        if target >= n:
+            break
+        odd ^= quotes(pos, target) & 1
+        pos = target
+        while True:
+            nl = _find_byte(view, 0x0A, pos)
+            if nl < 0:
+                pos = n
+                break
+            odd ^= quotes(pos, nl) & 1
+            pos = nl + 1
+            if not odd:
+                break
+        if pos >= n:
+            break
+        bounds.append(pos)
+    bounds.append(n)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _read_ranges_arrow(data, dialect: Dialect, encoding: EncodingInfo, workers: int):
+    """The ranges of split_records() parsed on `workers` threads into one Table; None when not applicable."""
+    if dialect.escapechar or encoding.body_encoding not in _SPLITTABLE_ENCODINGS or "\r" == dialect.lineterminator:
+        return None
+    parts = min(workers, len(memoryview(data).cast("B")) // RANGE_MIN_BYTES)
+    if parts < 2:
+        return None
+    parse_options, read_options = _arrow_options(dialect, encoding)
+    schema = _arrow_schema(data, read_options, parse_options)
+    names = schema.names
+    if len(set(names)) != len(names):
+        return None  # column types are pinned by name
+    # all-empty columns of the first block stay unpinned; they must stay empty everywhere
+    empty = [f.name for f in schema if pa.types.is_null(f.type)]
+    types = {f.name: pa.string() if pa.types.is_temporal(f.type) else f.type for f in schema if f.name not in empty}
+    convert_options = pa_csv.ConvertOptions(strings_can_be_null=True, column_types=types)
+    view = memoryview(data).cast("B")
+
+    def read(i, start, end):
+        options = pa_csv.ReadOptions(
+            use_threads=False,
+            encoding=read_options.encoding,
+            column_names=None if i == 0 else names,
+            autogenerate_column_names=read_options.autogenerate_column_names if i == 0 else False,
+        )
+        return pa_csv.read_csv(
+            pa.BufferReader(pa.py_buffer(view[start:end])),
+            read_options=options, parse_options=parse_options, convert_options=convert_options,
+        )
+
+    ranges = split_records(data, parts, dialect)
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        tables = list(pool.map(lambda r: read(r[0], *r[1]), enumerate(ranges)))
+    if any(not pa.types.is_null(t.schema.field(name).type) for t in tables for name in empty):
+        return None  # a single read fails the same way, and falls back to pandas
+    return pa.concat_tables(tables)
+
+def read_csv_pandas(data, dialect: Dialect = None, encoding: EncodingInfo = None) -> pd.DataFrame:
+    dialect = dialect or Dialect()
+    encoding = encoding or EncodingInfo()
+    buffer = io.BufferedReader(MemoryReader(data))
+    df = pd.read_csv(buffer, encoding=encoding.encoding, encoding_errors="replace", **dialect.read_csv_kwargs())
+    return _name_columns(df, dialect)
+
+def read_csv_bytes(data, dialect: Dialect = None, engine: str = "auto", encoding: EncodingInfo = None,
+                   workers: int = 1) -> pd.DataFrame:
+    """
+    Parses CSV bytes (bytes, bytearray, memoryview or mmap, e.g. UploadedFile.getbuffer()).
+    dialect / encoding: from sniff_dialect() / detect_encoding(); sniffed from the bytes when omitted.
+    engine: "auto" (pyarrow, falling back to pandas), "pyarrow" or "pandas".
+    workers > 1 parses byte ranges of a large input concurrently (pyarrow only).
+    """
+    if encoding is None:
+        encoding = detect_encoding(data)
+    if dialect is None:
+        dialect = sniff_dialect(data, encoding=encoding.body_encoding)
+    df = None
+    if engine != "pandas" and pa is not None:
+        if workers > 1 and len(memoryview(data).cast("B")) >= PARALLEL_MIN_BYTES:
+            try:
+                table = _read_ranges_arrow(data, dialect, encoding, workers)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, UnicodeDecodeError):
+                table = None  # e.g. a value of another type after the first block: read in one piece
+            if table is not None:
+                table = table.rename_columns(_mangle_duplicates(table.column_names))
+                df = _name_columns(table.to_pandas(types_mapper=pd.ArrowDtype), dialect)
+        try:
+            if df is None:
+                df = read_csv_arrow(data, dialect, encoding)
+        except (pa.ArrowInvalid, UnicodeDecodeError):
+            if engine == "pyarrow":
+                raise
+    elif engine == "pyarrow":
+        raise ImportError("pyarrow is not installed")
+    if df is None:
+        df = read_csv_pandas(data, dialect, encoding)
+    df.attrs["source"] = {
+        "encoding": encoding.encoding,
+        "encoding_confidence": encoding.confidence,
+        "dialect": dialect.to_dict(),
+    }
+    return df
+
+# ---- local files ----
+def map_file(path: str):
+    """The file mapped read-only into memory (an mmap; b"" for an empty file). Pages are read on demand."""
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+def read_csv_path(path: str, dialect: Dialect = None, engine: str = "auto", encoding: EncodingInfo = None,
+                  workers: int = None) -> pd.DataFrame:
+    """read_csv_bytes() on a memory-mapped local file; `workers` defaults to the CPU count."""
+    data = map_file(path)
+    try:
+        return read_csv_bytes(data, dialect, engine, encoding, workers=workers or os.cpu_count() or 1)
+    finally:
+        if isinstance(data, mmap.mmap):
+            try:
+                data.close()
+            except BufferError:
+                pass  # a parser still holds a view: unmapped once it is released
+
+class MappedFile:
+    """A local file, memory-mapped, with the parts of Streamlit's UploadedFile the app uses."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.size = os.path.getsize(path)
+        self._data = None
+
+    def getbuffer(self):
+        if self._data is None:
+            self._data = map_file(self.path)
+        return self._data
+
+# ---------------- Excel ingestion ----------------
+# read_excel_bytes() reads one or more sheets (optionally a cell range of each)
+# with calamine when it is installed, otherwise with openpyxl in read-only mode,
+# which streams the sheet XML row by row and stops after the last requested row.
+# Sheets that are not asked for are never parsed. The first row of a sheet or
+# range is the header, as with pd.read_excel. Per-sheet parse times go into the
+# `timings` dict when one is passed, and into df.attrs["source"].
+
+def _excel_engine(engine: str, data) -> str:
+    if engine != "auto":
+        return engine
+    if CalamineWorkbook is not None:
+        return "calamine"
+    # openpyxl only reads the zip-based formats; legacy .xls goes through pandas (xlrd)
+    return "openpyxl" if bytes(memoryview(data)[:2]) == b"PK" else "pandas"
+
+def _parse_range(cell_range: str):
+    """"B2:F100" -> (min_col, min_row, max_col, max_row), 1-based; open ends are None."""
+    from openpyxl.utils.cell import range_boundaries
+    return range_boundaries(cell_range.replace("$", "").upper())
+
+def _open_workbook(data, engine: str):
+    if engine == "calamine":
+        return CalamineWorkbook.from_filelike(io.BufferedReader(MemoryReader(data)))
+    if engine == "openpyxl":
+        from openpyxl import load_workbook
+        return load_workbook(io.BufferedReader(MemoryReader(data)), read_only=True, data_only=True)
+    return pd.ExcelFile(io.BufferedReader(MemoryReader(data)))
+
+def _sheet_names(book, engine: str) -> list:
+    return list(book.sheet_names) if engine in ("calamine", "pandas") else list(book.sheetnames)
+
+def list_sheets(data, engine: str = "auto") -> list:
+    """Sheet names of an Excel workbook, without parsing any sheet."""
+    engine = _excel_engine(engine, data)
+    book = _open_workbook(data, engine)
+    try:
+        return _sheet_names(book, engine)
+    finally:
+        if engine == "openpyxl":
+            book.close()
+
+def _sheet_rows(book, engine: str, sheet: str, bounds) -> list:
+    min_col, min_row, max_col, max_row = bounds or (None, None, None, None)
+    if engine == "openpyxl":
+        ws = book[sheet]
+        return [list(r) for r in ws.iter_rows(
+            min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col, values_only=True,
+        )]
+    if engine == "calamine":
+        rows = book.get_sheet_by_name(sheet).to_python(skip_empty_area=False, nrows=max_row)
+    else:
+        rows = book.parse(sheet, header=None, nrows=max_row).astype(object).values.tolist()
+    rows = rows[(min_row or 1) - 1:]
+    lo, hi = (min_col or 1) - 1, max_col
+    return [list(r[lo:hi]) for r in rows]
+
+def _rows_to_frame(rows: list) -> pd.DataFrame:
+    # calamine reports empty cells as "", openpyxl/pandas as None/NaN
+    rows = [[None if v == "" or (isinstance(v, float) and v != v) else v for v in r] for r in rows]
+    while rows and all(v is None for v in rows[-1]):
+        rows.pop()
+    if not rows:
+        return pd.DataFrame()
+    width = max(len(r) for r in rows)
+    header = list(rows[0]) + [None] * (width - len(rows[0]))
+    names = [f"Unnamed: {i}" if h is None else str(h) for i, h in enumerate(header)]
+    # empty cells are NaN, as pd.read_excel gives them (None would clean to the text "None")
+    body = [[np.nan if v is None else v for v in r] + [np.nan] * (width - len(r)) for r in rows[1:]]
+    return pd.DataFrame(body, columns=_mangle_duplicates(names))
+
+def read_excel_bytes(data, sheets=None, ranges=None, engine: str = "auto", timings: dict = None):
+    """
+    Reads Excel bytes (bytes, bytearray or memoryview).
+    sheets: None (first sheet) or a sheet name -> DataFrame; a list of names, or "all" -> {name: DataFrame}.
+    ranges: a cell range like "A1:F500" applied to every sheet, or {sheet: range}.
+    engine: "auto" (calamine if installed, else openpyxl read-only), "calamine", "openpyxl" or "pandas".
+    Pass a dict as `timings` to receive {sheet: parse seconds}.
+    """
+    engine = _excel_engine(engine, data)
+    book = _open_workbook(data, engine)
+    try:
+        names = _sheet_names(book, engine)
+        single = sheets is None or isinstance(sheets, str) and sheets != "all"
+        wanted = names[:1] if sheets is None else names if sheets == "all" else [sheets] if single else list(sheets)
+        missing = [s for s in wanted if s not in names]
+        if missing:
+            raise ValueError(f"worksheet(s) not found: {missing}; available: {names}")
+        frames = {}
+        for sheet in wanted:
+            cell_range = ranges.get(sheet) if isinstance(ranges, dict) else ranges
+            started = time.perf_counter()
+            df = _rows_to_frame(_sheet_rows(book, engine, sheet, _parse_range(cell_range) if cell_range else None))
+            seconds = time.perf_counter() - started
+            df.attrs["source"] = {"sheet": sheet, "range": cell_range, "engine": engine, "seconds": seconds}
+            if timings is not None:
+                timings[sheet] = seconds
+            frames[sheet] = df
+    finally:
+        if engine == "openpyxl":
+            book.close()
+    return frames[wanted[0]] if single else frames
@@ -0,0 +1,231 @@
+# recipes.py
+import json
+from dataclasses import dataclass, field, asdict
+import pandas as pd
+
+from cleaner import clean_dataframe, convert_columns
+from dialect import Dialect, sniff_dialect
+from encoding import EncodingInfo, detect_encoding
+from inference import ColumnPlan
+from instructions import apply_plan, compile_instructions, plan_from_dicts, plan_to_dicts
+
+# ---------------- Cleaning recipes ----------------
+# A Recipe records everything a cleaning run decided about one file: the
+# clean_dataframe options, the sniffed Dialect and encoding (CSV), the inferred
+# ColumnPlan of every column (numeric or not, date formats) and the compiled
+# instruction plan. It is plain JSON, so it can be kept next to a daily feed:
+#
+#     recipe, df, log = record_recipe(data, "feed.csv", instructions=text, parse_dates=True)
+#     recipe.save("feed.recipe.json")
+#     ...
+#     result = replay_recipe(Recipe.load("feed.recipe.json"), new_data)
+#     result.df, result.log, result.drift
+#
+# Replaying reads the new file with the recorded dialect and encoding, runs the
+# same steps with the recorded plans and applies the recorded operations:
+# nothing is sniffed, inferred or parsed from text again. Differences between
+# the new file and the recipe are reported as Drift entries (strict=True raises
+# instead): header columns missing, new or reordered; cleaned columns or dtypes
+# that differ; and values a recorded numeric/date conversion could not parse.
+# Columns the recipe does not know stay text.
+
+RECIPE_VERSION = 1
+UNPARSED_TOLERANCE = 0.01          # extra share of a column's rows a recorded conversion may fail on
+CLEAN_OPTIONS = dict(
+    trim_spaces=True,
+    standardize_columns=True,
+    drop_empty_rows=True,
+    drop_empty_cols=True,
+    drop_duplicates=True,
+    fix_numbers=True,
+    parse_dates=False,
+)
+
+@dataclass
+class Recipe:
+    options: dict                  # clean_dataframe options
+    source_columns: list           # header of the file the recipe was recorded from
+    columns: list                  # columns after cleaning (before instructions)
+    column_types: dict             # cleaned column -> ColumnPlan.to_dict()
+    dtypes: dict                   # cleaned column -> dtype after cleaning
+    unparsed: dict = field(default_factory=dict)  # cleaned column -> share of rows its conversion turned into nulls
+    dialect: dict = None           # Dialect.to_dict(); None for Excel sources
+    encoding: dict = None          # EncodingInfo.to_dict(); None for Excel sources
+    sheet: str = None              # Excel sources: the sheet read (None = the first)
+    instructions: str = ""
+    plan: list = field(default_factory=list)  # instructions.plan_to_dicts() of the compiled text
+    version: int = RECIPE_VERSION
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def to_json(self, indent: int = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent, default=str)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Recipe":
+        if d.get("version") != RECIPE_VERSION:
+            raise ValueError(f"unsupported recipe version: {d.get('version')!r} (expected {RECIPE_VERSION})")
+        return cls(**d)
+
+    @classmethod
+    def from_json(cls, text: str) -> "Recipe":
+        return cls.from_dict(json.loads(text))
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(self.to_json())
+
+    @classmethod
+    def load(cls, path: str) -> "Recipe":
+        with open(path, encoding="utf-8") as fh:
+            return cls.from_json(fh.read())
+
+@dataclass
+class Drift:
+    kind: str                      # missing_column / new_column / column_order / output_columns / dtype / unparsed_values
+    column: str = None
+    detail: str = ""
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def __str__(self) -> str:
+        return " ".join(p for p in (self.kind, self.column, self.detail) if p)
+
+@dataclass
+class Replay:
+    df: pd.DataFrame
+    log: list                      # instruction change log
+    drift: list                    # Drift entries; empty when the file matches the recipe
+    rows_in: int = 0
+    cols_in: int = 0
+
+    @property
+    def drifted(self) -> bool:
+        return bool(self.drift)
+
+def _is_csv(file_name: str) -> bool:
+    return file_name.lower().endswith(".csv")
+
+def _clean(df: pd.DataFrame, options: dict, column_types: dict):
+    # clean_dataframe in two parts, to count the values the conversions turn into nulls:
+    # the row and column steps, then numbers/dates with `column_types` (inferred for
+    # columns without a plan, as clean_dataframe does)
+    df = clean_dataframe(df, inplace=True, **{**options, "fix_numbers": False, "parse_dates": False})
+    unparsed = {}
+    if options["fix_numbers"] or options["parse_dates"]:
+        nulls = df.isna().sum()
+        convert_columns(df, options["fix_numbers"], options["parse_dates"], column_types)
+        unparsed = {c: int(n) for c, n in (df.isna().sum() - nulls).items() if n > 0}
+    return df, unparsed
+
+# ---------------- Recording ----------------
+def record_recipe(data, file_name: str = "data.csv", instructions: str = "", sheet: str = None, **options):
+    """
+    Cleans `data` (the bytes of a CSV or Excel file) with clean_dataframe `options` and
+    `instructions`, recording every decision. Returns (recipe, df_out, change_log).
+    """
+    from readers import read_csv_bytes, read_excel_bytes
+
+    options = {**CLEAN_OPTIONS, **options}
+    unknown = set(options) - set(CLEAN_OPTIONS)
+    if unknown:
+        raise ValueError(f"unknown cleaning options: {sorted(unknown)}")
+    dialect = encoding = None
+    if _is_csv(file_name):
+        encoding = detect_encoding(data)
+        dialect = sniff_dialect(data, encoding=encoding.body_encoding)
+        df = read_csv_bytes(data, dialect=dialect, encoding=encoding)
+    else:
+        df = read_excel_bytes(data, sheets=sheet)
+    source_columns = [str(c) for c in df.columns]
+
+    column_types = {}
+    df, unparsed = _clean(df, options, column_types)
+    plan = compile_instructions(instructions)
+    recipe = Recipe(
+        options=options,
+        source_columns=source_columns,
+        columns=[str(c) for c in df.columns],
+        column_types={str(c): p.to_dict() for c, p in column_types.items()},
+        dtypes={str(c): str(dt) for c, dt in df.dtypes.items()},
+        unparsed={str(c): n / len(df) for c, n in unparsed.items() if n},
+        dialect=dialect.to_dict() if dialect is not None else None,
+        encoding=encoding.to_dict() if encoding is not None else None,
+        sheet=sheet,
+        instructions=instructions or "",
+        plan=plan_to_dicts(plan),
+    )
+    out, log = apply_plan(df, plan) if plan else (df, [])
+    return recipe, out, log
+
+# ---------------- Replay ----------------
+def _header_drift(recipe: Recipe, columns: list) -> list:
+    expected = recipe.source_columns
+    drift = [Drift("missing_column", c, "in the recipe but not in the file") for c in expected if c not in columns]
+    drift += [Drift("new_column", c, "not in the recipe; kept as text") for c in columns if c not in expected]
+    shared = [c for c in columns if c in expected]
+    if shared != [c for c in expected if c in columns]:
+        drift.append(Drift("column_order", None, f"expected {expected}, got {columns}"))
+    return drift
+
+def _output_drift(recipe: Recipe, df: pd.DataFrame) -> list:
+    columns = [str(c) for c in df.columns]
+    drift = []
+    if columns != recipe.columns:
+        drift.append(Drift("output_columns", None, f"cleaned columns {columns}, recipe has {recipe.columns}"))
+    for c, dt in df.dtypes.items():
+        expected = recipe.dtypes.get(str(c))
+        if expected is not None and str(dt) != expected:
+            drift.append(Drift("dtype", str(c), f"{dt} (recipe: {expected})"))
+    return drift
+
+class _ReplayPlans(dict):
+    """Recorded ColumnPlans by column; a column without one gets a plan that keeps it as text."""
+
+    def __init__(self, column_types: dict):
+        super().__init__()
+        self.recorded = column_types
+
+    def get(self, column, default=None):
+        if column not in self:
+            d = self.recorded.get(str(column))
+            self[column] = ColumnPlan(**d) if d is not None else ColumnPlan("text", 0.0)
+        return self[column]
+
+def replay_recipe(recipe: Recipe, data, strict: bool = False, step_metrics: list = None, read_workers: int = 1) -> Replay:
+    """
+    Cleans `data` (bytes of a file like the one the recipe was recorded from) exactly as
+    recorded, without sniffing or type inference. Returns a Replay with the frame, the
+    instruction change log and the schema drift found. strict=True raises ValueError on drift.
+    Pass a list as `step_metrics` to get a metrics.StepMetrics per instruction step.
+    `read_workers` > 1 parses a large CSV in byte ranges on that many threads.
+    """
+    from readers import read_csv_bytes, read_excel_bytes
+
+    if recipe.dialect is not None:
+        df = read_csv_bytes(
+            data, dialect=Dialect(**recipe.dialect), encoding=EncodingInfo(**recipe.encoding), workers=read_workers,
+        )
+    else:
+        df = read_excel_bytes(data, sheets=recipe.sheet)
+    rows_in, cols_in = df.shape
+    drift = _header_drift(recipe, [str(c) for c in df.columns])
+
+    # a plan for every column, so nothing is inferred; columns the recipe does not know stay text
+    plans = _ReplayPlans(recipe.column_types)
+    df, unparsed = _clean(df, recipe.options, plans)
+    for c, n in unparsed.items():
+        share, recorded = n / len(df), recipe.unparsed.get(str(c), 0.0)
+        if share > (recorded + UNPARSED_TOLERANCE if recorded else 0.0):
+            plan = plans[c]
+            kind = "numbers" if plan.numeric else "dates"
+            drift.append(Drift("unparsed_values", str(c), f"{n} values ({share:.1%}) did not parse as {kind} (recipe: {recorded:.1%})"))
+    drift += _output_drift(recipe, df)
+
+    if strict and drift:
+        raise ValueError("schema drift: " + "; ".join(map(str, drift)))
+    plan = plan_from_dicts(recipe.plan)
+    df, log = apply_plan(df, plan, step_metrics) if plan else (df, [])
+    return Replay(df, log, drift, rows_in, cols_in)
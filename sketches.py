@@ -0,0 +1,343 @@
+# sketches.py
+import numpy as np
+import pandas as pd
+
+# ---------------- Mergeable sketches ----------------
+# Bounded-memory, approximate column statistics for inputs too big to profile
+# exactly (see data_quality_report(mode="sketch") and the `sketches` argument of
+# streaming.clean_csv_chunked):
+#
+# - HyperLogLog: distinct count (~0.8% standard error at the default precision)
+# - KLL: numeric / datetime quantiles (rank error ~1.5% at k=200)
+# - count-min + a candidate list: the most frequent values and their counts
+# - bottom-k reservoir: a uniform random sample of values
+#
+# Every sketch takes values a batch (chunk) at a time, and `merge` combines two
+# sketches of disjoint parts of the data into the sketch of the whole, so chunks
+# (or worker processes: sketches pickle) can be sketched separately and folded
+# together. Values are hashed with pandas' hash_pandas_object; numbers are
+# hashed as float64 so an int chunk and a float chunk of one column agree.
+
+HLL_PRECISION = 14
+KLL_K = 200
+CMS_WIDTH = 8192
+CMS_DEPTH = 4
+TOP_K = 5
+RESERVOIR_SIZE = 5
+SKETCH_CHUNK_ROWS = 200_000
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    # bit_length of uint64s, exact: each 32-bit half fits a float64 mantissa
+    hi = (x >> np.uint64(32)).astype(np.float64)
+    lo = (x & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1])
+
+def hash_values(s: pd.Series, dropna: bool = True) -> np.ndarray:
+    """uint64 hashes of the non-null values of `s`."""
+    if dropna:
+        s = s[s.notna()]
+    if pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+        s = s.astype("float64")
+    return pd.util.hash_pandas_object(s, index=False).to_numpy()
+
+class HyperLogLog:
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.p = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update_hashes(self, h: np.ndarray) -> None:
+        if not len(h):
+            return
+        rest_bits = 64 - self.p
+        idx = (h >> np.uint64(rest_bits)).astype(np.intp)
+        rest = h & np.uint64((1 << rest_bits) - 1)
+        rank = (rest_bits - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * np.log(m / zeros)  # linear counting for small cardinalities
+        return float(raw)
+
+class KLLSketch:
+    """Quantiles of a numeric stream; level h items stand for 2**h values."""
+
+    def __init__(self, k: int = KLL_K, seed: int = None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - h - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self._capacity(h):
+                level = np.sort(level)
+                keep = level[:1] if len(level) % 2 else level[:0]
+                pairs = level[len(keep):]
+                promoted = pairs[self._rng.integers(0, 2)::2]
+                self.levels[h] = keep
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                h = 0 if h + 1 == len(self.levels) - 1 else h  # a new top level shrinks every capacity
+                continue
+            h += 1
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs) -> list:
+        if not self.n:
+            return [None for _ in qs]
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(l), 2.0 ** h) for h, l in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values, cum = values[order], np.cumsum(weights[order])
+        out = []
+        for q in qs:
+            if q <= 0:
+                out.append(self.min)
+            elif q >= 1:
+                out.append(self.max)
+            else:
+                out.append(values[min(np.searchsorted(cum, q * cum[-1]), len(values) - 1)])
+        return out
+
+class CountMinTopK:
+    """Count-min sketch of value frequencies plus the values most likely to be the top k."""
+
+    def __init__(self, width: int = CMS_WIDTH, depth: int = CMS_DEPTH, k: int = TOP_K):
+        self.width = width
+        self.depth = depth
+        self.k = k
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.candidates = {}  # hash -> value
+
+    def _columns(self, h: np.ndarray) -> np.ndarray:
+        h1 = (h & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        h2 = (h >> np.uint64(32)).astype(np.int64) | 1
+        return np.stack([(h1 + i * h2) % self.width for i in range(self.depth)])
+
+    def count(self, h: np.ndarray) -> np.ndarray:
+        if not len(h):
+            return np.zeros(0, dtype=np.int64)
+        cols = self._columns(h)
+        return np.min(self.table[np.arange(self.depth)[:, None], cols], axis=0)
+
+    def update(self, h: np.ndarray, values: pd.Series) -> None:
+        """`h`: hashes of `values` (non-null), position by position."""
+        if not len(h):
+            return
+        for i, cols in enumerate(self._columns(h)):
+            self.table[i] += np.bincount(cols, minlength=self.width)
+        # this batch's most frequent values join the candidates
+        top = pd.Series(h).value_counts().index[: self.k * 4].to_numpy(dtype=np.uint64)
+        pos = np.flatnonzero(np.isin(h, top))
+        pos = pos[~pd.Index(h[pos]).duplicated()]
+        for hv, v in zip(h[pos], values.iloc[pos].to_numpy(dtype=object)):
+            self.candidates.setdefault(hv, v)
+        self._prune()
+
+    def _prune(self) -> None:
+        if len(self.candidates) <= self.k * 4:
+            return
+        hashes = np.fromiter(self.candidates, dtype=np.uint64, count=len(self.candidates))
+        keep = hashes[np.argsort(-self.count(hashes), kind="stable")[: self.k * 4]]
+        self.candidates = {hv: self.candidates[hv] for hv in keep}
+
+    def merge(self, other: "CountMinTopK") -> "CountMinTopK":
+        self.table += other.table
+        for hv, v in other.candidates.items():
+            self.candidates.setdefault(hv, v)
+        self._prune()
+        return self
+
+    def top(self, k: int = None) -> list:
+        """[(value, estimated count)] for the k most frequent values (counts may overestimate)."""
+        if not self.candidates:
+            return []
+        hashes = np.fromiter(self.candidates, dtype=np.uint64, count=len(self.candidates))
+        counts = self.count(hashes)
+        order = np.argsort(-counts, kind="stable")[: k or self.k]
+        return [(self.candidates[hashes[i]], int(counts[i])) for i in order]
+
+class Reservoir:
+    """Uniform sample of `size` values: the ones with the smallest random priorities (bottom-k)."""
+
+    def __init__(self, size: int = RESERVOIR_SIZE, seed: int = None):
+        self.size = size
+        self.values = np.empty(0, dtype=object)
+        self.priorities = np.empty(0)
+        self._rng = np.random.default_rng(seed)
+
+    def _keep(self, values, priorities) -> None:
+        order = np.argsort(priorities, kind="stable")[: self.size]
+        self.values, self.priorities = values[order], priorities[order]
+
+    def update(self, values: pd.Series) -> None:
+        if not len(values):
+            return
+        priorities = self._rng.random(len(values))
+        # only the batch's own bottom-k can enter
+        part = np.arange(len(values))
+        if len(values) > self.size:
+            part = np.argpartition(priorities, self.size)[: self.size]
+        chosen = np.empty(len(part), dtype=object)
+        chosen[:] = values.iloc[part].to_numpy(dtype=object)
+        self._keep(np.concatenate([self.values, chosen]), np.concatenate([self.priorities, priorities[part]]))
+
+    def merge(self, other: "Reservoir") -> "Reservoir":
+        self._keep(np.concatenate([self.values, other.values]), np.concatenate([self.priorities, other.priorities]))
+        return self
+
+# ---------------- Column / frame sketches ----------------
+class ColumnSketch:
+    def __init__(self, name, seed: int = None):
+        self.name = name
+        self.rows = 0
+        self.nulls = 0
+        self.dtypes = []
+        self.datetime = False
+        self.integer = True        # every chunk had an integer dtype: quantiles print as ints
+        self.hll = HyperLogLog()
+        self.kll = None  # numeric and datetime columns only
+        self.frequent = CountMinTopK()
+        self.sample = Reservoir(seed=seed)
+
+    def update(self, s: pd.Series) -> None:
+        dtype = str(s.dtype)
+        if dtype not in self.dtypes:
+            self.dtypes.append(dtype)
+        present = s[s.notna()]
+        self.rows += len(s)
+        self.nulls += len(s) - len(present)
+        h = hash_values(present, dropna=False)
+        self.hll.update_hashes(h)
+        self.frequent.update(h, present)
+        self.sample.update(present)
+        numeric = pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype)
+        is_datetime = pd.api.types.is_datetime64_any_dtype(s.dtype)
+        if numeric or is_datetime:
+            self.integer &= pd.api.types.is_integer_dtype(s.dtype)
+            if self.kll is None:
+                self.kll = KLLSketch()
+                self.datetime = is_datetime
+            if is_datetime:
+                self.kll.update(present.dt.tz_localize(None).astype("int64") if present.dt.tz else present.astype("int64"))
+            else:
+                self.kll.update(present.astype("float64").to_numpy())
+
+    def merge(self, other: "ColumnSketch") -> "ColumnSketch":
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.dtypes += [d for d in other.dtypes if d not in self.dtypes]
+        self.hll.merge(other.hll)
+        self.frequent.merge(other.frequent)
+        self.sample.merge(other.sample)
+        if other.kll is not None:
+            if self.kll is None:
+                self.kll, self.datetime = KLLSketch(), other.datetime
+            self.kll.merge(other.kll)
+        self.integer &= other.integer
+        return self
+
+    @property
+    def dtype(self) -> str:
+        return "|".join(self.dtypes)
+
+    def distinct(self) -> int:
+        return int(round(self.hll.estimate()))
+
+    def quantiles(self, qs=(0.0, 0.5, 0.95, 1.0)) -> list:
+        if self.kll is None or not self.kll.n:
+            return [None for _ in qs]
+        out = self.kll.quantiles(qs)
+        if self.datetime:
+            return [pd.Timestamp(int(v)) for v in out]
+        return [int(v) for v in out] if self.integer else out
+
+class FrameSketch:
+    """Sketches of every column plus a HyperLogLog of whole rows (for duplicate rows)."""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+        self.row_hll = HyperLogLog()
+
+    def update(self, df: pd.DataFrame) -> "FrameSketch":
+        self.rows += len(df)
+        for i in range(df.shape[1]):
+            name = df.columns[i]
+            if name not in self.columns:
+                self.columns[name] = ColumnSketch(name)
+            self.columns[name].update(df.iloc[:, i])
+        if len(df) and df.shape[1]:
+            self.row_hll.update_hashes(pd.util.hash_pandas_object(df, index=False).to_numpy())
+        return self
+
+    def merge(self, other: "FrameSketch") -> "FrameSketch":
+        self.rows += other.rows
+        for name, col in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(col)
+            else:
+                self.columns[name] = col
+        self.row_hll.merge(other.row_hll)
+        return self
+
+    @property
+    def nulls(self) -> int:
+        return sum(c.nulls for c in self.columns.values())
+
+    def duplicates(self) -> int:
+        """Estimated rows that repeat an earlier row."""
+        return max(0, self.rows - int(round(self.row_hll.estimate()))) if self.columns else 0
+
+def sketch_frame(df: pd.DataFrame, chunk_rows: int = SKETCH_CHUNK_ROWS) -> FrameSketch:
+    """Sketches `df` a block of rows at a time (hash buffers stay bounded by `chunk_rows`)."""
+    sketch = FrameSketch()
+    for start in range(0, max(len(df), 1), chunk_rows):
+        sketch.update(df.iloc[start:start + chunk_rows])
+    return sketch
+
+def sketch_chunks(chunks) -> FrameSketch:
+    """One FrameSketch over an iterable of frames (e.g. pd.read_csv(..., chunksize=...))."""
+    sketch = FrameSketch()
+    for chunk in chunks:
+        sketch.update(chunk)
+    return sketch
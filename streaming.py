@@ -0,0 +1,215 @@
+# streaming.py
+from pathlib import Path
+import pandas as pd
+import numpy as np
+
+from cleaner import standardize_column_name, trim_whitespace
+from dedup import RowDeduplicator
+from dialect import Dialect, sniff_dialect
+from encoding import EncodingInfo, detect_encoding
+from inference import (
+    ColumnPlan, DATE_FORMAT_SAMPLE, DATE_MIN_HITS, DATE_SAMPLE_SIZE, _date_hits, apply_dates, apply_numeric,
+    date_format_sample, detect_date_formats, infer_column,
+)
+from sketches import FrameSketch
+
+DEFAULT_CHUNKSIZE = 100_000
+
+_DEFAULT_OPTIONS = dict(
+    trim_spaces=True,
+    standardize_columns=True,
+    drop_empty_rows=True,
+    drop_empty_cols=True,
+    drop_duplicates=True,
+    fix_numbers=True,
+    parse_dates=False,
+)
+
+# ---------------- Chunked (streaming) cleaning ----------------
+# clean_dataframe() needs the whole file in memory. The streaming engine below
+# reads the CSV in bounded chunks and writes each cleaned chunk straight to the
+# sink, so peak memory follows `chunksize` rather than the file size.
+#
+# Steps that need to see the whole file are handled with a first "planning"
+# pass over the same chunks:
+# - empty-column detection: a column is dropped only if it is empty everywhere
+# - numeric coercion: a column is converted only if every chunk converts, and
+#   all chunks are cast to the common dtype (e.g. int + NaN -> float)
+# - date parsing: the decision sample and the format-detection sample come from
+#   the first rows / first distinct values of the file, as on the full frame
+# - duplicate removal: a RowDeduplicator keeps row fingerprints across chunks,
+#   so the first occurrence wins no matter which chunk it is in
+#
+# Values are read as text, so types are inferred once for the whole file
+# instead of per chunk by the CSV parser. The input encoding and Dialect are
+# sniffed once from a sample of the file and recorded in the plan; the parser
+# transcodes each block as it reads. The output is written as UTF-8 with
+# `output_dialect` (plain comma-separated CSV by default).
+
+def _read_chunks(source, chunksize, dialect: Dialect, encoding: EncodingInfo):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    reader = pd.read_csv(
+        source, dtype=str, chunksize=chunksize,
+        encoding=encoding.encoding, encoding_errors="replace",
+        **dialect.read_csv_kwargs(),
+    )
+    for chunk in reader:
+        if not dialect.has_header:
+            chunk.columns = [f"column_{i + 1}" for i in range(chunk.shape[1])]
+        yield chunk
+
+def _source_format(source, plan=None, dialect=None, encoding=None):
+    if plan is not None and plan.get("encoding"):
+        encoding = encoding or EncodingInfo(**plan["encoding"])
+        dialect = dialect or Dialect(**plan["dialect"])
+    encoding = encoding or detect_encoding(source)
+    # sniff_dialect reads a str as CSV text, so a path goes in as a Path
+    sample = Path(source) if isinstance(source, str) else source
+    dialect = dialect or sniff_dialect(sample, encoding=encoding.body_encoding)
+    return dialect, encoding
+
+def _numeric_text(s: pd.Series) -> pd.Series:
+    # same text normalisation as coerce_numeric_series()
+    return s.astype(str).str.replace(",", "", regex=False).str.strip()
+
+def _row_steps(chunk, columns, keep_cols, dedup, opts):
+    chunk.columns = columns
+    if opts["trim_spaces"]:
+        chunk = trim_whitespace(chunk)
+    if opts["drop_empty_rows"]:
+        chunk = chunk.dropna(how="all")
+    if keep_cols is not None:
+        chunk = chunk[keep_cols]
+    if opts["drop_duplicates"]:
+        chunk = dedup.drop_duplicates(chunk)
+    return chunk
+
+def plan_streaming_clean(source, chunksize=DEFAULT_CHUNKSIZE, dialect=None, dedup_options=None, encoding=None, **opts):
+    """
+    First pass: collects the global facts the per-chunk steps cannot see on their own.
+    Returns a plan dict consumed by clean_csv_chunked().
+    """
+    opts = {**_DEFAULT_OPTIONS, **opts}
+    dialect, encoding = _source_format(source, dialect=dialect, encoding=encoding)
+    plan = {
+        "columns": None, "keep_cols": None, "numeric": {}, "dates": {}, "rows_in": 0,
+        "dialect": dialect.to_dict(), "encoding": encoding.to_dict(),
+    }
+    nonempty = None
+    numeric_dtypes = {}
+    not_numeric = set()
+    date_samples = {}
+    date_texts = {}
+    dedup = RowDeduplicator(**(dedup_options or {}))
+
+    try:
+        for chunk in _read_chunks(source, chunksize, dialect, encoding):
+            plan["rows_in"] += len(chunk)
+            if plan["columns"] is None:
+                raw = list(chunk.columns)
+                plan["columns"] = [standardize_column_name(c) for c in raw] if opts["standardize_columns"] else raw
+                nonempty = pd.Series(False, index=plan["columns"])
+            chunk = _row_steps(chunk, plan["columns"], None, dedup, opts)
+            nonempty |= chunk.notna().any().to_numpy()
+
+            for col in chunk.columns:
+                # the pyarrow reader keeps text Arrow-backed, so missing cells are
+                # classified as missing (not as the text "nan"), as in clean_dataframe
+                s = chunk[col].astype("string")
+                if col not in not_numeric:
+                    # with fix_numbers off, all-numeric columns are what read_csv would
+                    # have typed as numbers; they only matter for skipping date parsing
+                    col_plan, scan = infer_column(s, fix_numbers=True, parse_dates=False)
+                    if opts["fix_numbers"]:
+                        numeric = col_plan.numeric
+                    else:
+                        numeric = col_plan.kind in ("int", "float", "empty") and col_plan.confidence == 1.0
+                    if not numeric:
+                        not_numeric.add(col)
+                        numeric_dtypes.pop(col, None)
+                    else:
+                        dtype = apply_numeric(s, col_plan, scan).dtype if opts["fix_numbers"] else np.dtype(float)
+                        prev = numeric_dtypes.get(col)
+                        numeric_dtypes[col] = dtype if prev is None else np.result_type(prev, dtype)
+                if opts["parse_dates"]:
+                    vals = _numeric_text(s.dropna()) if opts["fix_numbers"] else s.dropna()
+                    sample = date_samples.setdefault(col, [])
+                    if len(sample) < DATE_SAMPLE_SIZE:
+                        sample.extend(vals.head(DATE_SAMPLE_SIZE - len(sample)).tolist())
+                    texts = date_texts.setdefault(col, {})
+                    if len(texts) < DATE_FORMAT_SAMPLE:
+                        texts.update(dict.fromkeys(date_format_sample(vals.astype(object))))
+    finally:
+        dedup.close()
+
+    if nonempty is None:
+        return plan
+    if opts["drop_empty_cols"]:
+        plan["keep_cols"] = [c for c in plan["columns"] if nonempty[c]]
+        date_samples = {c: v for c, v in date_samples.items() if nonempty[c]}
+        numeric_dtypes = {c: v for c, v in numeric_dtypes.items() if nonempty[c]}
+    plan["numeric"] = numeric_dtypes if opts["fix_numbers"] else {}
+
+    for col, sample in date_samples.items():
+        if col in numeric_dtypes:
+            continue
+        if sample and _date_hits(sample) >= DATE_MIN_HITS:
+            plan["dates"][col] = detect_date_formats(date_format_sample(list(date_texts[col])))
+    return plan
+
+def clean_csv_chunked(source, sink, chunksize=DEFAULT_CHUNKSIZE, dialect=None, plan=None, dedup_options=None,
+                      output_dialect=None, encoding=None, sketches: dict = None, **opts):
+    """
+    Streams `source` (a path or seekable binary file object) through the cleaning steps and
+    appends each cleaned chunk to `sink` (a path or writable text buffer).
+    `dialect` and `encoding` (an EncodingInfo) describe the input and are sniffed when
+    omitted; `output_dialect` describes the written CSV.
+    Options mirror clean_dataframe(); `dedup_options` are passed to RowDeduplicator
+    (memory_budget, overflow, bits, ...). Returns a summary dict.
+    Pass a dict as `sketches` to receive sketches.FrameSketch of the input ("original")
+    and the output ("clean"), built chunk by chunk (see ai_helper.sketch_quality_report).
+    """
+    opts = {**_DEFAULT_OPTIONS, **opts}
+    dialect, encoding = _source_format(source, plan, dialect, encoding)
+    if plan is None:
+        plan = plan_streaming_clean(
+            source, chunksize=chunksize, dialect=dialect, dedup_options=dedup_options, encoding=encoding, **opts
+        )
+    write_kwargs = (output_dialect or Dialect()).to_csv_kwargs()
+
+    own_sink = isinstance(sink, str)
+    fh = open(sink, "w", newline="", encoding="utf-8") if own_sink else sink
+    rows_out = 0
+    dedup = RowDeduplicator(**(dedup_options or {}))
+    if sketches is not None:
+        sketches.update(original=FrameSketch(), clean=FrameSketch())
+    try:
+        header = True
+        for chunk in _read_chunks(source, chunksize, dialect, encoding):
+            if sketches is not None:
+                sketches["original"].update(chunk)
+            chunk = _row_steps(chunk, plan["columns"], plan["keep_cols"], dedup, opts)
+            if opts["fix_numbers"]:
+                for col in chunk.columns:
+                    if col in plan["numeric"]:
+                        num = pd.to_numeric(_numeric_text(chunk[col]), errors="coerce")
+                        chunk[col] = num.astype(plan["numeric"][col])
+                    else:
+                        chunk[col] = _numeric_text(chunk[col])
+            for col, formats in plan["dates"].items():
+                chunk[col] = apply_dates(chunk[col], ColumnPlan("date", 1.0, parse_dates=True, date_formats=formats))
+            if sketches is not None:
+                sketches["clean"].update(chunk)
+            chunk.to_csv(fh, index=False, header=header, **write_kwargs)
+            header = False
+            rows_out += len(chunk)
+        if header and plan["columns"] is not None:
+            cols = plan["keep_cols"] if plan["keep_cols"] is not None else plan["columns"]
+            pd.DataFrame(columns=cols).to_csv(fh, index=False, **write_kwargs)
+    finally:
+        dedup.close()
+        if own_sink:
+            fh.close()
+
+    return {"rows_in": plan["rows_in"], "rows_out": rows_out, "plan": plan}
@@ -0,0 +1,6 @@
+# tests/conftest.py
+# The app modules live at the repo root (run as `streamlit run app.py`), not in a package.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
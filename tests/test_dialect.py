@@ -0,0 +1,9 @@
+# tests/test_dialect.py
+from dialect import sniff_dialect
+
+def test_numeric_header_over_numeric_data_is_kept():
+    assert sniff_dialect(b"2019,2020,2021\n1,2,3\n4,5,6\n").has_header
+    assert sniff_dialect(b"region,2023\nnorth,1\nsouth,2\n").has_header
+
+def test_first_row_recurring_in_its_column_is_data():
+    assert not sniff_dialect(b"x,1\ny,2\nx,3\n").has_header
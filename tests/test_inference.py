@@ -0,0 +1,28 @@
+# tests/test_inference.py
+import pandas as pd
+
+from cleaner import clean_dataframe
+from inference import ColumnScan
+
+def test_mixed_object_column_keeps_each_value_text():
+    # 1, 1.0 and True are equal to factorize; each must keep its own text
+    df = pd.DataFrame({"a": pd.Series([1, "x ", 2.5, None, True, 1.0], dtype=object), "b": range(6)})
+    out = clean_dataframe(df, drop_duplicates=False)
+    assert out["a"].tolist() == ["1", "x", "2.5", "None", "True", "1.0"]
+
+def test_scan_distinguishes_value_types():
+    scan = ColumnScan(pd.Series([1, True, 1.0, 1, None], dtype=object))
+    assert scan.codes.tolist() == [0, 1, 2, 0, -1]
+    assert [type(v) for v in scan.uniques] == [int, bool, float]
+
+def test_single_offset_dates_keep_their_offset():
+    df = pd.DataFrame({"d": ["2024-01-01T00:00+02:00", "2024-01-02T05:00+02:00", "2024-01-03T00:00+02:00"]})
+    out = clean_dataframe(df, parse_dates=True)
+    assert str(out["d"].dtype) == "datetime64[ns, UTC+02:00]"
+    assert out["d"].iloc[0] == pd.Timestamp("2024-01-01T00:00+02:00")
+
+def test_mixed_offset_dates_come_out_in_utc():
+    df = pd.DataFrame({"d": ["2024-01-01T00:00+02:00", "2024-01-02T05:00+03:00", "2024-01-03T00:00+02:00"]})
+    out = clean_dataframe(df, parse_dates=True)
+    assert str(out["d"].dtype) == "datetime64[ns, UTC]"
+    assert out["d"].iloc[0] == pd.Timestamp("2023-12-31T22:00Z")
@@ -0,0 +1,12 @@
+# tests/test_instructions.py
+from instructions import DropColumns, DropEqualRows, FillNulls, Rename, ToNumeric, compile_instructions
+
+def test_statements_split_on_semicolons_and_newlines():
+    assert compile_instructions("drop rows where n = 2; drop rows where n = 3") == (
+        DropEqualRows("n", "2"), DropEqualRows("n", "3"),
+    )
+    assert compile_instructions("fill nulls in x with 0\nconvert y to numeric") == (FillNulls("x", 0.0), ToNumeric("y"))
+
+def test_bare_list_continues_rename_and_drop_columns():
+    assert compile_instructions("drop columns: Email; n") == (DropColumns(("Email", "n")),)
+    assert compile_instructions("rename a -> b; c -> d") == (Rename((("a", "b"), ("c", "d"))),)
@@ -0,0 +1,214 @@
+# xlsx.py
+import os
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+import numpy as np
+import pandas as pd
+
+# ---------------- Streaming XLSX writer ----------------
+# An .xlsx file is a zip of XML parts. write_workbook() renders each sheet's
+# <sheetData> a block of rows at a time, with the cell XML built per column
+# (vectorised over the block) instead of through a per-cell object model, and
+# streams it straight into the zip member. Memory follows `chunk_rows`, not the
+# frame size. Strings are written inline (no shared-string table to hold), and
+# cells carry no explicit references (readers number them in order).
+#
+# With `workers` > 1, sheets are rendered concurrently in worker processes into
+# temporary files, which are then deflated into the archive in sheet order.
+
+CHUNK_ROWS = 50_000
+COMPRESSLEVEL = 1  # deflate level; 1 is several times faster than the default 6 for ~15% more bytes
+
+_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_EXCEL_EPOCH = np.datetime64("1899-12-30", "ns")
+_DAY_NS = 86_400 * 10**9
+_ILLEGAL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+# cellXfs: 0 = default, 1 = datetime, 2 = bold header
+_STYLE_DATETIME = 1
+_STYLE_HEADER = 2
+
+_STYLES = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="{_NS}">
+<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy\\-mm\\-dd\\ hh:mm:ss"/></numFmts>
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="3">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>
+</cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>"""
+
+def _text_cell(v: str, style: int = 0) -> str:
+    v = escape(_ILLEGAL_XML.sub("", v))
+    s = f' s="{style}"' if style else ""
+    return f'<c t="inlineStr"{s}><is><t xml:space="preserve">{v}</t></is></c>'
+
+def _value_cell(v) -> str:
+    # one cell of an object column holding mixed Python values
+    if isinstance(v, np.generic):
+        v = v.item()
+    if v is None or v is pd.NaT or (isinstance(v, float) and np.isnan(v)):
+        return "<c/>"
+    if isinstance(v, float) and np.isinf(v):
+        return _text_cell("inf" if v > 0 else "-inf")
+    if isinstance(v, bool):
+        return f'<c t="b"><v>{int(v)}</v></c>'
+    if isinstance(v, (int, float)):
+        return f"<c><v>{v!r}</v></c>"
+    if isinstance(v, pd.Timestamp):
+        v = v.tz_localize(None) if v.tzinfo is not None else v
+        serial = (v.to_datetime64().astype("datetime64[ns]") - _EXCEL_EPOCH).astype(np.int64) / _DAY_NS
+        return f'<c s="{_STYLE_DATETIME}"><v>{serial!r}</v></c>'
+    return _text_cell(str(v))
+
+def _cells(s: pd.Series) -> np.ndarray:
+    """Cell XML for every value of `s` (object array)."""
+    if isinstance(s.dtype, pd.ArrowDtype):
+        s = _from_arrow(s)
+    elif not isinstance(s.dtype, np.dtype):
+        s = _from_extension(s)
+    kind = s.dtype.kind
+    missing = s.isna().to_numpy()
+
+    if kind == "b":
+        out = np.where(s.to_numpy(), '<c t="b"><v>1</v></c>', '<c t="b"><v>0</v></c>').astype(object)
+    elif kind in "iu":
+        out = ("<c><v>" + s.astype(str) + "</v></c>").to_numpy(dtype=object)
+    elif kind == "f":
+        values = s.to_numpy()
+        missing = np.isnan(values)
+        out = ("<c><v>" + s.astype(str) + "</v></c>").to_numpy(dtype=object)
+        # infinities are written as text, as DataFrame.to_excel does (inf_rep="inf")
+        out[np.isposinf(values)] = _text_cell("inf")
+        out[np.isneginf(values)] = _text_cell("-inf")
+    elif kind == "M":
+        if getattr(s.dt, "tz", None) is not None:
+            s = s.dt.tz_localize(None)
+        serial = (s.to_numpy(dtype="datetime64[ns]") - _EXCEL_EPOCH).astype(np.int64) / _DAY_NS
+        out = (f'<c s="{_STYLE_DATETIME}"><v>' + pd.Series(serial).astype(str) + "</v></c>").to_numpy(dtype=object)
+    elif kind == "O" and pd.api.types.infer_dtype(s, skipna=True) in ("string", "empty"):
+        text = s.fillna("").astype(str)
+        if text.str.contains(_ILLEGAL_XML).any():
+            text = text.str.replace(_ILLEGAL_XML, "", regex=True)
+        text = text.str.replace("&", "&amp;", regex=False).str.replace("<", "&lt;", regex=False).str.replace(">", "&gt;", regex=False)
+        out = ('<c t="inlineStr"><is><t xml:space="preserve">' + text + "</t></is></c>").to_numpy(dtype=object)
+    elif kind == "O":
+        return np.array([_value_cell(v) for v in s.to_numpy()], dtype=object)
+    else:
+        # timedelta, period, ...: written as their text
+        return np.array(["<c/>" if m else _text_cell(str(v)) for v, m in zip(s.to_numpy(), missing)], dtype=object)
+    out[missing] = "<c/>"
+    return out
+
+def _from_extension(s: pd.Series) -> pd.Series:
+    # nullable Int64/Float64, StringDtype, Categorical, ... -> numpy dtypes
+    if pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+        if s.isna().any() or pd.api.types.is_float_dtype(s.dtype):
+            return s.astype("float64")
+        return s.astype("int64")
+    if isinstance(s.dtype, pd.DatetimeTZDtype):
+        return s
+    return s.astype(object).where(s.notna(), None)
+
+def _from_arrow(s: pd.Series) -> pd.Series:
+    import pyarrow as pa
+    t = s.dtype.pyarrow_dtype
+    if pa.types.is_integer(t) or pa.types.is_floating(t):
+        return s.astype("float64") if s.isna().any() or pa.types.is_floating(t) else s.astype("int64")
+    if pa.types.is_timestamp(t) or pa.types.is_date(t):
+        return pd.Series(s.to_numpy(dtype="datetime64[ns]", na_value=np.datetime64("NaT")), index=s.index)
+    return s.astype(object).where(s.notna(), None)
+
+def iter_sheet_xml(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS):
+    """Yields the worksheet XML of `df` (header row + data) as UTF-8 byte blocks."""
+    yield f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<worksheet xmlns="{_NS}"><sheetData>'.encode()
+    header = "".join(_text_cell(str(c), _STYLE_HEADER) for c in df.columns)
+    yield f"<row>{header}</row>".encode()
+    for start in range(0, len(df), chunk_rows):
+        block = df.iloc[start:start + chunk_rows]
+        rows = np.full(len(block), "<row>", dtype=object)
+        for i in range(block.shape[1]):
+            rows = rows + _cells(block.iloc[:, i])
+        yield ("</row>".join(rows) + "</row>").encode("utf-8")
+    yield b"</sheetData></worksheet>"
+
+def _render_to_file(df: pd.DataFrame, path: str, chunk_rows: int) -> str:
+    with open(path, "wb") as fh:
+        for part in iter_sheet_xml(df, chunk_rows):
+            fh.write(part)
+    return path
+
+def _package_parts(names: list) -> dict:
+    sheets = "".join(
+        f'<sheet name="{escape(n, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>' for i, n in enumerate(names, 1)
+    )
+    rels = "".join(
+        f'<Relationship Id="rId{i}" Type="{_REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, len(names) + 1)
+    )
+    n = len(names)
+    overrides = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, n + 1)
+    )
+    head = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    return {
+        "[Content_Types].xml": head
+        + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        + '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        + '<Default Extension="xml" ContentType="application/xml"/>'
+        + '<Override PartName="/xl/workbook.xml" '
+        + 'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        + '<Override PartName="/xl/styles.xml" '
+        + 'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        + overrides
+        + "</Types>",
+        "_rels/.rels": head
+        + f'<Relationships xmlns="{_PKG_REL_NS}">'
+        + f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+        + "</Relationships>",
+        "xl/workbook.xml": head
+        + f'<workbook xmlns="{_NS}" xmlns:r="{_REL_NS}"><sheets>{sheets}</sheets></workbook>',
+        "xl/_rels/workbook.xml.rels": head
+        + f'<Relationships xmlns="{_PKG_REL_NS}">{rels}'
+        + f'<Relationship Id="rId{n + 1}" Type="{_REL_NS}/styles" Target="styles.xml"/>'
+        + "</Relationships>",
+        "xl/styles.xml": _STYLES,
+    }
+
+def write_workbook(sheets, fh, workers: int = 1, chunk_rows: int = CHUNK_ROWS) -> None:
+    """
+    Writes `sheets` (a list of (name, DataFrame) pairs, names already valid and unique)
+    as an .xlsx workbook to `fh` (a path or binary file object).
+    """
+    names = [name for name, _ in sheets]
+    with zipfile.ZipFile(fh, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=COMPRESSLEVEL) as zf:
+        for part, xml in _package_parts(names).items():
+            zf.writestr(part, xml)
+        if workers and workers > 1 and len(sheets) > 1:
+            with tempfile.TemporaryDirectory(prefix="cleanmycsv-xlsx-") as tmp, \
+                    ProcessPoolExecutor(max_workers=min(workers, len(sheets))) as pool:
+                futures = [
+                    pool.submit(_render_to_file, df, os.path.join(tmp, f"sheet{i}.xml"), chunk_rows)
+                    for i, (_, df) in enumerate(sheets, 1)
+                ]
+                for i, fut in enumerate(futures, 1):
+                    path = fut.result()
+                    zf.write(path, f"xl/worksheets/sheet{i}.xml")
+                    os.unlink(path)
+            return
+        for i, (_, df) in enumerate(sheets, 1):
+            with zf.open(f"xl/worksheets/sheet{i}.xml", "w", force_zip64=True) as member:
+                for part in iter_sheet_xml(df, chunk_rows):
+                    member.write(part)